@@ -0,0 +1,187 @@
+"""
+Compare /api/dashboard/ latency under WSGI and ASGI.
+
+Seeds a benchmark user in benchmarks/bench.sqlite3, starts each server on a free
+local port, sends the same concurrent load to both and prints p50/p99 latency:
+
+    python benchmarks/dashboard_servers.py --requests 500 --concurrency 16
+
+WSGI runs under gunicorn with one worker and --concurrency threads when gunicorn
+is installed, else under `manage.py runserver`. ASGI runs under uvicorn with one
+worker; it is skipped when uvicorn is not installed. The dashboard cache is off
+(see benchmarks/settings.py), so every request computes the panels.
+"""
+import argparse
+import datetime as dt
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SETTINGS = 'benchmarks.settings'
+USERNAME = 'dashboard-bench'
+PATH = '/api/dashboard/'
+
+
+def setup_django():
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', SETTINGS)
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def seed_user(workouts=300, meal_days=90):
+    """Create the benchmark user with workouts, meals and goals once; returns a session cookie."""
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.utils import timezone
+
+    from main.models import Exercise, Food, Goal, Meal, Set, UserProfile, Workout
+
+    user, created = User.objects.get_or_create(username=USERNAME)
+    if created:
+        UserProfile.objects.create(
+            user=user, age=35, gender=UserProfile.MALE, current_weight=Decimal('90'),
+            target_weight=Decimal('82'), weight_unit=UserProfile.KG, activity_level='1.55',
+        )
+        now = timezone.now()
+        for number in range(1, workouts + 1):
+            workout = Workout.objects.create(user=user, title=f"Session {number}", workout_number=number)
+            Workout.objects.filter(pk=workout.pk).update(created_at=now - dt.timedelta(days=workouts - number))
+            exercise = Exercise.objects.create(workout=workout, name='Squat')
+            Set.objects.bulk_create([
+                Set(exercise=exercise, set_number=index, reps=5, weight=Decimal(100 + number % 20),
+                    weight_unit=Set.KG, weight_kg=Decimal(100 + number % 20))
+                for index in range(1, 4)
+            ])
+        today = timezone.localdate()
+        for offset in range(meal_days):
+            meal = Meal.objects.create(user=user, name='Dinner')
+            Meal.objects.filter(pk=meal.pk).update(date_consumed=today - dt.timedelta(days=offset))
+            Food.objects.create(meal=meal, name='Rice', grams=300, calories_per_100g=130,
+                                carbs_per_100g=28, fat_per_100g=0.3, protein_per_100g=2.7)
+        from main.models import DailyNutrition
+        DailyNutrition.objects.rebuild()
+        Goal.objects.create(user=user, title='Cut', goal_type=Goal.WEIGHT_LOSS,
+                            target_value=Decimal('8'), starting_value=Decimal('95'))
+
+    client = Client()
+    client.force_login(user)
+    return client.cookies['sessionid'].value
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(interface, port, concurrency):
+    if interface == 'asgi':
+        if importlib.util.find_spec('uvicorn') is None:
+            return None
+        return [sys.executable, '-m', 'uvicorn', 'claude_code.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port), '--workers', '1', '--log-level', 'warning']
+    if importlib.util.find_spec('gunicorn') is not None:
+        return [sys.executable, '-m', 'gunicorn', 'claude_code.wsgi:application',
+                '--bind', f'127.0.0.1:{port}', '--workers', '1', '--threads', str(concurrency)]
+    return [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {timeout}s")
+
+
+def fetch(url, session_id):
+    request = urllib.request.Request(url, headers={'Cookie': f'sessionid={session_id}'})
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"GET {url} returned {response.status}")
+    return time.perf_counter() - started
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_load(url, session_id, requests, concurrency, warmup):
+    for _ in range(warmup):
+        fetch(url, session_id)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(lambda _: fetch(url, session_id), range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'requests_per_second': round(requests / elapsed, 1),
+    }
+
+
+def benchmark(interface, session_id, options):
+    port = free_port()
+    command = server_command(interface, port, options.concurrency)
+    if command is None:
+        print(f"{interface}: skipped (uvicorn is not installed)")
+        return None
+    environment = {**os.environ, 'DJANGO_SETTINGS_MODULE': SETTINGS, 'PYTHONPATH': str(ROOT)}
+    process = subprocess.Popen(command, cwd=ROOT, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        url = f'http://127.0.0.1:{port}{PATH}'
+        wait_until_up(url, process)
+        result = run_load(url, session_id, options.requests, options.concurrency, options.warmup)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    result['server'] = Path(command[2] if command[1] == '-m' else command[1]).name
+    print(f"{interface}: p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"{result['requests_per_second']} req/s ({result['server']})")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    options = parser.parse_args()
+
+    setup_django()
+    session_id = seed_user()
+    results = {interface: benchmark(interface, session_id, options) for interface in ('wsgi', 'asgi')}
+    if options.output:
+        Path(options.output).write_text(json.dumps(results, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+generate() creates users with `years` of daily history ending today: workouts
+with exercises and sets, meals with foods, weigh-ins and goals, all written with
+bulk_create. The same seed, user count and years give the same data (relative
+to the end date). Derived tables (exercise series, personal records, daily
+nutrition rollups, weight trend, calorie targets) are filled the same way the
+app's own batch paths fill them, since bulk_create sends no signals.
+"""
+import datetime as dt
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from main import analytics
+from main.models import (
+    DailyNutrition, Exercise, ExerciseDefinition, ExerciseSeries, Food, Goal, Meal, Set, UserProfile,
+    WeightEntry, Workout, normalize_exercise_name, smooth_weight,
+)
+
+BATCH_SIZE = 5000
+PASSWORD = 'benchmark'
+
+# (title, day, [(exercise, starting weight in kg)])
+WORKOUT_TEMPLATES = [
+    ('Push day', Workout.PUSH, [('Bench Press', 60), ('Overhead Press', 35), ('Incline Dumbbell Press', 22), ('Triceps Pushdown', 25)]),
+    ('Pull day', Workout.PULL, [('Deadlift', 100), ('Barbell Row', 55), ('Pull-up', 0), ('Biceps Curl', 12)]),
+    ('Leg day', Workout.LEGS, [('Squat', 80), ('Romanian Deadlift', 70), ('Leg Press', 120), ('Calf Raise', 60)]),
+]
+
+# (name, calories, carbs, fat, protein per 100 g)
+FOODS = [
+    ('Oats', 389, 66, 7, 17), ('Whole milk', 61, 5, 3, 3), ('Banana', 89, 23, 0, 1),
+    ('Eggs', 155, 1, 11, 13), ('Chicken breast', 165, 0, 4, 31), ('White rice', 130, 28, 0, 3),
+    ('Broccoli', 34, 7, 0, 3), ('Salmon', 208, 0, 13, 20), ('Potatoes', 77, 17, 0, 2),
+    ('Greek yogurt', 97, 4, 5, 9), ('Peanut butter', 588, 20, 50, 25), ('Wholemeal bread', 247, 41, 3, 13),
+    ('Pasta', 131, 25, 1, 5), ('Beef mince', 254, 0, 20, 17), ('Apple', 52, 14, 0, 0),
+]
+MEAL_NAMES = ['Breakfast', 'Lunch', 'Dinner', 'Snack']
+
+
+def _bulk_create(model, objects):
+    for start in range(0, len(objects), BATCH_SIZE):
+        model.objects.bulk_create(objects[start:start + BATCH_SIZE])
+
+
+def _restore(model, fields, rows):
+    """Write `fields` of (values..., pk) rows back over what auto_now/auto_now_add set on insert."""
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name) for name in fields]
+    assignments = ', '.join(f"{quote(field.column)} = %s" for field in columns)
+    sql = f"UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s"
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany(sql, [
+                [field.get_db_prep_value(value, connection) for field, value in zip(columns, row[:-1])] + [row[-1]]
+                for row in rows[start:start + BATCH_SIZE]
+            ])
+
+
+def _at(day, hour, minute=0):
+    return timezone.make_aware(dt.datetime.combine(day, dt.time(hour, minute)))
+
+
+def _user_history(rng, user, days):
+    """Unsaved workouts (with exercises and sets), meals (with foods), weigh-ins and goals of one user."""
+    start_weight = Decimal(rng.randint(6000, 11000)) / 100
+    workouts = []
+    meals = []
+    weigh_ins = []
+    weight = start_weight
+    template_index = rng.randrange(len(WORKOUT_TEMPLATES))
+
+    for offset, day in enumerate(days):
+        progress = 1 + offset / 365 * 0.15
+        if rng.random() < 3 / 7:
+            title, workout_day, exercises = WORKOUT_TEMPLATES[template_index % len(WORKOUT_TEMPLATES)]
+            template_index += 1
+            sets_by_exercise = []
+            for name, base_kg in exercises:
+                top = Decimal(round(base_kg * progress * rng.uniform(0.9, 1.05) / 2.5) * 2.5)
+                sets_by_exercise.append((name, [
+                    (rng.randint(3, 12), top) for _ in range(rng.randint(3, 5))
+                ]))
+            workouts.append({
+                'title': title,
+                'day': workout_day,
+                'duration': dt.timedelta(minutes=rng.randint(35, 95)),
+                'created_at': _at(day, rng.randint(6, 20), rng.randint(0, 59)),
+                'exercises': sets_by_exercise,
+            })
+
+        for meal_index, meal_name in enumerate(MEAL_NAMES[:rng.randint(2, 4)]):
+            meals.append({
+                'name': meal_name,
+                'date_consumed': day,
+                'created_at': _at(day, 7 + meal_index * 4),
+                'foods': [(rng.choice(FOODS), rng.randint(5, 40) * 10) for _ in range(rng.randint(1, 4))],
+            })
+
+        weight += Decimal(rng.randint(-60, 50)) / 100
+        if rng.random() < 0.7:
+            weigh_ins.append((_at(day, 7), weight.quantize(Decimal('0.01'))))
+
+    goals = [
+        Goal(user=user, title='Lose 5 kg', goal_type=Goal.WEIGHT_LOSS, unit=Goal.KG,
+             target_value=Decimal('5'), starting_value=start_weight),
+        Goal(user=user, title='Squat 140 kg', goal_type=Goal.STRENGTH, unit=Goal.KG, target_value=Decimal('140')),
+        Goal(user=user, title='Run a 10k', goal_type=Goal.ENDURANCE, is_active=False, is_completed=True,
+             completed_date=days[0] if days else None),
+    ]
+    return workouts, meals, weigh_ins, goals, weight
+
+
+def _write_user(rng, user, days, definitions):
+    """Write one user's generated history. Returns row counts."""
+    workouts, meals, weigh_ins, goals, weight = _user_history(rng, user, days)
+
+    # Weigh-ins carry the trend forward exactly as WeightEntry.objects.record() does
+    entries = []
+    trend = measured = None
+    for measured_at, weight_kg in weigh_ins:
+        trend = smooth_weight(trend, measured, weight_kg, measured_at)
+        measured = measured_at
+        entries.append(WeightEntry(user=user, measured_at=measured_at, weight_kg=weight_kg, trend_kg=trend))
+    _bulk_create(WeightEntry, entries)
+
+    UserProfile.objects.bulk_create([UserProfile(
+        user=user, age=rng.randint(20, 60), gender=rng.choice([UserProfile.MALE, UserProfile.FEMALE]),
+        current_weight=weight.quantize(Decimal('0.01')), weight_unit=UserProfile.KG,
+        target_weight=(weight - 5).quantize(Decimal('0.01')), activity_level='1.55',
+        weight_trend_kg=trend, last_workout_number=len(workouts),
+    )])
+    _bulk_create(Goal, goals)
+
+    # Workouts, then their exercises, then their sets, each level in one bulk insert
+    workout_rows = [
+        (Workout(user=user, title=values['title'], day=values['day'], duration=values['duration'], workout_number=number), values)
+        for number, values in enumerate(workouts, start=1)
+    ]
+    _bulk_create(Workout, [workout for workout, values in workout_rows])
+    _restore(Workout, ['created_at', 'updated_at'], [
+        (values['created_at'], values['created_at'], workout.pk) for workout, values in workout_rows
+    ])
+    for workout, values in workout_rows:
+        workout.created_at = values['created_at']
+
+    exercise_rows = [
+        (Exercise(workout=workout, name=name, definition=definitions[normalize_exercise_name(name)]), sets)
+        for workout, values in workout_rows
+        for name, sets in values['exercises']
+    ]
+    _bulk_create(Exercise, [exercise for exercise, sets in exercise_rows])
+    new_sets = []
+    series = []
+    for exercise, sets in exercise_rows:
+        exercise_sets = [
+            Set(exercise=exercise, set_number=number, reps=reps, weight=weight_kg, weight_unit=Set.KG)
+            for number, (reps, weight_kg) in enumerate(sets, start=1)
+        ]
+        for workout_set in exercise_sets:
+            workout_set.sync_weight_kg()
+        new_sets.extend(exercise_sets)
+        series.append(analytics.build_series(exercise.workout, exercise, exercise_sets))
+    _bulk_create(Set, new_sets)
+    _bulk_create(ExerciseSeries, series)
+    analytics.recompute_personal_records(user.pk, {row.exercise_key for row in series})
+
+    meal_rows = [(Meal(user=user, name=values['name']), values) for values in meals]
+    _bulk_create(Meal, [meal for meal, values in meal_rows])
+    _restore(Meal, ['date_consumed', 'created_at', 'updated_at'], [
+        (values['date_consumed'], values['created_at'], values['created_at'], meal.pk) for meal, values in meal_rows
+    ])
+    foods = [
+        Food(meal=meal, name=name, grams=grams, calories_per_100g=calories,
+             carbs_per_100g=carbs, fat_per_100g=fat, protein_per_100g=protein)
+        for meal, values in meal_rows
+        for (name, calories, carbs, fat, protein), grams in values['foods']
+    ]
+    _bulk_create(Food, foods)
+    DailyNutrition.objects.refresh(user.pk, days)
+
+    return {
+        'workouts': len(workout_rows),
+        'exercises': len(exercise_rows),
+        'sets': len(new_sets),
+        'meals': len(meal_rows),
+        'foods': len(foods),
+        'weight_entries': len(entries),
+        'goals': len(goals),
+    }
+
+
+def generate(users=1, years=1, seed=0, prefix='bench', end=None):
+    """
+    Create `users` users named {prefix}-0, {prefix}-1, ... (password "benchmark"),
+    each with `years` of history up to `end` (default today). Returns row counts.
+    """
+    rng = random.Random(seed)
+    end = end or timezone.localdate()
+    days = [end - dt.timedelta(days=offset) for offset in range(int(365 * years) - 1, -1, -1)]
+    password = make_password(PASSWORD)
+
+    accounts = User.objects.bulk_create([
+        User(username=f'{prefix}-{index}', password=password) for index in range(users)
+    ])
+    definitions = ExerciseDefinition.objects.resolve(
+        name for title, day, exercises in WORKOUT_TEMPLATES for name, base_kg in exercises
+    )
+
+    counts = {'users': len(accounts)}
+    for user in accounts:
+        # One user at a time keeps memory flat at large scales
+        with transaction.atomic():
+            for table, count in _write_user(rng, user, days, definitions).items():
+                counts[table] = counts.get(table, 0) + count
+
+    try:
+        from main.calorie_targets import recompute_calorie_targets
+        recompute_calorie_targets(profiles=UserProfile.objects.filter(user__in=accounts))
+    except ImportError:
+        # Without NumPy the targets are computed on first use instead
+        pass
+    cache.clear()
+    return counts
@@ -0,0 +1,28 @@
+"""
+Settings for the benchmarks: the project settings with a separate SQLite file,
+so seeded benchmark data never touches db.sqlite3.
+
+The dashboard cache is disabled unless BENCHMARK_CACHE=1, so every request
+measures the panel computations rather than a cache read.
+"""
+import os
+
+from claude_code.settings import *  # noqa: F401,F403
+from claude_code.settings import BASE_DIR
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'testserver']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_DB', str(BASE_DIR / 'benchmarks' / 'bench.sqlite3')),
+    }
+}
+
+if os.environ.get('BENCHMARK_CACHE') != '1':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    }
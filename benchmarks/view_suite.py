@@ -0,0 +1,215 @@
+"""
+Benchmark suite for the main views, driven through the Django test client.
+
+For each data scale (users x years of history, see benchmarks/generator.py) the
+benchmark database is flushed and regenerated, then every scenario is run as the
+first generated user and reports wall time (median and min over --repeat runs),
+query count and peak Python memory (tracemalloc, from a separate untimed run).
+Results are written as JSON; pass an earlier file to --compare to print changes:
+
+    python benchmarks/view_suite.py --scale 1x1 --scale 5x2 --output before.json
+    python benchmarks/view_suite.py --scale 1x1 --scale 5x2 --compare before.json
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SCALES = ['1x1', '5x2', '10x5']
+
+
+def _workout_form(context):
+    return {
+        'title': 'Benchmark workout', 'day': 'Push', 'duration': '01:00:00',
+        'form-TOTAL_FORMS': '2', 'form-INITIAL_FORMS': '0', 'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+        'form-0-name': 'Bench Press', 'form-1-name': 'Squat',
+        **{
+            f'exercise_{exercise}_set_{number}_{field}': value
+            for exercise in range(2)
+            for number in range(4)
+            for field, value in [('reps', '5'), ('weight', '100'), ('weight_unit', 'Kg')]
+        },
+    }
+
+
+def _meal_form(context):
+    return {
+        'name': 'Benchmark meal', 'date_consumed': context['today'].isoformat(),
+        'form-TOTAL_FORMS': '3', 'form-INITIAL_FORMS': '0', 'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+        **{
+            f'form-{index}-{field}': value
+            for index, name in enumerate(['Oats', 'Whole milk', 'Banana'])
+            for field, value in [
+                ('name', name), ('grams', '100'), ('calories_per_100g', '100'),
+                ('carbs_per_100g', '10'), ('fat_per_100g', '5'), ('protein_per_100g', '5'),
+            ]
+        },
+    }
+
+
+# name -> (method, path, form data, expected status); path and data are built from the run context
+SCENARIOS = {
+    'homepage': ('get', lambda context: '/homepage/', None, 200),
+    'meal_tracking_day': ('get', lambda context: '/meals/', None, 200),
+    'meal_tracking_all': ('get', lambda context: '/meals/?view=all', None, 200),
+    'my_workouts': ('get', lambda context: '/workouts/', None, 200),
+    'workout_detail': ('get', lambda context: f"/workout/{context['workout_id']}/", None, 200),
+    'create_workout': ('post', lambda context: '/workout/create/', _workout_form, 302),
+    'add_meal': ('post', lambda context: '/meals/add/', _meal_form, 302),
+}
+
+
+def setup_django():
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+
+def _request(client, scenario, context):
+    method, path, form, expected_status = SCENARIOS[scenario]
+    data = form(context) if form else None
+    response = getattr(client, method)(path(context), data) if data else getattr(client, method)(path(context))
+    if response.status_code != expected_status:
+        raise RuntimeError(f"{scenario}: expected status {expected_status}, got {response.status_code}")
+    return response
+
+
+def run_scenario(client, scenario, context, repeat):
+    """Query count and peak memory from one traced run, then `repeat` timed runs."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        _request(client, scenario, context)
+    # Read now: the next request's request_started signal resets the query log
+    query_count = len(queries)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _request(client, scenario, context)
+        timings.append(time.perf_counter() - started)
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'min_ms': round(min(timings) * 1000, 2),
+        'queries': query_count,
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def run_scale(users, years, seed, repeat, scenarios):
+    from django.core.management import call_command
+    from django.test import Client
+    from django.utils import timezone
+
+    from benchmarks.generator import generate
+    from main.models import Workout
+
+    call_command('migrate', verbosity=0)
+    call_command('flush', interactive=False, verbosity=0)
+    started = time.perf_counter()
+    rows = generate(users=users, years=years, seed=seed)
+    generate_seconds = time.perf_counter() - started
+
+    from django.contrib.auth.models import User
+    user = User.objects.get(username='bench-0')
+    client = Client()
+    client.force_login(user)
+    context = {
+        'today': timezone.localdate(),
+        'workout_id': Workout.objects.filter(user=user).order_by('-created_at').values_list('id', flat=True).first(),
+    }
+
+    results = {}
+    for scenario in scenarios:
+        results[scenario] = run_scenario(client, scenario, context, repeat)
+        print(f"  {scenario:<20} {results[scenario]['median_ms']:>9} ms  {results[scenario]['queries']:>4} queries  "
+              f"{results[scenario]['peak_memory_kib']:>9} KiB")
+    return {
+        'users': users,
+        'years': years,
+        'rows': rows,
+        'generate_seconds': round(generate_seconds, 2),
+        'scenarios': results,
+    }
+
+
+def compare(previous, current):
+    """Print the change in median time and queries per scenario for scales present in both runs."""
+    before = {(scale['users'], scale['years']): scale for scale in previous['scales']}
+    for scale in current['scales']:
+        old = before.get((scale['users'], scale['years']))
+        if old is None:
+            continue
+        print(f"{scale['users']} users x {scale['years']} years vs. {previous['started_at']}:")
+        for scenario, result in scale['scenarios'].items():
+            old_result = old['scenarios'].get(scenario)
+            if old_result is None:
+                continue
+            change = (result['median_ms'] - old_result['median_ms']) / old_result['median_ms'] * 100
+            print(f"  {scenario:<20} {change:+7.1f}% time  {result['queries'] - old_result['queries']:+4d} queries")
+
+
+def parse_scale(value):
+    users, separator, years = value.partition('x')
+    try:
+        return int(users), float(years)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected USERSxYEARS such as 5x2, got {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', action='append', type=parse_scale,
+                        help=f"USERSxYEARS of generated data; repeatable (default: {' '.join(DEFAULT_SCALES)})")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Run only these scenarios')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario (default: 5)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/views-<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    options = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.db import connection
+
+    scales = options.scale or [parse_scale(scale) for scale in DEFAULT_SCALES]
+    started_at = dt.datetime.now(dt.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    results = {
+        'started_at': started_at,
+        'seed': options.seed,
+        'repeat': options.repeat,
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': f"{connection.vendor} {connection.Database.sqlite_version if connection.vendor == 'sqlite' else ''}".strip(),
+            'machine': platform.machine(),
+        },
+        'scales': [],
+    }
+    for users, years in scales:
+        print(f"{users} users x {years} years:")
+        results['scales'].append(run_scale(users, years, options.seed, options.repeat, options.scenario or list(SCENARIOS)))
+
+    output = Path(options.output or ROOT / 'benchmarks' / 'results' / f"views-{started_at.replace(':', '')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + '\n')
+    print(f"Results written to {output}")
+
+    if options.compare:
+        compare(json.loads(Path(options.compare).read_text()), results)
+
+
+if __name__ == '__main__':
+    main()
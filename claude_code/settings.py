@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +55,8 @@ ROOT_URLCONF = 'claude_code.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render time reported to the request metrics
+        'BACKEND': 'main.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,6 +83,32 @@ DATABASES = {
 }
 
 
+# Cache (dashboard data, workout statistics)
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process. When running several worker processes, switch to
+# the file backend so they share entries and invalidations:
+#     'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#     'LOCATION': BASE_DIR / 'cache',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'claude-code',
+    }
+}
+
+
+# Request metrics (main.metrics), served at /metrics/ to staff users, to requests
+# carrying "Authorization: Bearer <METRICS_BEARER_TOKEN>" and to METRICS_ALLOWED_IPS.
+# The addresses are matched against REMOTE_ADDR, which behind a reverse proxy on the
+# same host is the proxy's own address for every client: only list addresses here
+# when the app is reached directly, and use the token for scrapers otherwise.
+
+METRICS_BEARER_TOKEN = None
+
+METRICS_ALLOWED_IPS = []
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
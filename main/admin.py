@@ -1,12 +1,20 @@
 from django.contrib import admin
-from .models import Workout, Exercise, Set, Meal, Food, UserProfile, ProgressPicture, Goal
+from .models import Workout, Exercise, Set, ExerciseDefinition, ExerciseAlias, ExerciseSeries, PersonalRecord, Meal, Food, FoodItem, DailyNutrition, UserProfile, WeightEntry, TdeeEstimate, ProgressPicture, Goal
 
 # Register your models here.
 admin.site.register(UserProfile)
+admin.site.register(WeightEntry)
+admin.site.register(TdeeEstimate)
 admin.site.register(Workout)
 admin.site.register(Exercise)
 admin.site.register(Set)
+admin.site.register(ExerciseDefinition)
+admin.site.register(ExerciseAlias)
+admin.site.register(ExerciseSeries)
+admin.site.register(PersonalRecord)
 admin.site.register(Meal)
 admin.site.register(Food)
+admin.site.register(FoodItem)
+admin.site.register(DailyNutrition)
 admin.site.register(ProgressPicture)
 admin.site.register(Goal)
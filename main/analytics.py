@@ -0,0 +1,283 @@
+"""
+Training analytics: per-exercise, per-workout tonnage, best set and estimated 1RM.
+
+Stats are computed once when a workout is written and stored in ExerciseSeries,
+so charts read one indexed row per session instead of walking every set.
+PersonalRecord rows are kept up to date from the same data.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import ExerciseSeries, PersonalRecord, normalize_exercise_name
+
+TWO_PLACES = Decimal('0.01')
+
+# Brzycki's formula divides by (37 - reps), so it is undefined from 37 reps up
+BRZYCKI_MAX_REPS = 36
+
+# Fields rewritten when a new session beats a record
+PERSONAL_RECORD_FIELDS = [
+    'heaviest_weight_kg', 'heaviest_workout',
+    'best_1rm_kg', 'best_1rm_workout',
+    'best_volume_kg', 'best_volume_workout',
+    'reps_at_weight', 'achieved_at',
+]
+
+
+def epley_1rm(weight_kg, reps):
+    """Epley: 1RM = w × (1 + reps / 30). A single is its own 1RM."""
+    if reps < 1 or weight_kg <= 0:
+        return None
+    if reps == 1:
+        return weight_kg
+    return weight_kg * (1 + Decimal(reps) / 30)
+
+
+def brzycki_1rm(weight_kg, reps):
+    """Brzycki: 1RM = w × 36 / (37 - reps)."""
+    if reps < 1 or reps > BRZYCKI_MAX_REPS or weight_kg <= 0:
+        return None
+    return weight_kg * 36 / (37 - Decimal(reps))
+
+
+def _quantize(value):
+    return value.quantize(TWO_PLACES) if value is not None else None
+
+
+def summarize_sets(sets):
+    """
+    Compute session stats for one exercise from its Set rows (using Set.weight_kg).
+    The best set is the one with the highest Epley estimate, then the heaviest.
+    """
+    summary = {
+        'set_count': 0,
+        'total_reps': 0,
+        'tonnage_kg': Decimal('0'),
+        'best_set_weight_kg': Decimal('0'),
+        'best_set_reps': 0,
+        'estimated_1rm_epley_kg': None,
+        'estimated_1rm_brzycki_kg': None,
+    }
+    best_key = None
+
+    for workout_set in sets:
+        weight_kg = workout_set.weight_kg
+        reps = workout_set.reps
+
+        summary['set_count'] += 1
+        summary['total_reps'] += reps
+        summary['tonnage_kg'] += weight_kg * reps
+
+        epley = epley_1rm(weight_kg, reps)
+        brzycki = brzycki_1rm(weight_kg, reps)
+        if epley is not None and (summary['estimated_1rm_epley_kg'] is None or epley > summary['estimated_1rm_epley_kg']):
+            summary['estimated_1rm_epley_kg'] = epley
+        if brzycki is not None and (summary['estimated_1rm_brzycki_kg'] is None or brzycki > summary['estimated_1rm_brzycki_kg']):
+            summary['estimated_1rm_brzycki_kg'] = brzycki
+
+        key = (epley or Decimal('0'), weight_kg, reps)
+        if reps > 0 and (best_key is None or key > best_key):
+            best_key = key
+            summary['best_set_weight_kg'] = weight_kg
+            summary['best_set_reps'] = reps
+
+    for field in ('tonnage_kg', 'best_set_weight_kg', 'estimated_1rm_epley_kg', 'estimated_1rm_brzycki_kg'):
+        summary[field] = _quantize(summary[field])
+    return summary
+
+
+def series_key(exercise):
+    """Grouping key of an exercise: its catalog name once linked, else its normalized name."""
+    if exercise.definition_id is not None:
+        return exercise.definition.normalized_name
+    return normalize_exercise_name(exercise.name)
+
+
+def build_series(workout, exercise, sets):
+    """Build an unsaved ExerciseSeries row for one exercise of a workout."""
+    return ExerciseSeries(
+        user_id=workout.user_id,
+        workout=workout,
+        exercise=exercise,
+        definition_id=exercise.definition_id,
+        exercise_name=exercise.name.strip(),
+        exercise_key=series_key(exercise),
+        performed_at=workout.created_at,
+        **summarize_sets(sets),
+    )
+
+
+def record_workout(workout, exercises_with_sets):
+    """
+    Store series rows for a freshly written workout and update personal records.
+    `exercises_with_sets` is a list of (exercise, [Set, ...]) already in memory,
+    so no sets are read back from the database.
+    """
+    rows = [build_series(workout, exercise, sets) for exercise, sets in exercises_with_sets]
+    ExerciseSeries.objects.bulk_create(rows)
+    update_personal_records(workout, [(row, sets) for row, (exercise, sets) in zip(rows, exercises_with_sets)])
+    return rows
+
+
+def weight_key(weight_kg):
+    """Key of PersonalRecord.reps_at_weight for a weight in kg."""
+    return str(weight_kg.quantize(TWO_PLACES))
+
+
+def _apply_session(record, workout, series_row, sets):
+    """Fold one exercise session into a PersonalRecord. Returns True if any record was beaten."""
+    improved = False
+
+    heaviest = max((workout_set.weight_kg for workout_set in sets if workout_set.reps > 0), default=None)
+    if heaviest is not None and heaviest > record.heaviest_weight_kg:
+        record.heaviest_weight_kg = heaviest
+        record.heaviest_workout_id = workout.id
+        improved = True
+
+    best_1rm = series_row.estimated_1rm_epley_kg
+    if best_1rm is not None and (record.best_1rm_kg is None or best_1rm > record.best_1rm_kg):
+        record.best_1rm_kg = best_1rm
+        record.best_1rm_workout_id = workout.id
+        improved = True
+
+    if series_row.tonnage_kg > record.best_volume_kg:
+        record.best_volume_kg = series_row.tonnage_kg
+        record.best_volume_workout_id = workout.id
+        improved = True
+
+    for workout_set in sets:
+        if workout_set.reps < 1:
+            continue
+        key = weight_key(workout_set.weight_kg)
+        best_reps = record.reps_at_weight.get(key, [0, None])[0]
+        if workout_set.reps > best_reps:
+            record.reps_at_weight[key] = [workout_set.reps, workout.id]
+            improved = True
+
+    if improved:
+        record.achieved_at = workout.created_at
+    return improved
+
+
+def update_personal_records(workout, sessions):
+    """
+    Fold a new workout's sessions, a list of (ExerciseSeries, [Set, ...]), into the
+    user's PersonalRecord rows: one read for the affected exercises plus bulk writes.
+    """
+    exercise_keys = {series_row.exercise_key for series_row, sets in sessions}
+    records = {
+        record.exercise_key: record
+        for record in PersonalRecord.objects.filter(user_id=workout.user_id, exercise_key__in=exercise_keys)
+    }
+
+    changed = {}
+    for series_row, sets in sessions:
+        record = records.get(series_row.exercise_key)
+        if record is None:
+            record = records[series_row.exercise_key] = PersonalRecord(
+                user_id=workout.user_id,
+                exercise_key=series_row.exercise_key,
+                exercise_name=series_row.exercise_name,
+            )
+        if _apply_session(record, workout, series_row, sets):
+            changed[series_row.exercise_key] = record
+
+    new_records = [record for record in changed.values() if record.pk is None]
+    updated_records = [record for record in changed.values() if record.pk is not None]
+    if new_records:
+        PersonalRecord.objects.bulk_create(new_records)
+    if updated_records:
+        PersonalRecord.objects.bulk_update(updated_records, PERSONAL_RECORD_FIELDS)
+
+
+def recompute_personal_records(user_id, exercise_keys):
+    """
+    Rebuild the PersonalRecord rows of only the given exercises from the user's
+    remaining sessions, e.g. after a workout was deleted.
+    """
+    exercise_keys = set(exercise_keys)
+    if not exercise_keys:
+        return
+
+    sessions = (
+        ExerciseSeries.objects.filter(user_id=user_id, exercise_key__in=exercise_keys)
+        .select_related('workout')
+        .prefetch_related('exercise__sets')
+        .order_by('exercise_key', 'performed_at', 'id')
+    )
+    records = {}
+    for series_row in sessions:
+        record = records.get(series_row.exercise_key)
+        if record is None:
+            record = records[series_row.exercise_key] = PersonalRecord(
+                user_id=user_id,
+                exercise_key=series_row.exercise_key,
+                exercise_name=series_row.exercise_name,
+            )
+        _apply_session(record, series_row.workout, series_row, series_row.exercise.sets.all())
+
+    PersonalRecord.objects.filter(user_id=user_id, exercise_key__in=exercise_keys).delete()
+    PersonalRecord.objects.bulk_create(records.values())
+
+
+def rebuild_personal_records(series):
+    """
+    Recompute the PersonalRecord rows of every (user, exercise) present in the
+    given ExerciseSeries queryset, one recompute_personal_records() call per user.
+    """
+    keys_by_user = defaultdict(set)
+    for user_id, exercise_key in series.order_by().values_list('user_id', 'exercise_key').distinct():
+        keys_by_user[user_id].add(exercise_key)
+    for user_id, exercise_keys in keys_by_user.items():
+        recompute_personal_records(user_id, exercise_keys)
+    return sum(len(exercise_keys) for exercise_keys in keys_by_user.values())
+
+
+def rebuild_series(workouts, batch_size=500):
+    """Recompute series rows for the given workouts from their stored sets. Returns the row count."""
+    workouts = workouts.prefetch_related('exercises__definition', 'exercises__sets')
+    created = 0
+    batch = []
+    for workout in workouts.iterator(chunk_size=batch_size):
+        for exercise in workout.exercises.all():
+            batch.append(build_series(workout, exercise, exercise.sets.all()))
+        if len(batch) >= batch_size:
+            ExerciseSeries.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        ExerciseSeries.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def recent_sessions(user, definition, limit=None):
+    """
+    The user's sessions of one catalog exercise, oldest first. With `limit`, only
+    the latest `limit` sessions; either way a range read on the (user, definition, date) index.
+    """
+    rows = ExerciseSeries.objects.filter(user=user, definition=definition)
+    if limit:
+        return list(rows.order_by('-performed_at')[:limit])[::-1]
+    return list(rows.order_by('performed_at'))
+
+
+def series_points(user, definition, limit=None):
+    """Chart points for one exercise, oldest first, read from the precomputed table."""
+    return [{
+        'date': timezone.localdate(row.performed_at).isoformat(),
+        'workout_id': row.workout_id,
+        'sets': row.set_count,
+        'reps': row.total_reps,
+        'tonnage_kg': float(row.tonnage_kg),
+        'best_set': {
+            'weight_kg': float(row.best_set_weight_kg),
+            'reps': row.best_set_reps,
+        },
+        'estimated_1rm_kg': {
+            'epley': float(row.estimated_1rm_epley_kg) if row.estimated_1rm_epley_kg is not None else None,
+            'brzycki': float(row.estimated_1rm_brzycki_kg) if row.estimated_1rm_brzycki_kg is not None else None,
+        },
+    } for row in recent_sessions(user, definition, limit)]
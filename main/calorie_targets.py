@@ -0,0 +1,136 @@
+"""
+Batch recomputation of the stored calorie target columns on UserProfile.
+
+Profiles are read a chunk at a time as plain column values, the BMR → TDEE →
+target chain is evaluated on whole NumPy arrays, and the results are written
+back with one prepared UPDATE per chunk (executemany). bulk_update builds a
+CASE expression per column that is re-evaluated for every row, which takes
+minutes at hundreds of thousands of profiles.
+
+The arithmetic mirrors UserProfile.calculate_bmr, calculate_tdee and
+calculate_daily_calorie_target step for step, so the stored values match what
+the per-profile methods return.
+"""
+from django.db import connection, transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import UserProfile
+
+KG_PER_LB = 0.453592
+
+INPUT_FIELDS = ['id', 'age', 'gender', 'activity_level', 'weight_unit', 'weight_trend_kg', 'adaptive_tdee']
+
+# Decimal inputs, cast to floats in SQL to skip building a Decimal per value
+FLOAT_INPUT_FIELDS = ['current_weight', 'target_weight', 'weight_loss_rate']
+
+
+def compute_targets(columns):
+    """
+    Vectorized BMR/TDEE/daily/weekly/monthly targets.
+    `columns` maps field names to equal-length lists; missing values are None.
+    Returns a dict of float arrays with NaN where the per-profile method returns None.
+    """
+    import numpy as np
+
+    def floats(values):
+        # None becomes NaN; activity levels are stored as strings like "1.55"
+        return np.array([None if value is None else float(value) for value in values], dtype=np.float64)
+
+    age = floats(columns['age'])
+    weight = floats(columns['current_weight'])
+    target_weight = floats(columns['target_weight'])
+    rate = floats(columns['weight_loss_rate'])
+    trend = floats(columns.get('weight_trend_kg', [None] * len(columns['age'])))
+    adaptive_tdee = floats(columns.get('adaptive_tdee', [None] * len(columns['age'])))
+    activity = floats(columns['activity_level'])
+    gender = np.array([value or '' for value in columns['gender']])
+    in_lbs = np.array([unit == UserProfile.LBS for unit in columns['weight_unit']])
+
+    # Zero counts as missing, like the truthiness checks in the model
+    age[age == 0] = np.nan
+    weight[weight == 0] = np.nan
+    target_weight[target_weight == 0] = np.nan
+
+    # The smoothed trend replaces the latest weigh-in wherever there is one
+    weight_kg = np.where(in_lbs, weight * KG_PER_LB, weight)
+    weight_kg = np.where(np.isnan(trend) | np.isnan(weight), weight_kg, trend)
+    target_weight_kg = np.where(in_lbs, target_weight * KG_PER_LB, target_weight)
+
+    bmr = np.where(
+        gender == UserProfile.MALE,
+        (10 * weight_kg) - (5 * age) + 5 + 1000,
+        (10 * weight_kg) - (5 * age) - 161 + 1000,
+    )
+    bmr = np.round(bmr, 0)
+    bmr[gender == ''] = np.nan
+
+    # A zero BMR or TDEE is returned as is but stops the rest of the chain
+    tdee = np.round(np.where(bmr == 0, np.nan, bmr) * activity, 0)
+
+    weekly_rate_kg = np.where(target_weight_kg - weight_kg < 0, -np.abs(rate), np.abs(rate))
+    # The daily target starts from the adaptive TDEE where one has been fitted
+    base_tdee = np.where(np.isnan(adaptive_tdee) | (adaptive_tdee == 0), np.where(tdee == 0, np.nan, tdee), adaptive_tdee)
+    daily = np.round(base_tdee + (weekly_rate_kg * 7700) / 7, 0)
+    # Without a current weight there is no target, even when an adaptive TDEE is set
+    daily[np.isnan(target_weight_kg) | np.isnan(weight_kg)] = np.nan
+
+    # The weekly/monthly targets are only filled for a non-zero daily target
+    with_daily = np.where(daily == 0, np.nan, daily)
+    return {
+        'bmr': bmr,
+        'tdee': tdee,
+        'daily_calorie_target': daily,
+        'weekly_calorie_target': with_daily * 7,
+        'monthly_calorie_target': with_daily * 30,
+    }
+
+
+# Stored columns written by the batch, in compute_targets() order
+TARGET_FIELDS = ['bmr', 'tdee', 'daily_calorie_target', 'weekly_calorie_target', 'monthly_calorie_target']
+
+
+def _write_targets(values, computed_at, pks):
+    """UPDATE the target columns of each profile in `pks` with the matching row of `values`."""
+    quote = connection.ops.quote_name
+    fields = [UserProfile._meta.get_field(name) for name in [*TARGET_FIELDS, 'calorie_targets_updated_at']]
+    assignments = ', '.join(f"{quote(field.column)} = %s" for field in fields)
+    sql = f"UPDATE {quote(UserProfile._meta.db_table)} SET {assignments} WHERE {quote(UserProfile._meta.pk.column)} = %s"
+    timestamp = fields[-1].get_db_prep_value(computed_at, connection)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, [[*row, timestamp, pk] for row, pk in zip(values, pks)])
+
+
+def recompute_calorie_targets(batch_size=20000, profiles=None):
+    """
+    Recompute the stored targets of every profile (or of the given queryset),
+    `batch_size` profiles per read, compute and write. Returns the number updated.
+    """
+    import numpy as np
+
+    profiles = (profiles if profiles is not None else UserProfile.objects.all()).order_by('pk').annotate(**{
+        f'{field}_float': Cast(field, FloatField()) for field in FLOAT_INPUT_FIELDS
+    })
+    selected = [*INPUT_FIELDS, 'user_id', *(f'{field}_float' for field in FLOAT_INPUT_FIELDS)]
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(profiles.filter(pk__gt=last_pk).values_list(*selected)[:batch_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        columns = dict(zip([*INPUT_FIELDS, 'user_id', *FLOAT_INPUT_FIELDS], zip(*rows)))
+        targets = compute_targets(columns)
+        computed_at = timezone.now()
+
+        # NaN marks a missing value; the object array turns it into NULL-able Python values
+        stacked = np.column_stack([targets[field] for field in TARGET_FIELDS])
+        values = stacked.astype(object)
+        values[np.isnan(stacked)] = None
+        _write_targets(values.tolist(), computed_at, columns['id'])
+        # The raw UPDATE sends no signals, so the cached dashboards are invalidated here
+        UserProfile.bump_dashboard_generations_on_commit(columns['user_id'])
+        updated += len(rows)
+    return updated
@@ -0,0 +1,163 @@
+"""
+Adaptive TDEE: energy expenditure fitted from logged intake and the weight trend.
+
+Over a sliding window of completed days, energy balance gives
+
+    TDEE = mean daily intake - 7700 kcal/kg × trend slope (kg/day)
+
+where the slope is a NumPy least-squares fit of the daily weight trend values.
+Each user's window (daily intake and trend arrays) is stored in TdeeEstimate and
+advanced by the days since it was last updated, so a nightly run reads only the
+new day of DailyNutrition and WeightEntry rows per user, never the full history.
+"""
+import datetime as dt
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .calorie_targets import recompute_calorie_targets
+from .models import DailyNutrition, TdeeEstimate, UserProfile, WeightEntry
+
+# 1 kg of body weight ≈ 7700 calories, as in UserProfile.calculate_daily_calorie_target
+CALORIES_PER_KG = 7700
+
+WINDOW_DAYS = 28
+
+# Minimum data in the window before the estimate replaces the formula
+MIN_INTAKE_DAYS = 14
+MIN_WEIGH_IN_SPAN_DAYS = 7
+
+# Estimates outside this range come from incomplete logging rather than a real metabolism
+PLAUSIBLE_TDEE = (1000, 6000)
+
+
+def fit_tdee(intake, weight_kg):
+    """
+    Estimate TDEE from equal-length daily arrays (NaN on days without data).
+    Returns whole calories, or None when there is not enough data.
+    """
+    import numpy as np
+
+    logged = ~np.isnan(intake)
+    weighed = np.flatnonzero(~np.isnan(weight_kg))
+    if logged.sum() < MIN_INTAKE_DAYS or len(weighed) < 2 or weighed[-1] - weighed[0] < MIN_WEIGH_IN_SPAN_DAYS:
+        return None
+
+    design = np.column_stack([weighed, np.ones(len(weighed))])
+    (slope, intercept), *_ = np.linalg.lstsq(design, weight_kg[weighed], rcond=None)
+    tdee = intake[logged].mean() - slope * CALORIES_PER_KG
+    if not PLAUSIBLE_TDEE[0] <= tdee <= PLAUSIBLE_TDEE[1]:
+        return None
+    return float(round(tdee, 0))
+
+
+def _as_array(values):
+    import numpy as np
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _day_start(day):
+    return timezone.make_aware(dt.datetime.combine(day, dt.time.min))
+
+
+def _advance(states, user_ids, window_end):
+    """
+    Bring each user's window up to `window_end`, creating it where missing.
+    Returns {user_id: state} for the states that moved.
+    """
+    window_start = window_end - dt.timedelta(days=WINDOW_DAYS - 1)
+
+    # First day each window is missing; windows that were invalidated or fell behind restart
+    first_new_day = {}
+    for user_id in user_ids:
+        state = states.get(user_id)
+        if state is not None and state.window_end == window_end:
+            continue
+        if state is None or state.window_end is None or state.window_end > window_end:
+            first_new_day[user_id] = window_start
+        else:
+            first_new_day[user_id] = max(state.window_end + dt.timedelta(days=1), window_start)
+    if not first_new_day:
+        return {}
+
+    since = min(first_new_day.values())
+    intake = {
+        (user_id, day): float(calories)
+        for user_id, day, calories in DailyNutrition.objects.filter(
+            user_id__in=first_new_day, date__range=[since, window_end], meal_count__gt=0,
+        ).values_list('user_id', 'date', 'calories')
+    }
+    # The last trend value of a day stands for that day
+    weights = {}
+    for user_id, measured_at, trend_kg in (
+        WeightEntry.objects.filter(
+            user_id__in=first_new_day,
+            measured_at__gte=_day_start(since),
+            measured_at__lt=_day_start(window_end + dt.timedelta(days=1)),
+        ).order_by('measured_at', 'id').values_list('user_id', 'measured_at', 'trend_kg')
+    ):
+        weights[user_id, timezone.localdate(measured_at)] = trend_kg
+
+    moved = {}
+    for user_id, first_day in first_new_day.items():
+        state = states.get(user_id) or TdeeEstimate(user_id=user_id)
+        kept = (first_day - window_start).days
+        new_days = [first_day + dt.timedelta(days=offset) for offset in range((window_end - first_day).days + 1)]
+        state.daily_intake = state.daily_intake[-kept:] if kept else []
+        state.daily_weight_kg = state.daily_weight_kg[-kept:] if kept else []
+        state.daily_intake += [intake.get((user_id, day)) for day in new_days]
+        state.daily_weight_kg += [weights.get((user_id, day)) for day in new_days]
+        state.window_end = window_end
+        state.updated_at = timezone.now()
+        state.tdee = fit_tdee(_as_array(state.daily_intake), _as_array(state.daily_weight_kg))
+        moved[user_id] = state
+    return moved
+
+
+def _write_adaptive_tdee(values):
+    """Set UserProfile.adaptive_tdee for each (value, user_id) pair in one prepared UPDATE."""
+    quote = connection.ops.quote_name
+    table = quote(UserProfile._meta.db_table)
+    column = quote(UserProfile._meta.get_field('adaptive_tdee').column)
+    user_column = quote(UserProfile._meta.get_field('user').column)
+    with connection.cursor() as cursor:
+        cursor.executemany(f"UPDATE {table} SET {column} = %s WHERE {user_column} = %s", values)
+
+
+def update_tdee_estimates(user_ids=None, today=None, batch_size=1000):
+    """
+    Advance the TDEE windows of the given users (default: everyone with a weight
+    history) to yesterday, the last complete day, and store the new estimates on
+    their profiles along with the recomputed calorie targets. Returns the number
+    of profiles whose estimate changed.
+    """
+    window_end = (today or timezone.localdate()) - dt.timedelta(days=1)
+    if user_ids is None:
+        user_ids = WeightEntry.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+    user_ids = list(user_ids)
+
+    changed = 0
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        states = {state.user_id: state for state in TdeeEstimate.objects.filter(user_id__in=chunk)}
+        moved = _advance(states, chunk, window_end)
+        if not moved:
+            continue
+
+        current = dict(UserProfile.objects.filter(user_id__in=moved).values_list('user_id', 'adaptive_tdee'))
+        updates = [
+            (state.tdee, user_id) for user_id, state in moved.items()
+            if user_id in current and current[user_id] != state.tdee
+        ]
+        with transaction.atomic():
+            TdeeEstimate.objects.bulk_create([state for state in moved.values() if state.pk is None])
+            TdeeEstimate.objects.bulk_update(
+                [state for user_id, state in moved.items() if user_id in states],
+                ['window_end', 'daily_intake', 'daily_weight_kg', 'tdee', 'updated_at'],
+            )
+            if updates:
+                _write_adaptive_tdee(updates)
+                # Also invalidates the cached dashboards of these users once this commits
+                recompute_calorie_targets(profiles=UserProfile.objects.filter(user_id__in=[user_id for tdee, user_id in updates]))
+        changed += len(updates)
+    return changed
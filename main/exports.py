@@ -0,0 +1,147 @@
+"""
+Streaming exports of a user's workout and nutrition history.
+
+Rows are produced by generators over `.iterator(chunk_size=...)` querysets with
+prefetching, so memory stays flat however long the history is and the response
+starts sending as soon as the first chunk is read.
+"""
+import csv
+import json
+
+from django.db.models import Prefetch
+
+from .models import Exercise, Food, Set
+
+EXPORT_CHUNK_SIZE = 500
+
+WORKOUT_CSV_COLUMNS = [
+    'workout_id', 'workout_number', 'title', 'day', 'duration', 'created_at',
+    'exercise', 'set_number', 'reps', 'weight', 'weight_unit', 'weight_kg',
+]
+
+MEAL_CSV_COLUMNS = [
+    'meal_id', 'meal', 'date_consumed', 'created_at',
+    'food', 'grams', 'calories_per_100g', 'carbs_per_100g', 'fat_per_100g', 'protein_per_100g',
+    'calories', 'carbs', 'fat', 'protein',
+]
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def workout_history(user):
+    """The user's workouts, oldest first, with exercises and sets prefetched chunk by chunk."""
+    return user.workouts.order_by('created_at', 'id').prefetch_related(
+        Prefetch('exercises', queryset=Exercise.objects.order_by('id').prefetch_related(
+            Prefetch('sets', queryset=Set.objects.order_by('set_number'))
+        ))
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def meal_history(user):
+    """The user's meals, oldest first, with foods prefetched chunk by chunk."""
+    return user.meals.order_by('date_consumed', 'created_at', 'id').prefetch_related(
+        Prefetch('foods', queryset=Food.objects.order_by('id'))
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def workout_rows(user):
+    """One CSV row per set; exercises without sets and workouts without exercises still get a row."""
+    yield WORKOUT_CSV_COLUMNS
+    for workout in workout_history(user):
+        workout_columns = [
+            workout.id, workout.workout_number, workout.title, _text(workout.day),
+            _text(workout.duration), workout.created_at.isoformat(),
+        ]
+        exercises = workout.exercises.all()
+        if not exercises:
+            yield workout_columns + [''] * 6
+        for exercise in exercises:
+            sets = exercise.sets.all()
+            if not sets:
+                yield workout_columns + [exercise.name] + [''] * 5
+            for workout_set in sets:
+                yield workout_columns + [
+                    exercise.name, workout_set.set_number, workout_set.reps,
+                    workout_set.weight, workout_set.weight_unit, workout_set.weight_kg,
+                ]
+
+
+def meal_rows(user):
+    """One CSV row per food; meals without foods still get a row."""
+    yield MEAL_CSV_COLUMNS
+    for meal in meal_history(user):
+        meal_columns = [meal.id, meal.name, _text(meal.date_consumed), meal.created_at.isoformat()]
+        foods = meal.foods.all()
+        if not foods:
+            yield meal_columns + [''] * 10
+        for food in foods:
+            yield meal_columns + [
+                food.name, food.grams,
+                food.calories_per_100g, food.carbs_per_100g, food.fat_per_100g, food.protein_per_100g,
+                food.total_calories, food.total_carbs, food.total_fat, food.total_protein,
+            ]
+
+
+def workout_documents(user):
+    """One nested JSON document per workout."""
+    for workout in workout_history(user):
+        yield {
+            'id': workout.id,
+            'workout_number': workout.workout_number,
+            'title': workout.title,
+            'day': workout.day,
+            'duration': _text(workout.duration) or None,
+            'created_at': workout.created_at.isoformat(),
+            'exercises': [{
+                'name': exercise.name,
+                'sets': [{
+                    'set_number': workout_set.set_number,
+                    'reps': workout_set.reps,
+                    'weight': _number(workout_set.weight),
+                    'weight_unit': workout_set.weight_unit,
+                    'weight_kg': _number(workout_set.weight_kg),
+                } for workout_set in exercise.sets.all()],
+            } for exercise in workout.exercises.all()],
+        }
+
+
+def meal_documents(user):
+    """One nested JSON document per meal."""
+    for meal in meal_history(user):
+        yield {
+            'id': meal.id,
+            'name': meal.name,
+            'date_consumed': meal.date_consumed.isoformat() if meal.date_consumed else None,
+            'created_at': meal.created_at.isoformat(),
+            'foods': [{
+                'name': food.name,
+                'grams': _number(food.grams),
+                'calories_per_100g': _number(food.calories_per_100g),
+                'carbs_per_100g': _number(food.carbs_per_100g),
+                'fat_per_100g': _number(food.fat_per_100g),
+                'protein_per_100g': _number(food.protein_per_100g),
+            } for food in meal.foods.all()],
+        }
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(documents):
+    for document in documents:
+        yield json.dumps(document) + '\n'
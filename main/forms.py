@@ -89,6 +89,26 @@ ExerciseFormSet = formset_factory(ExerciseForm, extra=1, can_delete=True)
 SetFormSet = formset_factory(SetForm, extra=1, can_delete=True)
 
 
+class WorkoutImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label='CSV export',
+        help_text='Exported from Strong, Hevy, FitNotes or a similar tracker',
+        widget=forms.FileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,text/csv'
+        })
+    )
+    weight_unit = forms.ChoiceField(
+        label='Weight unit',
+        choices=Set.WEIGHT_OPTIONS,
+        initial=Set.LBS,
+        help_text='Used when the file does not say which unit its weights are in',
+        widget=forms.Select(attrs={
+            'class': 'form-control'
+        })
+    )
+
+
 class UserProfileForm(forms.ModelForm):
     class Meta:
         model = UserProfile
@@ -312,5 +332,13 @@ class FoodForm(forms.ModelForm):
         }
 
 
+class EditFoodForm(FoodForm):
+    """FoodForm that carries the id of the Food it edits, so edits can be applied as a diff."""
+    food_id = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+
 # Create a formset for foods in a meal
-FoodFormSet = formset_factory(FoodForm, extra=1, can_delete=True)
\ No newline at end of file
+FoodFormSet = formset_factory(FoodForm, extra=1, can_delete=True)
+
+# Formset for editing the foods of an existing meal
+EditFoodFormSet = formset_factory(EditFoodForm, extra=1, can_delete=True)
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Bulk import of workout history from other lifting trackers' CSV exports.
+
+Rows (one per set) are grouped into workouts, exercises and sets and written
+with bulk_create, a batch of workouts per transaction. Workouts that already
+exist for the same date and title are skipped, and once everything is in,
+workout numbers are reassigned in date order.
+"""
+import csv
+import datetime as dt
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics
+from .models import Exercise, ExerciseDefinition, ExerciseSeries, Set, UserProfile, Workout, normalize_exercise_name
+
+# Header names used by common trackers (Strong, Hevy, FitNotes, ...), lowercased
+COLUMN_ALIASES = {
+    'date': ['date', 'start_time', 'start time', 'workout date'],
+    'title': ['workout name', 'title', 'workout', 'routine'],
+    'exercise': ['exercise name', 'exercise_title', 'exercise title', 'exercise'],
+    'set_order': ['set order', 'set_index', 'set index', 'set', 'set number'],
+    'weight': ['weight', 'weight_kg', 'weight (kgs)', 'weight (kg)', 'weight_lbs', 'weight (lbs)'],
+    'unit': ['unit', 'weight unit', 'weight_unit'],
+    'reps': ['reps', 'repetitions'],
+}
+REQUIRED_COLUMNS = ['date', 'exercise', 'reps']
+
+# Weight columns that carry their unit in the header
+UNIT_BY_WEIGHT_COLUMN = {
+    'weight_kg': Set.KG,
+    'weight (kgs)': Set.KG,
+    'weight (kg)': Set.KG,
+    'weight_lbs': Set.LBS,
+    'weight (lbs)': Set.LBS,
+}
+
+UNIT_ALIASES = {
+    'kg': Set.KG, 'kgs': Set.KG, 'kilograms': Set.KG,
+    'lb': Set.LBS, 'lbs': Set.LBS, 'pounds': Set.LBS,
+}
+
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%d %b %Y, %H:%M',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+]
+
+MAX_SET_WEIGHT = Decimal('9999.99')
+# Anything above this is a typo or a timed/distance value in the reps column
+MAX_SET_REPS = 1000
+DEFAULT_TITLE = 'Imported workout'
+
+
+class WorkoutImportError(ValueError):
+    """The file cannot be imported at all (as opposed to individual bad rows)."""
+
+
+def _column_map(fieldnames):
+    headers = {name.strip().lower(): name for name in fieldnames or []}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in headers:
+                columns[field] = headers[alias]
+                break
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise WorkoutImportError(f"Missing column(s): {', '.join(missing)}")
+    return columns
+
+
+def _parse_datetime(value):
+    value = (value or '').strip()
+    try:
+        parsed = dt.datetime.fromisoformat(value)
+    except ValueError:
+        parsed = None
+        for date_format in DATE_FORMATS:
+            try:
+                parsed = dt.datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_workouts(handle, default_unit=Set.LBS):
+    """
+    Group the CSV rows read from `handle` into workouts, oldest first.
+    Returns (workouts, skipped_rows) where each workout is a dict with
+    created_at, title and an ordered list of (exercise name, [set values]).
+    """
+    reader = csv.DictReader(handle)
+    columns = _column_map(reader.fieldnames)
+    header_unit = UNIT_BY_WEIGHT_COLUMN.get(columns.get('weight', '').strip().lower())
+
+    def value(row, field):
+        return (row.get(columns[field]) or '').strip() if field in columns else ''
+
+    workouts = {}
+    skipped = 0
+    for row in reader:
+        created_at = _parse_datetime(value(row, 'date'))
+        exercise_name = value(row, 'exercise')[:50]
+        try:
+            reps = int(Decimal(value(row, 'reps') or '0'))
+            weight = Decimal(value(row, 'weight') or '0').quantize(Decimal('0.01'))
+            set_order = int(Decimal(value(row, 'set_order') or '0'))
+        except (InvalidOperation, ValueError, OverflowError):
+            # Infinite values raise OverflowError from int(), NaN raises ValueError
+            created_at = None
+        # Cardio and timed rows come through with no reps; they have nowhere to go here
+        if (
+            created_at is None or not exercise_name or not (1 <= reps <= MAX_SET_REPS)
+            or not weight.is_finite() or not (0 <= weight <= MAX_SET_WEIGHT)
+        ):
+            skipped += 1
+            continue
+
+        unit = header_unit or UNIT_ALIASES.get(value(row, 'unit').lower(), default_unit)
+        title = value(row, 'title')[:100] or DEFAULT_TITLE
+
+        workout = workouts.setdefault((created_at, title), {
+            'created_at': created_at,
+            'title': title,
+            'exercises': defaultdict(list),
+        })
+        workout['exercises'][exercise_name].append((set_order, {'reps': reps, 'weight': weight, 'weight_unit': unit}))
+
+    parsed = sorted(workouts.values(), key=lambda workout: workout['created_at'])
+    for workout in parsed:
+        # sorted() is stable, so files without a set order column keep their row order
+        workout['exercises'] = [
+            (name, [set_values for set_order, set_values in sorted(sets, key=lambda item: item[0])])
+            for name, sets in workout['exercises'].items()
+        ]
+    return parsed, skipped
+
+
+def _write_batch(user, batch):
+    """Insert one batch of parsed workouts with their exercises, sets and series rows."""
+    workouts = [Workout(user=user, title=parsed['title'], workout_number=0) for parsed in batch]
+    Workout.objects.bulk_create(workouts)
+    # bulk_create lets auto_now_add overwrite created_at, so put the real dates back
+    for workout, parsed in zip(workouts, batch):
+        workout.created_at = parsed['created_at']
+    Workout.objects.bulk_update(workouts, ['created_at'])
+
+    definitions = ExerciseDefinition.objects.resolve(
+        name for parsed in batch for name, sets in parsed['exercises']
+    )
+    exercises_by_workout = []
+    for workout, parsed in zip(workouts, batch):
+        exercises_by_workout.append([
+            (Exercise(workout=workout, name=name, definition=definitions.get(normalize_exercise_name(name))), sets)
+            for name, sets in parsed['exercises']
+        ])
+    Exercise.objects.bulk_create([exercise for exercises in exercises_by_workout for exercise, sets in exercises])
+
+    new_sets = []
+    series = []
+    for workout, exercises in zip(workouts, exercises_by_workout):
+        for exercise, values in exercises:
+            sets = [Set(exercise=exercise, set_number=number, **set_values) for number, set_values in enumerate(values, start=1)]
+            for workout_set in sets:
+                workout_set.sync_weight_kg()
+            new_sets.extend(sets)
+            series.append(analytics.build_series(workout, exercise, sets))
+    Set.objects.bulk_create(new_sets)
+    ExerciseSeries.objects.bulk_create(series)
+    return len(new_sets), {row.exercise_key for row in series}
+
+
+def renumber_workouts(user):
+    """Reassign workout_number 1..n by date and move the profile counter to n."""
+    with transaction.atomic():
+        profile, created = UserProfile.objects.select_for_update().get_or_create(user=user)
+        workouts = list(user.workouts.order_by('created_at', 'id').only('id', 'workout_number'))
+        changed = []
+        for number, workout in enumerate(workouts, start=1):
+            if workout.workout_number != number:
+                workout.workout_number = number
+                changed.append(workout)
+        Workout.objects.bulk_update(changed, ['workout_number'], batch_size=500)
+        UserProfile.objects.filter(pk=profile.pk).update(last_workout_number=len(workouts))
+
+
+def import_workouts(user, handle, default_unit=Set.LBS, batch_size=200):
+    """
+    Import a tracker CSV for `user`. Returns counts of imported workouts and sets,
+    duplicate workouts skipped and unusable rows skipped.
+    """
+    parsed, skipped_rows = parse_workouts(handle, default_unit)
+
+    existing = {
+        (timezone.localdate(created_at), title)
+        for created_at, title in user.workouts.values_list('created_at', 'title').iterator()
+    }
+    new_workouts = []
+    for workout in parsed:
+        key = (timezone.localdate(workout['created_at']), workout['title'])
+        if key not in existing:
+            existing.add(key)
+            new_workouts.append(workout)
+
+    set_count = 0
+    exercise_keys = set()
+    for start in range(0, len(new_workouts), batch_size):
+        with transaction.atomic():
+            written, keys = _write_batch(user, new_workouts[start:start + batch_size])
+        set_count += written
+        exercise_keys |= keys
+
+    if new_workouts:
+        renumber_workouts(user)
+        analytics.recompute_personal_records(user.id, exercise_keys)
+        # bulk_create sends no signals, so clear the cached statistics and dashboard here
+        UserProfile.clear_workout_statistics(user.id)
+        UserProfile.bump_dashboard_generation(user.id)
+
+    return {
+        'workouts': len(new_workouts),
+        'sets': set_count,
+        'duplicates': len(parsed) - len(new_workouts),
+        'skipped_rows': skipped_rows,
+    }
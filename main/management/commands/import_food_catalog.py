@@ -0,0 +1,198 @@
+import csv
+import gzip
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main.models import FoodItem, normalize_food_name
+
+MACRO_FIELDS = ['calories_per_100g', 'carbs_per_100g', 'fat_per_100g', 'protein_per_100g']
+
+# Largest value the per-100g DecimalFields (max_digits=6, decimal_places=2) can hold
+MAX_MACRO_VALUE = Decimal('9999.99')
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a food-composition dataset (CSV or JSON Lines, optionally gzipped) into the "
+        "FoodItem catalog using batched upserts. Re-running updates existing items in place."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file; .gz files are decompressed on the fly')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='Input format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--source',
+            help='Dataset label stored on each item (default: the file name without extensions)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows written per transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--column',
+            action='append',
+            default=[],
+            metavar='FIELD=COLUMN',
+            help='Map a catalog field (name, external_id, calories_per_100g, ...) to an input column. Repeatable.',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the rows committed by a previous, interrupted run of the same file',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        input_format = options['format'] or self.guess_format(path)
+        source = options['source'] or path.name.split('.')[0]
+        columns = self.parse_column_map(options['column'])
+        checkpoint_path = path.with_name(path.name + '.checkpoint')
+
+        skip_rows = 0
+        if options['resume'] and checkpoint_path.exists():
+            skip_rows = int(checkpoint_path.read_text().strip() or 0)
+            self.stdout.write(f"Resuming after row {skip_rows}.")
+
+        rows_read = skip_rows
+        imported = 0
+        skipped = 0
+        started = time.monotonic()
+        batch = []
+
+        for row_number, row in enumerate(self.read_rows(path, input_format), start=1):
+            if row_number <= skip_rows:
+                continue
+            rows_read = row_number
+
+            item = self.build_item(row, columns, source)
+            if item is None:
+                skipped += 1
+            else:
+                batch.append(item)
+
+            if len(batch) >= options['batch_size']:
+                imported += self.write_batch(batch)
+                batch = []
+                self.save_checkpoint(checkpoint_path, rows_read)
+                self.report_progress(rows_read, imported, skipped, started)
+
+        if batch:
+            imported += self.write_batch(batch)
+        self.save_checkpoint(checkpoint_path, rows_read)
+        self.report_progress(rows_read, imported, skipped, started)
+
+        # The whole file made it in, so the next run starts from scratch
+        checkpoint_path.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} food items from {path.name} ({skipped} invalid rows skipped)."
+        ))
+
+    def guess_format(self, path):
+        suffixes = [suffix for suffix in path.suffixes if suffix != '.gz']
+        if suffixes and suffixes[-1] in ('.jsonl', '.ndjson', '.json'):
+            return 'jsonl'
+        if suffixes and suffixes[-1] in ('.csv', '.tsv'):
+            return 'csv'
+        raise CommandError(f"Cannot guess the format of {path.name}; pass --format csv or --format jsonl")
+
+    def parse_column_map(self, mappings):
+        columns = {field: field for field in ['name', 'external_id', *MACRO_FIELDS]}
+        for mapping in mappings:
+            field, separator, column = mapping.partition('=')
+            if not separator or field not in columns:
+                raise CommandError(f"Invalid --column '{mapping}'; expected FIELD=COLUMN with FIELD one of {', '.join(columns)}")
+            columns[field] = column
+        return columns
+
+    def open_text(self, path):
+        if path.suffix == '.gz':
+            return gzip.open(path, 'rt', encoding='utf-8', newline='')
+        return open(path, 'r', encoding='utf-8', newline='')
+
+    def read_rows(self, path, input_format):
+        """Yield one dict per input row without reading the whole file into memory."""
+        with self.open_text(path) as handle:
+            if input_format == 'csv':
+                dialect = 'excel-tab' if '.tsv' in path.suffixes else 'excel'
+                yield from csv.DictReader(handle, dialect=dialect)
+            else:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        record = None
+                    # Yield something for bad lines too so row numbers stay stable for --resume
+                    yield record if isinstance(record, dict) else {}
+
+    def build_item(self, row, columns, source):
+        """Turn an input row into an unsaved FoodItem, or None if the row is unusable."""
+        name = str(row.get(columns['name']) or '').strip()[:200]
+        normalized_name = normalize_food_name(name)
+        if not normalized_name:
+            return None
+
+        macros = {}
+        for field in MACRO_FIELDS:
+            value = row.get(columns[field])
+            try:
+                value = Decimal(str(value)).quantize(Decimal('0.01')) if value not in (None, '') else Decimal('0')
+            except InvalidOperation:
+                return None
+            if not value.is_finite() or value < 0 or value > MAX_MACRO_VALUE:
+                return None
+            macros[field] = value
+
+        # Without an id column, items are deduplicated by normalized name within the source
+        external_id = str(row.get(columns['external_id']) or '').strip()[:100] or normalized_name[:100]
+
+        return FoodItem(
+            name=name,
+            normalized_name=normalized_name,
+            source=source,
+            external_id=external_id,
+            **macros,
+        )
+
+    def write_batch(self, batch):
+        # Later rows win when a batch repeats an external id, as with sequential upserts
+        unique_batch = list({item.external_id: item for item in batch}.values())
+        with transaction.atomic():
+            FoodItem.objects.bulk_create(
+                unique_batch,
+                update_conflicts=True,
+                unique_fields=['source', 'external_id'],
+                update_fields=['name', 'normalized_name', *MACRO_FIELDS],
+            )
+        return len(unique_batch)
+
+    def save_checkpoint(self, checkpoint_path, rows_read):
+        temporary_path = checkpoint_path.with_name(checkpoint_path.name + '.tmp')
+        temporary_path.write_text(str(rows_read))
+        os.replace(temporary_path, checkpoint_path)
+
+    def report_progress(self, rows_read, imported, skipped, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"{rows_read} rows read, {imported} imported, {skipped} skipped "
+            f"({imported / elapsed:,.0f} rows/s)"
+        )
@@ -0,0 +1,55 @@
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from main.importers import WorkoutImportError, import_workouts
+from main.models import Set
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a user's workout history from another tracker's CSV export "
+        "(date, workout name, exercise, set order, weight, unit, reps). "
+        "Workouts already present for the same date and title are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User to import the workouts for')
+        parser.add_argument('path', help='CSV file exported from the other tracker')
+        parser.add_argument(
+            '--unit',
+            choices=[Set.LBS, Set.KG],
+            default=Set.LBS,
+            help='Weight unit for files that do not say (default: Lbs)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Workouts written per transaction (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+
+        started = time.monotonic()
+        with open(path, 'r', encoding='utf-8-sig', newline='') as handle:
+            try:
+                result = import_workouts(user, handle, default_unit=options['unit'], batch_size=options['batch_size'])
+            except WorkoutImportError as error:
+                raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['workouts']} workouts ({result['sets']} sets) in {time.monotonic() - started:.1f}s; "
+            f"skipped {result['duplicates']} existing workouts and {result['skipped_rows']} unusable rows."
+        ))
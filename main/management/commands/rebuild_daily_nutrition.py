@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from main.models import DailyNutrition
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyNutrition rollup table from scratch using all logged meals."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows to insert per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        created = DailyNutrition.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily nutrition rows."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main import analytics
+from main.models import ExerciseSeries, PersonalRecord, Workout
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the ExerciseSeries analytics table from every stored workout, exercise and set, "
+        "and the PersonalRecord rows from the rebuilt series."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Only rebuild the series of this user id',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of series rows to insert per query (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        workouts = Workout.objects.order_by('id')
+        series = ExerciseSeries.objects.all()
+        records = PersonalRecord.objects.all()
+        if options['user']:
+            workouts = workouts.filter(user_id=options['user'])
+            series = series.filter(user_id=options['user'])
+            records = records.filter(user_id=options['user'])
+
+        with transaction.atomic():
+            series.delete()
+            created = analytics.rebuild_series(workouts, batch_size=options['batch_size'])
+            # Records of exercises that no longer have any sessions go too
+            records.delete()
+            record_count = analytics.rebuild_personal_records(series)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {created} exercise series rows and {record_count} personal records."
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.calorie_targets import recompute_calorie_targets
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored BMR, TDEE and daily/weekly/monthly calorie targets of every "
+        "profile in vectorized batches. Meant to run nightly; requires NumPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20000,
+            help='Profiles computed per batch (default: 20000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError("NumPy is required: pip install numpy")
+
+        started = time.monotonic()
+        updated = recompute_calorie_targets(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed calorie targets for {updated} profiles in {time.monotonic() - started:.1f}s."
+        ))
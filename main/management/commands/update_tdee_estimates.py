@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.energy_balance import update_tdee_estimates
+
+
+class Command(BaseCommand):
+    help = (
+        "Advance every user's adaptive TDEE window to yesterday and refresh the calorie "
+        "targets of the profiles whose estimate changed. Meant to run daily; requires NumPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users processed per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError("NumPy is required: pip install numpy")
+
+        started = time.monotonic()
+        changed = update_tdee_estimates(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated the adaptive TDEE of {changed} profiles in {time.monotonic() - started:.1f}s."
+        ))
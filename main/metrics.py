@@ -0,0 +1,218 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+RequestMetricsMiddleware times each request and labels it with the resolved URL
+name (main:homepage, main:meal_tracking, ...). Database queries are counted and
+timed by a connection execute wrapper, and template rendering by the template
+backend below; both report to the current request through a context variable,
+so queries run in sync_to_async worker threads are attributed to their request.
+
+The registry is shared by every thread of the process. Each worker process
+keeps its own counters, so with several processes scrape each one (or sum them).
+"""
+import contextvars
+import threading
+import time
+
+from django.template.backends.django import DjangoTemplates
+
+# Upper bounds in seconds, Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# A view whose query count keeps growing with the data shows up in the higher buckets
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class RequestStats:
+    """Queries and template time of one request; updated from any thread serving it."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def add_query(self, seconds):
+        with self.lock:
+            self.queries += 1
+            self.query_seconds += seconds
+
+    def add_template(self, seconds):
+        with self.lock:
+            self.template_seconds += seconds
+
+
+_current_request = contextvars.ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+        yield '+Inf', self.count
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.responses = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_seconds = 0.0
+        self.template = Histogram(LATENCY_BUCKETS)
+
+
+class MetricsRegistry:
+    """Per-view metrics of this process, safe to update from any thread."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view, method, status, seconds, stats):
+        with self.lock:
+            metrics = self.views.get(view)
+            if metrics is None:
+                metrics = self.views[view] = ViewMetrics()
+            key = (method, str(status))
+            metrics.responses[key] = metrics.responses.get(key, 0) + 1
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(stats.queries)
+            metrics.query_seconds += stats.query_seconds
+            if stats.template_seconds:
+                metrics.template.observe(stats.template_seconds)
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def exposition(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+
+            lines += [
+                '# HELP app_http_requests_total Requests handled, by view, method and status.',
+                '# TYPE app_http_requests_total counter',
+            ]
+            for view, metrics in views:
+                for (method, status), count in sorted(metrics.responses.items()):
+                    lines.append(f'app_http_requests_total{_labels(view=view, method=method, status=status)} {count}')
+
+            lines += _histogram_lines(
+                'app_http_request_duration_seconds', 'Request latency in seconds, by view.',
+                [(view, metrics.latency) for view, metrics in views],
+            )
+            lines += _histogram_lines(
+                'app_db_queries_per_request', 'Database queries per request, by view.',
+                [(view, metrics.queries) for view, metrics in views],
+            )
+
+            lines += [
+                '# HELP app_db_query_duration_seconds_total Time spent in database queries, by view.',
+                '# TYPE app_db_query_duration_seconds_total counter',
+            ]
+            for view, metrics in views:
+                lines.append(f'app_db_query_duration_seconds_total{_labels(view=view)} {metrics.query_seconds:.6f}')
+
+            lines += _histogram_lines(
+                'app_template_render_duration_seconds', 'Template render time per request in seconds, by view.',
+                [(view, metrics.template) for view, metrics in views if metrics.template.count],
+            )
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram_lines(name, description, histograms):
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+    for view, histogram in histograms:
+        for bound, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{_labels(view=view, le=bound)} {count}')
+        lines.append(f'{name}_sum{_labels(view=view)} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{_labels(view=view)} {histogram.count}')
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+def start_request():
+    """Start collecting for the current request; returns (stats, token for finish_request)."""
+    stats = RequestStats()
+    return stats, _current_request.set(stats)
+
+
+def finish_request(request, response, started, stats, token):
+    _current_request.reset(token)
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match is not None else UNRESOLVED_VIEW
+    registry.record(view, request.method, response.status_code, time.perf_counter() - started, stats)
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper: times the query for the request being served, if any."""
+    stats = _current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - started)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver; wrappers outlive reconnects, so add it only once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    """A backend template whose render() time is added to the current request's stats."""
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current_request.get()
+        if stats is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.add_template(time.perf_counter() - started)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time reported to the request metrics."""
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
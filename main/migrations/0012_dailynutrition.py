@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_daily_nutrition(apps, schema_editor):
+    Meal = apps.get_model('main', 'Meal')
+    DailyNutrition = apps.get_model('main', 'DailyNutrition')
+
+    def macro_total(macro):
+        return Coalesce(
+            Sum(
+                ExpressionWrapper(
+                    F(f'foods__{macro}_per_100g') * F('foods__grams') / Value(100.0),
+                    output_field=DecimalField(),
+                ),
+                output_field=DecimalField(max_digits=12, decimal_places=4),
+            ),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=4),
+        )
+
+    totals = (
+        Meal.objects.filter(date_consumed__isnull=False)
+        .order_by()
+        .values('user_id', 'date_consumed')
+        .annotate(
+            meal_count=Count('id', distinct=True),
+            calories=macro_total('calories'),
+            carbs=macro_total('carbs'),
+            fat=macro_total('fat'),
+            protein=macro_total('protein'),
+        )
+    )
+    DailyNutrition.objects.bulk_create(
+        [
+            DailyNutrition(
+                user_id=total['user_id'],
+                date=total['date_consumed'],
+                meal_count=total['meal_count'],
+                calories=total['calories'],
+                carbs=total['carbs'],
+                fat=total['fat'],
+                protein=total['protein'],
+            )
+            for total in totals.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_goal_starting_value'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutrition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('carbs', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fat', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('protein', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('meal_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_nutrition', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_nutrition, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:15
+
+import django.core.validators
+from django.db import migrations, models
+
+FTS_TABLE = 'main_fooditem_fts'
+
+CREATE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        normalized_name, content='main_fooditem', content_rowid='id', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON main_fooditem BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, normalized_name) VALUES (new.id, new.normalized_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON main_fooditem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name) VALUES ('delete', old.id, old.normalized_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF normalized_name ON main_fooditem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name) VALUES ('delete', old.id, old.normalized_name);
+        INSERT INTO {FTS_TABLE}(rowid, normalized_name) VALUES (new.id, new.normalized_name);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_FTS_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_fts_index(apps, schema_editor):
+    """Word-prefix index over FoodItem.normalized_name. SQLite only; other backends use the B-tree index."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+            return
+    for statement in CREATE_FTS_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_dailynutrition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('normalized_name', models.CharField(editable=False, max_length=200)),
+                ('calories_per_100g', models.DecimalField(decimal_places=2, default=0, max_digits=6, validators=[django.core.validators.MinValueValidator(0)])),
+                ('carbs_per_100g', models.DecimalField(decimal_places=2, default=0, max_digits=6, validators=[django.core.validators.MinValueValidator(0)])),
+                ('fat_per_100g', models.DecimalField(decimal_places=2, default=0, max_digits=6, validators=[django.core.validators.MinValueValidator(0)])),
+                ('protein_per_100g', models.DecimalField(decimal_places=2, default=0, max_digits=6, validators=[django.core.validators.MinValueValidator(0)])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['normalized_name'],
+                'indexes': [models.Index(fields=['normalized_name'], name='fooditem_normalized_name_idx')],
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
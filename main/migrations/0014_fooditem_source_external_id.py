@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:16
+
+from django.db import migrations, models
+
+FTS_TABLE = 'main_fooditem_fts'
+
+# SQLite rebuilds main_fooditem to add the unique constraint, which drops the
+# FTS sync triggers created in 0013_fooditem along with the old table.
+RECREATE_FTS_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON main_fooditem BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, normalized_name) VALUES (new.id, new.normalized_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON main_fooditem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name) VALUES ('delete', old.id, old.normalized_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF normalized_name ON main_fooditem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name) VALUES ('delete', old.id, old.normalized_name);
+        INSERT INTO {FTS_TABLE}(rowid, normalized_name) VALUES (new.id, new.normalized_name);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def recreate_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    if FTS_TABLE not in schema_editor.connection.introspection.table_names():
+        return
+    for statement in RECREATE_FTS_TRIGGERS_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_fooditem'),
+    ]
+
+    operations = [
+        # Restores the triggers when migrating backwards past this migration
+        migrations.RunPython(migrations.RunPython.noop, recreate_fts_triggers),
+        migrations.AddField(
+            model_name='fooditem',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='source',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='fooditem',
+            constraint=models.UniqueConstraint(fields=('source', 'external_id'), name='unique_fooditem_source_external_id'),
+        ),
+        migrations.RunPython(recreate_fts_triggers, migrations.RunPython.noop),
+    ]
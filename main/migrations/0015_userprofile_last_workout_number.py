@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:19
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_workout_counters(apps, schema_editor):
+    """Start each user's counter at their highest existing workout_number."""
+    UserProfile = apps.get_model('main', 'UserProfile')
+    Workout = apps.get_model('main', 'Workout')
+
+    highest = Workout.objects.order_by().values('user_id').annotate(highest=Max('workout_number'))
+    for row in highest.iterator():
+        UserProfile.objects.update_or_create(
+            user_id=row['user_id'],
+            defaults={'last_workout_number': row['highest'] or 0},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_fooditem_source_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_workout_number',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(seed_workout_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_userprofile_last_workout_number'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_name', models.CharField(max_length=50)),
+                ('exercise_key', models.CharField(help_text='Normalized exercise name used to group sessions', max_length=50)),
+                ('performed_at', models.DateTimeField()),
+                ('set_count', models.PositiveIntegerField(default=0)),
+                ('total_reps', models.PositiveIntegerField(default=0)),
+                ('tonnage_kg', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('best_set_weight_kg', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('best_set_reps', models.PositiveIntegerField(default=0)),
+                ('estimated_1rm_epley_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('estimated_1rm_brzycki_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('exercise', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='main.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_series', to=settings.AUTH_USER_MODEL)),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_series', to='main.workout')),
+            ],
+            options={
+                'ordering': ['performed_at'],
+                'indexes': [models.Index(fields=['user', 'exercise_key', 'performed_at'], name='series_user_exercise_date_idx')],
+            },
+        ),
+    ]
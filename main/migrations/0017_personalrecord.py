@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_exerciseseries'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_key', models.CharField(max_length=50)),
+                ('exercise_name', models.CharField(max_length=50)),
+                ('heaviest_weight_kg', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('best_1rm_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('best_volume_kg', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('reps_at_weight', models.JSONField(blank=True, default=dict)),
+                ('achieved_at', models.DateTimeField(blank=True, help_text='When any of these records was last beaten', null=True)),
+                ('best_1rm_workout', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.workout')),
+                ('best_volume_workout', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.workout')),
+                ('heaviest_workout', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.workout')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['exercise_key'],
+                'unique_together': {('user', 'exercise_key')},
+            },
+        ),
+    ]
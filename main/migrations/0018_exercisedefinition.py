@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:25
+
+import django.db.models.deletion
+from django.conf import settings
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def normalize_exercise_name(name):
+    return re.sub(r'\s+', ' ', (name or '').strip().lower())
+
+
+def link_exercise_definitions(apps, schema_editor):
+    """Create one catalog definition per distinct normalized name and link existing rows to it."""
+    Exercise = apps.get_model('main', 'Exercise')
+    ExerciseDefinition = apps.get_model('main', 'ExerciseDefinition')
+    ExerciseSeries = apps.get_model('main', 'ExerciseSeries')
+
+    ids_by_key = defaultdict(list)
+    names_by_key = {}
+    for exercise_id, name in Exercise.objects.order_by('id').values_list('id', 'name').iterator():
+        key = normalize_exercise_name(name)
+        if key:
+            ids_by_key[key].append(exercise_id)
+            names_by_key.setdefault(key, name.strip())
+
+    ExerciseDefinition.objects.bulk_create(
+        [ExerciseDefinition(name=name, normalized_name=key) for key, name in names_by_key.items()],
+        batch_size=BATCH_SIZE,
+    )
+    for definition in ExerciseDefinition.objects.all():
+        exercise_ids = ids_by_key.get(definition.normalized_name, [])
+        for start in range(0, len(exercise_ids), BATCH_SIZE):
+            Exercise.objects.filter(id__in=exercise_ids[start:start + BATCH_SIZE]).update(definition=definition)
+        ExerciseSeries.objects.filter(exercise_key=definition.normalized_name).update(definition=definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_personalrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseDefinition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('normalized_name', models.CharField(editable=False, max_length=50, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['normalized_name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='exerciseseries',
+            name='exercise_key',
+            field=models.CharField(help_text='Normalized catalog name used to group sessions', max_length=50),
+        ),
+        migrations.CreateModel(
+            name='ExerciseAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('normalized_alias', models.CharField(editable=False, max_length=50, unique=True)),
+                ('definition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='main.exercisedefinition')),
+            ],
+            options={
+                'verbose_name_plural': 'exercise aliases',
+                'ordering': ['normalized_alias'],
+            },
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='definition',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='exercises', to='main.exercisedefinition'),
+        ),
+        migrations.AddField(
+            model_name='exerciseseries',
+            name='definition',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='series', to='main.exercisedefinition'),
+        ),
+        migrations.AddIndex(
+            model_name='exerciseseries',
+            index=models.Index(fields=['user', 'definition', 'performed_at'], name='series_user_def_date_idx'),
+        ),
+        migrations.RunPython(link_exercise_definitions, migrations.RunPython.noop),
+    ]
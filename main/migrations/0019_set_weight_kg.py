@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:26
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Round
+
+KG_PER_LB = Decimal('0.453592')
+
+
+def fill_weight_kg(apps, schema_editor):
+    """Convert every existing set in two UPDATE statements, one per unit."""
+    Set = apps.get_model('main', 'Set')
+    Set.objects.filter(weight_unit='Kg').update(weight_kg=F('weight'))
+    Set.objects.filter(weight_unit='Lbs').update(weight_kg=Round(
+        ExpressionWrapper(
+            F('weight') * Value(KG_PER_LB),
+            output_field=DecimalField(max_digits=12, decimal_places=6),
+        ),
+        2,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_exercisedefinition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='set',
+            name='weight_kg',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+        ),
+        migrations.RunPython(fill_weight_kg, migrations.RunPython.noop),
+    ]
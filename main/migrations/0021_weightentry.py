@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:52
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+KG_PER_LB = Decimal('0.453592')
+
+
+def seed_weight_history(apps, schema_editor):
+    """Start each profile's history with its current weight, which is also the first trend value."""
+    UserProfile = apps.get_model('main', 'UserProfile')
+    WeightEntry = apps.get_model('main', 'WeightEntry')
+    profiles = UserProfile.objects.filter(current_weight__gt=0).only('id', 'user_id', 'current_weight', 'weight_unit', 'updated_at')
+    batch = []
+    for profile in profiles.iterator(chunk_size=2000):
+        weight_kg = profile.current_weight * KG_PER_LB if profile.weight_unit == 'Lbs' else profile.current_weight
+        batch.append(WeightEntry(
+            user_id=profile.user_id,
+            measured_at=profile.updated_at,
+            weight_kg=weight_kg.quantize(Decimal('0.01')),
+            trend_kg=float(weight_kg),
+        ))
+        if len(batch) >= 2000:
+            WeightEntry.objects.bulk_create(batch)
+            batch = []
+    WeightEntry.objects.bulk_create(batch)
+    # The trend of a single weigh-in is the weigh-in, so the stored calorie targets stay as they are
+    UserProfile.objects.filter(current_weight__gt=0).update(weight_trend_kg=Subquery(
+        WeightEntry.objects.filter(user_id=OuterRef('user_id')).values('trend_kg')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_userprofile_calorie_targets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='weight_trend_kg',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='WeightEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('measured_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('weight_kg', models.DecimalField(decimal_places=2, max_digits=6, validators=[django.core.validators.MinValueValidator(0)])),
+                ('trend_kg', models.FloatField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weight_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'weight entries',
+                'ordering': ['measured_at'],
+                'indexes': [models.Index(fields=['user', 'measured_at'], name='weightentry_user_date_idx')],
+            },
+        ),
+        migrations.RunPython(seed_weight_history, migrations.RunPython.noop),
+    ]
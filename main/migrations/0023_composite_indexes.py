@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_tdeeestimate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'is_active', 'created_at'], name='goal_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'date_consumed', 'created_at'], name='meal_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalrecord',
+            index=models.Index(fields=['user', 'achieved_at'], name='record_user_achieved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progresspicture',
+            index=models.Index(fields=['user', 'date_taken', 'created_at'], name='progresspic_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workout',
+            index=models.Index(fields=['user', 'created_at'], name='workout_user_created_idx'),
+        ),
+    ]
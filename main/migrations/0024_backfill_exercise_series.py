@@ -0,0 +1,107 @@
+import re
+from decimal import Decimal
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+TWO_PLACES = Decimal('0.01')
+
+# Brzycki's formula divides by (37 - reps), so it is undefined from 37 reps up
+BRZYCKI_MAX_REPS = 36
+
+
+def normalize_exercise_name(name):
+    return re.sub(r'\s+', ' ', (name or '').strip().lower())
+
+
+def _quantize(value):
+    return value.quantize(TWO_PLACES) if value is not None else None
+
+
+def summarize_sets(sets):
+    """Session stats of one exercise, as main.analytics.summarize_sets computed them at this point."""
+    summary = {
+        'set_count': 0,
+        'total_reps': 0,
+        'tonnage_kg': Decimal('0'),
+        'best_set_weight_kg': Decimal('0'),
+        'best_set_reps': 0,
+        'estimated_1rm_epley_kg': None,
+        'estimated_1rm_brzycki_kg': None,
+    }
+    best_key = None
+
+    for workout_set in sets:
+        weight_kg = workout_set.weight_kg
+        reps = workout_set.reps
+
+        summary['set_count'] += 1
+        summary['total_reps'] += reps
+        summary['tonnage_kg'] += weight_kg * reps
+
+        epley = brzycki = None
+        if reps >= 1 and weight_kg > 0:
+            epley = weight_kg if reps == 1 else weight_kg * (1 + Decimal(reps) / 30)
+            if reps <= BRZYCKI_MAX_REPS:
+                brzycki = weight_kg * 36 / (37 - Decimal(reps))
+        if epley is not None and (summary['estimated_1rm_epley_kg'] is None or epley > summary['estimated_1rm_epley_kg']):
+            summary['estimated_1rm_epley_kg'] = epley
+        if brzycki is not None and (summary['estimated_1rm_brzycki_kg'] is None or brzycki > summary['estimated_1rm_brzycki_kg']):
+            summary['estimated_1rm_brzycki_kg'] = brzycki
+
+        key = (epley or Decimal('0'), weight_kg, reps)
+        if reps > 0 and (best_key is None or key > best_key):
+            best_key = key
+            summary['best_set_weight_kg'] = weight_kg
+            summary['best_set_reps'] = reps
+
+    for field in ('tonnage_kg', 'best_set_weight_kg', 'estimated_1rm_epley_kg', 'estimated_1rm_brzycki_kg'):
+        summary[field] = _quantize(summary[field])
+    return summary
+
+
+def backfill_exercise_series(apps, schema_editor):
+    """
+    Build the series rows of every exercise stored before ExerciseSeries existed.
+    Exercises that already have a row are left alone; `manage.py rebuild_exercise_series`
+    recomputes everything on demand.
+    """
+    Exercise = apps.get_model('main', 'Exercise')
+    ExerciseSeries = apps.get_model('main', 'ExerciseSeries')
+
+    exercises = (
+        Exercise.objects.filter(series__isnull=True)
+        .select_related('workout', 'definition')
+        .prefetch_related('sets')
+        .order_by('id')
+    )
+    batch = []
+    for exercise in exercises.iterator(chunk_size=BATCH_SIZE):
+        workout = exercise.workout
+        batch.append(ExerciseSeries(
+            user_id=workout.user_id,
+            workout=workout,
+            exercise=exercise,
+            definition_id=exercise.definition_id,
+            exercise_name=exercise.name.strip(),
+            exercise_key=exercise.definition.normalized_name if exercise.definition_id else normalize_exercise_name(exercise.name),
+            performed_at=workout.created_at,
+            **summarize_sets(exercise.sets.all()),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            ExerciseSeries.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ExerciseSeries.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_exercise_series, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,86 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+
+TWO_PLACES = Decimal('0.01')
+
+
+def backfill_personal_records(apps, schema_editor):
+    """
+    Compute the records of every (user, exercise) that has sessions but no record
+    yet, from the series backfilled by 0024, so the next workout is only a PR where
+    it beats history. Existing records are left alone; `manage.py
+    rebuild_exercise_series` recomputes everything on demand.
+    """
+    ExerciseSeries = apps.get_model('main', 'ExerciseSeries')
+    PersonalRecord = apps.get_model('main', 'PersonalRecord')
+
+    existing = set(PersonalRecord.objects.values_list('user_id', 'exercise_key'))
+    keys_by_user = defaultdict(set)
+    for user_id, exercise_key in ExerciseSeries.objects.order_by().values_list('user_id', 'exercise_key').distinct():
+        if (user_id, exercise_key) not in existing:
+            keys_by_user[user_id].add(exercise_key)
+
+    for user_id, exercise_keys in keys_by_user.items():
+        sessions = (
+            ExerciseSeries.objects.filter(user_id=user_id, exercise_key__in=exercise_keys)
+            .select_related('workout')
+            .prefetch_related('exercise__sets')
+            .order_by('exercise_key', 'performed_at', 'id')
+        )
+        records = {}
+        for series_row in sessions:
+            record = records.get(series_row.exercise_key)
+            if record is None:
+                record = records[series_row.exercise_key] = PersonalRecord(
+                    user_id=user_id,
+                    exercise_key=series_row.exercise_key,
+                    exercise_name=series_row.exercise_name,
+                )
+            _apply_session(record, series_row.workout, series_row, series_row.exercise.sets.all())
+        PersonalRecord.objects.bulk_create(records.values())
+
+
+def _apply_session(record, workout, series_row, sets):
+    """Fold one exercise session into a record, as main.analytics did at this point."""
+    improved = False
+
+    heaviest = max((workout_set.weight_kg for workout_set in sets if workout_set.reps > 0), default=None)
+    if heaviest is not None and heaviest > record.heaviest_weight_kg:
+        record.heaviest_weight_kg = heaviest
+        record.heaviest_workout_id = workout.id
+        improved = True
+
+    best_1rm = series_row.estimated_1rm_epley_kg
+    if best_1rm is not None and (record.best_1rm_kg is None or best_1rm > record.best_1rm_kg):
+        record.best_1rm_kg = best_1rm
+        record.best_1rm_workout_id = workout.id
+        improved = True
+
+    if series_row.tonnage_kg > record.best_volume_kg:
+        record.best_volume_kg = series_row.tonnage_kg
+        record.best_volume_workout_id = workout.id
+        improved = True
+
+    for workout_set in sets:
+        if workout_set.reps < 1:
+            continue
+        key = str(workout_set.weight_kg.quantize(TWO_PLACES))
+        if workout_set.reps > record.reps_at_weight.get(key, [0, None])[0]:
+            record.reps_at_weight[key] = [workout_set.reps, workout.id]
+            improved = True
+
+    if improved:
+        record.achieved_at = workout.created_at
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0024_backfill_exercise_series'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_personal_records, migrations.RunPython.noop, elidable=True),
+    ]
@@ -1,6 +1,58 @@
-from django.db import models
+import datetime as dt
+import functools
+import re
+import time
+import unicodedata
+from decimal import Decimal
+
+from django.db import DatabaseError, connections, models, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+KG_PER_LB = Decimal('0.453592')
+
+# Weight trend smoothing: the share of a weigh-in's deviation from the trend kept per day
+# (the 10% exponential moving average popularized by The Hacker's Diet)
+WEIGHT_TREND_DAILY_ALPHA = 0.1
+
+# Days covered by the workout calendar heatmap, ending today
+HEATMAP_DAYS = 365
+
+# Cached workout statistics are keyed by date, so a day is the longest they are useful
+WORKOUT_STATISTICS_CACHE_SECONDS = 24 * 60 * 60
+
+# Recent personal records listed on the dashboard
+RECENT_RECORD_DAYS = 30
+RECENT_RECORD_LIMIT = 5
+
+# Profile fields the derived calorie metrics are computed from
+METRIC_INPUT_FIELDS = (
+    'age', 'current_weight', 'gender', 'activity_level', 'target_weight', 'weight_loss_rate', 'weight_unit',
+    'weight_trend_kg', 'adaptive_tdee',
+)
+
+
+def memoized_metric(method):
+    """
+    Cache a derived UserProfile metric on the instance, per argument list.
+    Cached values are dropped as soon as one of METRIC_INPUT_FIELDS changes and on save().
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        values = self._metric_values()
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        if key in values:
+            self._metric_state['hits'] += 1
+            return values[key]
+        self._metric_state['misses'] += 1
+        values[key] = result = method(self, *args, **kwargs)
+        return result
+    return wrapper
+
 
 # Create your models here.
 
@@ -50,17 +102,126 @@ class UserProfile(models.Model):
     ]
     
     weight_unit = models.CharField(max_length=3, choices=WEIGHT_UNIT_CHOICES, default=LBS)
+    
+    # Highest workout_number handed out so far, incremented atomically by claim_workout_number()
+    last_workout_number = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Smoothed body weight from the WeightEntry history, updated with each new entry
+    weight_trend_kg = models.FloatField(null=True, blank=True, editable=False)
+    
+    # TDEE fitted from logged intake and the weight trend (main.energy_balance), once there is enough data
+    adaptive_tdee = models.FloatField(null=True, blank=True, editable=False)
+    
+    # Stored results of the BMR → TDEE → target chain. save() keeps them current and
+    # main.calorie_targets recomputes them for every profile in one batch.
+    bmr = models.FloatField(null=True, blank=True, editable=False)
+    tdee = models.FloatField(null=True, blank=True, editable=False)
+    daily_calorie_target = models.FloatField(null=True, blank=True, editable=False)
+    weekly_calorie_target = models.FloatField(null=True, blank=True, editable=False)
+    monthly_calorie_target = models.FloatField(null=True, blank=True, editable=False)
+    calorie_targets_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    CALORIE_TARGET_FIELDS = [
+        'bmr', 'tdee', 'daily_calorie_target', 'weekly_calorie_target',
+        'monthly_calorie_target', 'calorie_targets_updated_at',
+    ]
+    
+    def _metric_values(self):
+        """The memoized metric values, emptied first if an input field changed since they were stored."""
+        inputs = tuple(getattr(self, field) for field in METRIC_INPUT_FIELDS)
+        state = self.__dict__.setdefault('_metric_state', {'inputs': inputs, 'values': {}, 'hits': 0, 'misses': 0})
+        if state['inputs'] != inputs:
+            state['inputs'] = inputs
+            state['values'] = {}
+        return state['values']
+    
+    def clear_metric_cache(self):
+        self._metric_values().clear()
+    
+    def metric_cache_info(self):
+        """Hit/miss counters of the memoized metrics on this instance."""
+        self._metric_values()
+        state = self._metric_state
+        return {'hits': state['hits'], 'misses': state['misses'], 'size': len(state['values'])}
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored weight so save() can tell when a new weigh-in was entered
+        instance._loaded_weight = (instance.__dict__.get('current_weight'), instance.__dict__.get('weight_unit'))
+        return instance
+    
+    def _entered_weight_kg(self):
+        """current_weight in kg if it was changed since loading, else None."""
+        if not self.current_weight:
+            return None
+        if getattr(self, '_loaded_weight', None) == (self.current_weight, self.weight_unit):
+            return None
+        weight = Decimal(self.current_weight)
+        return weight * KG_PER_LB if self.weight_unit == self.LBS else weight
+    
+    def save(self, *args, **kwargs):
+        # The profile row, its targets and the weigh-in entry are written together or not at all
+        with transaction.atomic():
+            # A changed current_weight is a new weigh-in: extend the trend before the targets use it
+            entry = None
+            weight_kg = self._entered_weight_kg()
+            if weight_kg is not None:
+                entry = WeightEntry.objects.next_entry(self.user_id, weight_kg)
+                self.weight_trend_kg = entry.trend_kg
+            
+            self.clear_metric_cache()
+            self.refresh_calorie_targets()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], *self.CALORIE_TARGET_FIELDS, 'weight_trend_kg'}
+            super().save(*args, **kwargs)
+            
+            if entry is not None:
+                entry.save()
+        self._loaded_weight = (self.current_weight, self.weight_unit)
+    
+    def refresh_calorie_targets(self):
+        """Recompute the stored calorie target columns from this profile's fields."""
+        self.bmr = self.calculate_bmr()
+        self.tdee = self.calculate_tdee(bmr=self.bmr)
+        self.daily_calorie_target = self.calculate_daily_calorie_target(tdee=self.adaptive_tdee or self.tdee)
+        self.weekly_calorie_target = self.daily_calorie_target * 7 if self.daily_calorie_target else None
+        self.monthly_calorie_target = self.daily_calorie_target * 30 if self.daily_calorie_target else None
+        self.calorie_targets_updated_at = timezone.now()
+    
+    def get_calorie_targets(self):
+        """(bmr, tdee, daily, weekly, monthly), from the stored columns once they have been filled."""
+        if self.calorie_targets_updated_at is None:
+            self.refresh_calorie_targets()
+        return self.bmr, self.tdee, self.daily_calorie_target, self.weekly_calorie_target, self.monthly_calorie_target
+    
+    def claim_workout_number(self):
+        """
+        Increment the per-user workout counter in the database and return the new value.
+        Call inside a transaction; the UPDATE serializes concurrent requests for the same user.
+        """
+        UserProfile.objects.filter(pk=self.pk).update(last_workout_number=F('last_workout_number') + 1)
+        self.last_workout_number = UserProfile.objects.values_list('last_workout_number', flat=True).get(pk=self.pk)
+        return self.last_workout_number
+    
+    @memoized_metric
     def get_weight_in_kg(self):
-        """Convert weight to kg for calculations."""
+        """
+        Convert weight to kg for calculations.
+        Uses the smoothed weight trend once there is a weigh-in history.
+        """
         if not self.current_weight:
             return None
+        if self.weight_trend_kg is not None:
+            return self.weight_trend_kg
         if self.weight_unit == self.LBS:
             return float(self.current_weight) * 0.453592  # Convert lbs to kg
         return float(self.current_weight)
     
+    @memoized_metric
     def calculate_bmr(self):
         """
         Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation.
@@ -95,18 +256,22 @@ class UserProfile(models.Model):
             return f"{int(bmr)} cal/day"
         return "Incomplete data"
     
-    def calculate_tdee(self):
+    @memoized_metric
+    def calculate_tdee(self, bmr=None):
         """
         Calculate Total Daily Energy Expenditure (TDEE).
         TDEE = BMR × Activity Level Factor
+        Pass `bmr` when it has already been calculated.
         """
-        bmr = self.calculate_bmr()
+        if bmr is None:
+            bmr = self.calculate_bmr()
         if not bmr:
             return None
         
         activity_multiplier = float(self.activity_level)
         return round(bmr * activity_multiplier, 0)
     
+    @memoized_metric
     def get_target_weight_in_kg(self):
         """Convert target weight to kg for calculations."""
         if not self.target_weight:
@@ -115,12 +280,16 @@ class UserProfile(models.Model):
             return float(self.target_weight) * 0.453592
         return float(self.target_weight)
     
-    def calculate_daily_calorie_target(self):
+    @memoized_metric
+    def calculate_daily_calorie_target(self, tdee=None):
         """
         Calculate daily calorie target based on weight goals.
         Returns calories per day needed to reach target weight.
+        Starts from the adaptive TDEE when there is one, else the formula;
+        pass `tdee` when it has already been calculated.
         """
-        tdee = self.calculate_tdee()
+        if tdee is None:
+            tdee = self.adaptive_tdee or self.calculate_tdee()
         if not tdee or not self.target_weight:
             return None
         
@@ -147,6 +316,7 @@ class UserProfile(models.Model):
         daily_target = tdee + daily_calorie_adjustment
         return round(daily_target, 0)
     
+    @memoized_metric
     def calculate_weekly_calorie_target(self):
         """Calculate weekly calorie target."""
         daily_target = self.calculate_daily_calorie_target()
@@ -154,6 +324,7 @@ class UserProfile(models.Model):
             return daily_target * 7
         return None
     
+    @memoized_metric
     def calculate_monthly_calorie_target(self):
         """Calculate monthly calorie target (30 days)."""
         daily_target = self.calculate_daily_calorie_target()
@@ -169,31 +340,28 @@ class UserProfile(models.Model):
         """
         from datetime import date, timedelta
         
-        daily_target = self.calculate_daily_calorie_target()
-        weekly_target = self.calculate_weekly_calorie_target()
-        
-        if not daily_target or not weekly_target:
+        daily_target = self.get_calorie_targets()[2]
+        if not daily_target:
             return None
         
-        # Get recent meals
+        # Get recent daily totals from the rollup table
         end_date = date.today()
         start_date = end_date - timedelta(days=days_back-1)
         
-        recent_meals = self.user.meals.filter(date_consumed__range=[start_date, end_date])
+        recent = self.user.daily_nutrition.filter(date__range=[start_date, end_date]).aggregate(
+            total_consumed=Sum('calories'),
+            days_with_data=Count('id'),
+        )
         
-        # Calculate total calories consumed in the period
-        total_consumed = 0
-        consumption_by_date = {}
-        
-        for meal in recent_meals:
-            meal_date = meal.date_consumed
-            if meal_date not in consumption_by_date:
-                consumption_by_date[meal_date] = 0
-            consumption_by_date[meal_date] += float(meal.total_calories)
-        
-        # Calculate total consumed and days with data
-        days_with_data = len(consumption_by_date)
-        total_consumed = sum(consumption_by_date.values())
+        return self._adjust_daily_calories(daily_target, recent['total_consumed'] or 0, recent['days_with_data'])
+    
+    def _adjust_daily_calories(self, daily_target, total_consumed, days_with_data):
+        """
+        Spread the surplus/deficit of the days logged so far over the rest of the week.
+        Shared by calculate_adjusted_daily_calories and get_calorie_summary.
+        """
+        if not daily_target:
+            return None
         
         if days_with_data == 0:
             return daily_target  # No data, return normal target
@@ -202,7 +370,7 @@ class UserProfile(models.Model):
         target_consumed = float(daily_target) * days_with_data
         
         # Calculate difference
-        calorie_difference = total_consumed - target_consumed
+        calorie_difference = float(total_consumed) - target_consumed
         
         # Adjust remaining days in the week to compensate
         remaining_days = 7 - days_with_data
@@ -217,83 +385,199 @@ class UserProfile(models.Model):
         return round(adjusted_daily, 0)
     
     def get_calorie_summary(self):
-        """Get a summary of all calorie targets and consumption."""
+        """
+        Get a summary of all calorie targets and consumption.
+        Runs a single aggregate query over the rollup table regardless of history length.
+        """
         from datetime import date, timedelta
         
-        daily = self.calculate_daily_calorie_target()
-        weekly = self.calculate_weekly_calorie_target()
-        monthly = self.calculate_monthly_calorie_target()
-        adjusted = self.calculate_adjusted_daily_calories()
+        bmr, tdee, daily, weekly, monthly = self.get_calorie_targets()
         
-        # Calculate consumption for different periods
         today = date.today()
-        
-        # Daily consumption (today)
-        daily_consumption = 0
-        daily_meals = self.user.meals.filter(date_consumed=today)
-        for meal in daily_meals:
-            daily_consumption += float(meal.total_calories)
-        
-        # Weekly consumption (last 7 days)
         week_start = today - timedelta(days=6)  # Last 7 days including today
-        weekly_consumption = 0
-        weekly_meals = self.user.meals.filter(date_consumed__range=[week_start, today])
-        for meal in weekly_meals:
-            weekly_consumption += float(meal.total_calories)
-        
-        # Monthly consumption (last 30 days)
         month_start = today - timedelta(days=29)  # Last 30 days including today
-        monthly_consumption = 0
-        monthly_meals = self.user.meals.filter(date_consumed__range=[month_start, today])
-        for meal in monthly_meals:
-            monthly_consumption += float(meal.total_calories)
+        
+        # Today, last 7 days and last 30 days as conditional sums over one range scan
+        consumption = self.user.daily_nutrition.filter(date__range=[month_start, today]).aggregate(
+            daily=Sum('calories', filter=Q(date=today)),
+            weekly=Sum('calories', filter=Q(date__gte=week_start)),
+            monthly=Sum('calories'),
+            week_days_with_data=Count('id', filter=Q(date__gte=week_start)),
+        )
+        daily_consumption = consumption['daily'] or 0
+        weekly_consumption = consumption['weekly'] or 0
+        monthly_consumption = consumption['monthly'] or 0
+        
+        adjusted = self._adjust_daily_calories(daily, weekly_consumption, consumption['week_days_with_data'])
         
         return {
             'daily_target': daily,
             'weekly_target': weekly,
             'monthly_target': monthly,
             'adjusted_daily': adjusted,
-            'daily_consumption': round(daily_consumption, 0),
-            'weekly_consumption': round(weekly_consumption, 0),
-            'monthly_consumption': round(monthly_consumption, 0),
-            'tdee': self.calculate_tdee(),
-            'bmr': self.calculate_bmr()
+            'daily_consumption': round(float(daily_consumption), 0),
+            'weekly_consumption': round(float(weekly_consumption), 0),
+            'monthly_consumption': round(float(monthly_consumption), 0),
+            'tdee': tdee,
+            'adaptive_tdee': self.adaptive_tdee,
+            'bmr': bmr
         }
     
-    def get_workout_statistics(self):
-        """Get comprehensive workout statistics."""
-        from datetime import date, timedelta
-        import datetime as dt
+    @staticmethod
+    def dashboard_generation_key(user_id):
+        return f"dashboard-generation:{user_id}"
+    
+    @classmethod
+    def dashboard_generation(cls, user_id):
+        """
+        The user's current dashboard generation, part of every dashboard cache key.
+        A missing counter starts from the clock so it can't repeat a generation
+        whose entries are still cached.
+        """
+        key = cls.dashboard_generation_key(user_id)
+        generation = cache.get(key)
+        if generation is None:
+            generation = time.time_ns()
+            if not cache.add(key, generation, None):
+                generation = cache.get(key, generation)
+        return generation
+    
+    @classmethod
+    def bump_dashboard_generation(cls, user_id):
+        """Orphan every cached dashboard entry of the user; called by main.signals on any change."""
+        key = cls.dashboard_generation_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    
+    @classmethod
+    def bump_dashboard_generations_on_commit(cls, user_ids):
+        """
+        Bump the dashboard generation of each user once the current transaction
+        commits (right away outside one). For bulk writes, which send no signals.
+        """
+        user_ids = set(user_ids)
         
-        today = date.today()
-        current_year = today.year
-        start_of_year = dt.date(current_year, 1, 1)
+        def bump():
+            for user_id in user_ids:
+                cls.bump_dashboard_generation(user_id)
+        
+        if user_ids:
+            transaction.on_commit(bump)
+    
+    def dashboard_cache_entry(self):
+        """
+        (cache key, timeout) of today's dashboard entry: keyed by the user's
+        generation and the local date, and expiring at the next local midnight.
+        """
+        now = timezone.localtime()
+        today = now.date()
+        midnight = timezone.make_aware(dt.datetime.combine(today + dt.timedelta(days=1), dt.time.min))
+        cache_key = f"dashboard:{self.user_id}:{self.dashboard_generation(self.user_id)}:{today.isoformat()}"
+        return cache_key, max(int((midnight - now).total_seconds()), 1)
+    
+    def dashboard_panels(self):
+        """The independent dashboard computations, by name; each is a zero-argument callable."""
+        return {
+            'workout_stats': self.get_workout_statistics,
+            'calorie_summary': self.get_calorie_summary,
+            'goal_progress': self.get_goal_progress_summary,
+            'active_goals': lambda: list(self.user.goals.filter(is_active=True)),
+            'recent_records': lambda: list(self.user.personal_records.filter(
+                achieved_at__gte=timezone.now() - dt.timedelta(days=RECENT_RECORD_DAYS)
+            ).order_by('-achieved_at')[:RECENT_RECORD_LIMIT]),
+        }
+    
+    def get_dashboard_data(self):
+        """
+        Workout statistics, calorie summary, goal progress, active goals and recent
+        records for the dashboard. Cached under the user's generation and today's
+        date, so an entry lives until the user changes something or midnight.
+        """
+        cache_key, timeout = self.dashboard_cache_entry()
+        data = cache.get(cache_key)
+        if data is None:
+            data = {name: panel() for name, panel in self.dashboard_panels().items()}
+            cache.set(cache_key, data, timeout)
+        return data
+    
+    @staticmethod
+    def workout_statistics_cache_key(user_id, day):
+        return f"workout-stats:{user_id}:{day.isoformat()}"
+    
+    @classmethod
+    def clear_workout_statistics(cls, user_id):
+        """Drop today's cached workout statistics; called when a workout is created or deleted."""
+        cache.delete(cls.workout_statistics_cache_key(user_id, timezone.localdate()))
+    
+    def get_workout_statistics(self):
+        """
+        Get comprehensive workout statistics, cached until the next workout
+        is created or deleted (or the day rolls over).
+        """
+        today = timezone.localdate()
+        cache_key = self.workout_statistics_cache_key(self.user_id, today)
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = self._compute_workout_statistics(today)
+            cache.set(cache_key, stats, WORKOUT_STATISTICS_CACHE_SECONDS)
+        return stats
+    
+    def _compute_workout_statistics(self, today):
+        start_of_year = dt.date(today.year, 1, 1)
         start_of_month = today.replace(day=1)
-        start_of_week = today - timedelta(days=today.weekday())
+        start_of_week = today - dt.timedelta(days=today.weekday())
         
-        user_workouts = self.user.workouts
+        def day_start(day):
+            # Compare created_at against datetimes rather than created_at__date,
+            # so the database can range-scan the column instead of casting every row
+            return timezone.make_aware(dt.datetime.combine(day, dt.time.min))
         
-        # Calculate workout counts
-        total_workouts = user_workouts.count()
-        workouts_this_year = user_workouts.filter(created_at__date__gte=start_of_year).count()
-        workouts_this_month = user_workouts.filter(created_at__date__gte=start_of_month).count()
-        workouts_this_week = user_workouts.filter(created_at__date__gte=start_of_week).count()
+        user_workouts = self.user.workouts.order_by()
+        
+        # One aggregate with conditional counts instead of one COUNT per period
+        counts = user_workouts.aggregate(
+            total_workouts=Count('id'),
+            workouts_this_year=Count('id', filter=Q(created_at__gte=day_start(start_of_year))),
+            workouts_this_month=Count('id', filter=Q(created_at__gte=day_start(start_of_month))),
+            workouts_this_week=Count('id', filter=Q(created_at__gte=day_start(start_of_week))),
+        )
+        workouts_this_year = counts['workouts_this_year']
         
         # Calculate averages
         days_this_year = (today - start_of_year).days + 1
-        days_this_month = (today - start_of_month).days + 1
-        days_this_week = (today - start_of_week).days + 1
         
         avg_workouts_per_week_this_year = (workouts_this_year / days_this_year * 7) if days_this_year > 0 else 0
         avg_workouts_per_month = (workouts_this_year / (today.month)) if today.month > 0 else 0
         
+        # One ordered scan of workout dates feeds both the streaks and the heatmap
+        heatmap_start = today - dt.timedelta(days=HEATMAP_DAYS - 1)
+        heatmap = [0] * HEATMAP_DAYS
+        current_streak = longest_streak = streak = 0
+        previous_day = None
+        for created_at in user_workouts.order_by('created_at').values_list('created_at', flat=True).iterator():
+            day = timezone.localdate(created_at)
+            if heatmap_start <= day <= today:
+                heatmap[(day - heatmap_start).days] += 1
+            if day == previous_day:
+                continue
+            streak = streak + 1 if previous_day is not None and (day - previous_day).days == 1 else 1
+            longest_streak = max(longest_streak, streak)
+            previous_day = day
+        
+        # A streak is still alive until a full day passes without a workout
+        if previous_day is not None and (today - previous_day).days <= 1:
+            current_streak = streak
+        
         return {
-            'total_workouts': total_workouts,
-            'workouts_this_year': workouts_this_year,
-            'workouts_this_month': workouts_this_month,
-            'workouts_this_week': workouts_this_week,
+            **counts,
             'avg_workouts_per_week': round(avg_workouts_per_week_this_year, 1),
             'avg_workouts_per_month': round(avg_workouts_per_month, 1),
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+            'heatmap_start': heatmap_start,
+            'heatmap': heatmap,
         }
     
     def get_goal_progress_summary(self):
@@ -398,20 +682,129 @@ class Workout(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='workout_user_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
 
 
+def normalize_exercise_name(name):
+    """Group "Bench Press", "bench press" and "Bench  press " together."""
+    return re.sub(r'\s+', ' ', (name or '').strip().lower())
+
+
+class ExerciseDefinitionManager(models.Manager):
+    def lookup(self, name):
+        """The definition a name or alias refers to, or None. Does not create anything."""
+        key = normalize_exercise_name(name)
+        alias = ExerciseAlias.objects.filter(normalized_alias=key).select_related('definition').first()
+        if alias is not None:
+            return alias.definition
+        return self.filter(normalized_name=key).first()
+    
+    def resolve(self, names):
+        """
+        Map exercise names to catalog definitions, keyed by normalized name.
+        Aliases are checked first; names that match nothing get a new definition.
+        """
+        names_by_key = {}
+        for name in names:
+            key = normalize_exercise_name(name)
+            if key:
+                names_by_key.setdefault(key, name.strip())
+        if not names_by_key:
+            return {}
+        
+        resolved = {
+            alias.normalized_alias: alias.definition
+            for alias in ExerciseAlias.objects.filter(normalized_alias__in=names_by_key).select_related('definition')
+        }
+        missing = names_by_key.keys() - resolved.keys()
+        if missing:
+            resolved.update({
+                definition.normalized_name: definition
+                for definition in self.filter(normalized_name__in=missing)
+            })
+            missing -= resolved.keys()
+        if missing:
+            # ignore_conflicts keeps concurrent requests from failing on the unique name
+            self.bulk_create(
+                [self.model(name=names_by_key[key], normalized_name=key) for key in missing],
+                ignore_conflicts=True,
+            )
+            resolved.update({
+                definition.normalized_name: definition
+                for definition in self.filter(normalized_name__in=missing)
+            })
+        return resolved
+
+
+class ExerciseDefinition(models.Model):
+    """
+    Shared catalog entry for an exercise. Workouts link to it so that differently
+    typed names (and aliases like "bench" for "bench press") share one history.
+    """
+    name = models.CharField(max_length=50)
+    normalized_name = models.CharField(max_length=50, unique=True, editable=False)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = ExerciseDefinitionManager()
+    
+    class Meta:
+        ordering = ['normalized_name']
+    
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_exercise_name(self.name)
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return self.name
+
+
+class ExerciseAlias(models.Model):
+    """Another name that resolves to an ExerciseDefinition."""
+    definition = models.ForeignKey(ExerciseDefinition, on_delete=models.CASCADE, related_name="aliases")
+    name = models.CharField(max_length=50)
+    normalized_alias = models.CharField(max_length=50, unique=True, editable=False)
+    
+    class Meta:
+        ordering = ['normalized_alias']
+        verbose_name_plural = "exercise aliases"
+    
+    def save(self, *args, **kwargs):
+        self.normalized_alias = normalize_exercise_name(self.name)
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.name} -> {self.definition.name}"
+
+
 class Exercise(models.Model):
     workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name="exercises")
     name = models.CharField(max_length=50)
+    definition = models.ForeignKey(ExerciseDefinition, on_delete=models.PROTECT, null=True, blank=True, related_name="exercises")
     
     def __str__(self):
         return self.name
 
 
+class SetQuerySet(models.QuerySet):
+    def totals(self):
+        """Volume (kg × reps), heaviest weight and reps over these sets, in one aggregate query."""
+        return self.aggregate(
+            volume_kg=Coalesce(
+                Sum(ExpressionWrapper(F('weight_kg') * F('reps'), output_field=DecimalField(max_digits=14, decimal_places=2))),
+                Value(0, output_field=DecimalField(max_digits=14, decimal_places=2)),
+            ),
+            heaviest_kg=Max('weight_kg', filter=Q(reps__gt=0)),
+            total_reps=Coalesce(Sum('reps'), 0),
+        )
+
+
 class Set(models.Model):
     exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name="sets")
     set_number = models.PositiveIntegerField()
@@ -428,13 +821,149 @@ class Set(models.Model):
     weight = models.DecimalField(max_digits=6, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     weight_unit = models.CharField(max_length=3, choices=WEIGHT_OPTIONS, default=LBS)
     
+    # `weight` converted to kg so SQL can sum and compare weights across units.
+    # Kept in sync by save(); call sync_weight_kg() before bulk_create().
+    weight_kg = models.DecimalField(max_digits=8, decimal_places=2, default=0, editable=False)
+    
+    objects = SetQuerySet.as_manager()
+    
     class Meta:
         ordering = ['set_number']
         unique_together = ['exercise', 'set_number']
     
+    def sync_weight_kg(self):
+        """Recompute weight_kg from weight and weight_unit."""
+        weight = Decimal(self.weight or 0)
+        if self.weight_unit == self.LBS:
+            weight *= KG_PER_LB
+        self.weight_kg = weight.quantize(Decimal('0.01'))
+        return self.weight_kg
+    
+    def weight_in(self, unit):
+        """This set's weight in `unit` (Lbs or Kg), e.g. the user's preferred display unit."""
+        if unit == self.weight_unit:
+            return self.weight
+        if unit == self.KG:
+            return self.weight_kg
+        return (Decimal(self.weight or 0) / KG_PER_LB).quantize(Decimal('0.01'))
+    
+    def save(self, *args, **kwargs):
+        self.sync_weight_kg()
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.exercise.name} - Set {self.set_number}"
 
+
+class ExerciseSeries(models.Model):
+    """
+    Precomputed per-exercise, per-workout training stats (weights normalized to kg).
+    Rows are written by main.analytics when a workout is created and cascade away with it.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="exercise_series")
+    workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name="exercise_series")
+    exercise = models.OneToOneField(Exercise, on_delete=models.CASCADE, related_name="series")
+    definition = models.ForeignKey(ExerciseDefinition, on_delete=models.PROTECT, null=True, blank=True, related_name="series")
+    exercise_name = models.CharField(max_length=50)
+    exercise_key = models.CharField(max_length=50, help_text="Normalized catalog name used to group sessions")
+    performed_at = models.DateTimeField()
+    
+    set_count = models.PositiveIntegerField(default=0)
+    total_reps = models.PositiveIntegerField(default=0)
+    tonnage_kg = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    best_set_weight_kg = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    best_set_reps = models.PositiveIntegerField(default=0)
+    estimated_1rm_epley_kg = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    estimated_1rm_brzycki_kg = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    
+    class Meta:
+        ordering = ['performed_at']
+        indexes = [
+            models.Index(fields=['user', 'exercise_key', 'performed_at'], name='series_user_exercise_date_idx'),
+            models.Index(fields=['user', 'definition', 'performed_at'], name='series_user_def_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.exercise_name} - {self.performed_at:%Y-%m-%d} ({self.tonnage_kg} kg)"
+
+
+class PersonalRecord(models.Model):
+    """
+    A user's best results for one exercise, maintained by main.analytics as
+    workouts are created and deleted. The *_workout fields say which workout
+    holds each record, so marking PRs on a page is a dictionary lookup.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="personal_records")
+    exercise_key = models.CharField(max_length=50)
+    exercise_name = models.CharField(max_length=50)
+    
+    heaviest_weight_kg = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    heaviest_workout = models.ForeignKey(Workout, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    best_1rm_kg = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    best_1rm_workout = models.ForeignKey(Workout, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    best_volume_kg = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    best_volume_workout = models.ForeignKey(Workout, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    
+    # {"<weight in kg>": [most reps, workout id]}
+    reps_at_weight = models.JSONField(default=dict, blank=True)
+    
+    achieved_at = models.DateTimeField(null=True, blank=True, help_text="When any of these records was last beaten")
+    
+    class Meta:
+        ordering = ['exercise_key']
+        unique_together = ['user', 'exercise_key']
+        indexes = [
+            models.Index(fields=['user', 'achieved_at'], name='record_user_achieved_idx'),
+        ]
+    
+    def records_in(self, workout_id):
+        """Names of the records held by the given workout."""
+        held = []
+        if self.heaviest_workout_id == workout_id:
+            held.append('heaviest')
+        if self.best_1rm_workout_id == workout_id:
+            held.append('1rm')
+        if self.best_volume_workout_id == workout_id:
+            held.append('volume')
+        return held
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.exercise_name} PRs"
+
+
+MACRO_FIELDS = ('calories', 'carbs', 'fat', 'protein')
+
+
+def food_macro_total(macro, prefix=''):
+    """
+    SQL expression for the summed grams-weighted value of a macro.
+    `prefix` is the lookup path from the queried model to Food (e.g. 'foods__').
+    """
+    per_100g = F(f'{prefix}{macro}_per_100g')
+    grams = F(f'{prefix}grams')
+    return Coalesce(
+        Sum(
+            ExpressionWrapper(per_100g * grams / Value(100.0), output_field=DecimalField()),
+            output_field=DecimalField(max_digits=12, decimal_places=4),
+        ),
+        Value(0),
+        output_field=DecimalField(max_digits=12, decimal_places=4),
+    )
+
+
+class MealQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate each meal with its macro totals, computed in SQL.
+        Adds calories_sum, carbs_sum, fat_sum and protein_sum which the
+        total_* properties pick up instead of querying the foods again.
+        """
+        return self.annotate(**{
+            f'{macro}_sum': food_macro_total(macro, prefix='foods__')
+            for macro in MACRO_FIELDS
+        })
+
+
 class Meal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="meals")
     name = models.CharField(max_length=50)
@@ -442,28 +971,47 @@ class Meal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MealQuerySet.as_manager()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded date so a date change can refresh both daily rollups
+        instance._loaded_date_consumed = dict(zip(field_names, values)).get('date_consumed')
+        return instance
+    
+    def _macro_total(self, macro):
+        """Use the with_totals() annotation when present, otherwise sum the foods."""
+        annotated = getattr(self, f'{macro}_sum', None)
+        if annotated is not None:
+            return annotated
+        return sum(getattr(food, f'total_{macro}') for food in self.foods.all())
+    
     @property
     def total_calories(self):
         """Calculate total calories from all foods in this meal."""
-        return sum(food.total_calories for food in self.foods.all())
+        return self._macro_total('calories')
     
     @property
     def total_carbs(self):
         """Calculate total carbs from all foods in this meal."""
-        return sum(food.total_carbs for food in self.foods.all())
+        return self._macro_total('carbs')
     
     @property
     def total_fat(self):
         """Calculate total fat from all foods in this meal."""
-        return sum(food.total_fat for food in self.foods.all())
+        return self._macro_total('fat')
     
     @property
     def total_protein(self):
         """Calculate total protein from all foods in this meal."""
-        return sum(food.total_protein for food in self.foods.all())
+        return self._macro_total('protein')
     
     class Meta:
         ordering = ['-date_consumed', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'date_consumed', 'created_at'], name='meal_user_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.date_consumed}"
@@ -504,6 +1052,311 @@ class Food(models.Model):
         return f"{self.name} ({self.grams}g)"
 
 
+def normalize_food_name(name):
+    """
+    Normalize a food name for catalog lookups: lowercase, strip accents and
+    punctuation, collapse whitespace. "Chicken Breast, raw" -> "chicken breast raw"
+    """
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r'[^a-z0-9]+', ' ', name.lower())
+    return name.strip()
+
+
+class FoodItemQuerySet(models.QuerySet):
+    def autocomplete(self, query, limit=10):
+        """
+        Return up to `limit` catalog items matching `query`.
+        Prefix matches on the indexed normalized name come first; on SQLite the
+        FTS5 index then fills the list with items matching any word prefix.
+        """
+        normalized = normalize_food_name(query)
+        if not normalized:
+            return []
+        
+        # Range scan on the normalized_name index instead of LIKE, which SQLite can't index
+        matches = list(
+            self.filter(normalized_name__gte=normalized, normalized_name__lt=normalized + '\uffff')
+            .order_by('normalized_name')[:limit]
+        )
+        if len(matches) < limit:
+            seen = {item.pk for item in matches}
+            word_ids = [pk for pk in self._fts_search(normalized, limit + len(seen)) if pk not in seen]
+            if word_ids:
+                by_id = self.in_bulk(word_ids[:limit - len(matches)])
+                matches.extend(by_id[pk] for pk in word_ids if pk in by_id)
+        return matches[:limit]
+    
+    def _fts_search(self, normalized, limit):
+        """Ids of items whose words start with each word of `normalized`, best ranked first."""
+        connection = connections[self.db]
+        if connection.vendor != 'sqlite':
+            return []
+        
+        match = ' '.join(f'"{word}"*' for word in normalized.split())
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid FROM {FOOD_ITEM_FTS_TABLE} WHERE {FOOD_ITEM_FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+                    [match, limit],
+                )
+                return [row[0] for row in cursor.fetchall()]
+        except DatabaseError:
+            # SQLite built without FTS5; prefix matches are still available
+            return []
+
+
+FOOD_ITEM_FTS_TABLE = 'main_fooditem_fts'
+
+
+class FoodItem(models.Model):
+    """Shared catalog entry with per-100g macros that FoodForm fields can be filled from."""
+    name = models.CharField(max_length=200)
+    normalized_name = models.CharField(max_length=200, editable=False)
+    calories_per_100g = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(0)], default=0)
+    carbs_per_100g = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(0)], default=0)
+    fat_per_100g = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(0)], default=0)
+    protein_per_100g = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(0)], default=0)
+    
+    # Where an imported item came from, so re-running an import updates it in place
+    source = models.CharField(max_length=50, null=True, blank=True)
+    external_id = models.CharField(max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = FoodItemQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['normalized_name']
+        indexes = [
+            models.Index(fields=['normalized_name'], name='fooditem_normalized_name_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'external_id'], name='unique_fooditem_source_external_id'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_food_name(self.name)
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return self.name
+
+
+class DailyNutritionManager(models.Manager):
+    def refresh(self, user_id, dates):
+        """
+        Recompute the rollup rows for the given user and dates from Meal/Food.
+        Dates that no longer have any meals have their row removed.
+        """
+        dates = {day for day in dates if day is not None}
+        if not dates:
+            return
+        
+        totals = (
+            Meal.objects.filter(user_id=user_id, date_consumed__in=dates)
+            .order_by()
+            .values('date_consumed')
+            .annotate(
+                meal_count=Count('id', distinct=True),
+                **{macro: food_macro_total(macro, prefix='foods__') for macro in MACRO_FIELDS},
+            )
+        )
+        rows = [
+            self.model(
+                user_id=user_id,
+                date=total['date_consumed'],
+                meal_count=total['meal_count'],
+                **{macro: total[macro] for macro in MACRO_FIELDS},
+            )
+            for total in totals
+        ]
+        if rows:
+            self.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'date'],
+                update_fields=[*MACRO_FIELDS, 'meal_count'],
+            )
+        
+        stale_dates = dates - {row.date for row in rows}
+        if stale_dates:
+            self.filter(user_id=user_id, date__in=stale_dates).delete()
+        
+        TdeeEstimate.objects.invalidate(user_id, min(dates))
+    
+    def rebuild(self, batch_size=1000):
+        """Drop every rollup row and rebuild the table from all meals. Returns the row count."""
+        totals = (
+            Meal.objects.filter(date_consumed__isnull=False)
+            .order_by()
+            .values('user_id', 'date_consumed')
+            .annotate(
+                meal_count=Count('id', distinct=True),
+                **{macro: food_macro_total(macro, prefix='foods__') for macro in MACRO_FIELDS},
+            )
+        )
+        
+        created = 0
+        with transaction.atomic():
+            # Users who lose or gain rows both have a cached calorie summary to drop
+            user_ids = set(self.order_by().values_list('user_id', flat=True).distinct())
+            self.all().delete()
+            batch = []
+            for total in totals.iterator(chunk_size=batch_size):
+                user_ids.add(total['user_id'])
+                batch.append(self.model(
+                    user_id=total['user_id'],
+                    date=total['date_consumed'],
+                    meal_count=total['meal_count'],
+                    **{macro: total[macro] for macro in MACRO_FIELDS},
+                ))
+                if len(batch) >= batch_size:
+                    self.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                self.bulk_create(batch)
+                created += len(batch)
+            UserProfile.bump_dashboard_generations_on_commit(user_ids)
+        return created
+
+
+class DailyNutrition(models.Model):
+    """Per-user, per-date macro totals, kept in sync with Meal/Food by main.signals."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_nutrition")
+    date = models.DateField()
+    calories = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    carbs = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    fat = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    protein = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    meal_count = models.PositiveIntegerField(default=0)
+    
+    objects = DailyNutritionManager()
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.date} ({self.calories} cal)"
+
+
+def smooth_weight(previous_trend, previous_at, weight_kg, measured_at):
+    """
+    Next value of the exponentially smoothed weight trend. The smoothing factor
+    grows with the time since the previous entry, so irregular weigh-ins are
+    weighted by how much time they cover.
+    """
+    if previous_trend is None:
+        return float(weight_kg)
+    days = max((measured_at - previous_at).total_seconds() / 86400, 0)
+    alpha = 1 - (1 - WEIGHT_TREND_DAILY_ALPHA) ** days
+    return previous_trend + alpha * (float(weight_kg) - previous_trend)
+
+
+class WeightEntryManager(models.Manager):
+    def next_entry(self, user_id, weight_kg, measured_at=None):
+        """
+        An unsaved entry following the user's latest one, with its trend computed
+        from the previous entry alone: O(1) however long the history is. A second
+        weigh-in on the same day replaces the first instead of being averaged in.
+        """
+        measured_at = measured_at or timezone.now()
+        latest = list(self.filter(user_id=user_id, measured_at__lte=measured_at).order_by('-measured_at', '-id')[:2])
+        replaced = None
+        if latest and timezone.localdate(latest[0].measured_at) == timezone.localdate(measured_at):
+            replaced = latest.pop(0)
+        previous = latest[0] if latest else None
+        trend = smooth_weight(
+            previous.trend_kg if previous else None,
+            previous.measured_at if previous else None,
+            weight_kg,
+            measured_at,
+        )
+        return self.model(
+            pk=replaced.pk if replaced else None,
+            user_id=user_id,
+            weight_kg=weight_kg,
+            trend_kg=trend,
+            measured_at=measured_at,
+        )
+    
+    def record(self, user_id, weight_kg, measured_at=None):
+        """
+        Store a weigh-in and keep the trend current. Appending is O(1); a backdated
+        entry also re-smooths the entries after it.
+        """
+        weight_kg = Decimal(weight_kg).quantize(Decimal('0.01'))
+        with transaction.atomic():
+            entry = self.next_entry(user_id, weight_kg, measured_at)
+            entry.save()
+            later = list(self.filter(user_id=user_id, measured_at__gt=entry.measured_at).order_by('measured_at', 'id'))
+            previous = entry
+            for later_entry in later:
+                later_entry.trend_kg = smooth_weight(previous.trend_kg, previous.measured_at, later_entry.weight_kg, later_entry.measured_at)
+                previous = later_entry
+            if later:
+                self.bulk_update(later, ['trend_kg'])
+                TdeeEstimate.objects.invalidate(user_id, timezone.localdate(entry.measured_at))
+            
+            profile = UserProfile.objects.filter(user_id=user_id).first()
+            if profile is not None:
+                # Saving refreshes the stored calorie targets from the new trend
+                profile.weight_trend_kg = previous.trend_kg
+                profile.save(update_fields=['weight_trend_kg'])
+        return entry
+
+
+class WeightEntry(models.Model):
+    """
+    One weigh-in (in kg) with the smoothed trend as of that moment. Entries are
+    written when the profile weight changes, and trend_kg is carried forward from
+    the previous entry instead of being recomputed from the whole history.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="weight_entries")
+    measured_at = models.DateTimeField(default=timezone.now)
+    weight_kg = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(0)])
+    trend_kg = models.FloatField()
+    
+    objects = WeightEntryManager()
+    
+    class Meta:
+        ordering = ['measured_at']
+        verbose_name_plural = "weight entries"
+        indexes = [
+            models.Index(fields=['user', 'measured_at'], name='weightentry_user_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.weight_kg} kg on {self.measured_at:%Y-%m-%d}"
+
+
+class TdeeEstimateManager(models.Manager):
+    def invalidate(self, user_id, since):
+        """Force a refit of the whole window when data on or after `since` changed after it was read."""
+        self.filter(user_id=user_id, window_end__gte=since).update(window_end=None)
+
+
+class TdeeEstimate(models.Model):
+    """
+    Sliding window of completed days behind a user's adaptive TDEE: logged intake
+    and weight trend per day (None where nothing was logged), oldest first.
+    main.energy_balance advances it by the days since window_end instead of
+    re-reading the user's history; window_end is cleared when older data changes.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="tdee_estimate")
+    window_end = models.DateField(null=True, blank=True)
+    daily_intake = models.JSONField(default=list)
+    daily_weight_kg = models.JSONField(default=list)
+    tdee = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = TdeeEstimateManager()
+    
+    def __str__(self):
+        return f"{self.user.username} - TDEE {self.tdee or 'n/a'} through {self.window_end}"
+
+
 class ProgressPicture(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="progress_pictures")
     title = models.CharField(max_length=100)
@@ -515,6 +1368,9 @@ class ProgressPicture(models.Model):
     
     class Meta:
         ordering = ['-date_taken', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'date_taken', 'created_at'], name='progresspic_user_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title} ({self.date_taken})"
@@ -569,6 +1425,9 @@ class Goal(models.Model):
     
     class Meta:
         ordering = ['-is_active', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_active', 'created_at'], name='goal_user_active_idx'),
+        ]
     
     def __str__(self):
         return self.title
\ No newline at end of file
@@ -0,0 +1,195 @@
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DailyNutrition, Exercise, Food, Goal, Meal, Set, UserProfile, Workout
+
+# Rollup refreshes are queued per thread and flushed once the surrounding
+# transaction commits, so deleting a meal with ten foods refreshes its day once.
+_pending = threading.local()
+
+
+def _pending_state():
+    if not hasattr(_pending, 'days'):
+        _pending.days = set()
+        _pending.meal_ids = set()
+    return _pending
+
+
+def _scheduled():
+    """The flush callbacks this thread has registered and that have not run yet."""
+    if not hasattr(_pending, 'scheduled'):
+        _pending.scheduled = set()
+    return _pending.scheduled
+
+
+def _on_commit_once(func):
+    """
+    transaction.on_commit(func), unless `func` is already scheduled and still waiting
+    for the current transaction to commit. The flag alone is not enough: a
+    rolled-back transaction discards its callbacks without running them.
+    """
+    scheduled = _scheduled()
+    connection = transaction.get_connection()
+    if func in scheduled and connection.in_atomic_block and any(
+        pending is func for savepoint_ids, pending, robust in connection.run_on_commit
+    ):
+        return
+    scheduled.add(func)
+    transaction.on_commit(func)
+
+
+def _flush_daily_nutrition():
+    state = _pending_state()
+    _scheduled().discard(_flush_daily_nutrition)
+    days, meal_ids = state.days, state.meal_ids
+    state.days, state.meal_ids = set(), set()
+
+    if meal_ids:
+        days.update(
+            Meal.objects.filter(pk__in=meal_ids)
+            .order_by()
+            .values_list('user_id', 'date_consumed')
+        )
+
+    dates_by_user = defaultdict(set)
+    for user_id, day in days:
+        dates_by_user[user_id].add(day)
+    for user_id, dates in dates_by_user.items():
+        DailyNutrition.objects.refresh(user_id, dates)
+
+
+def queue_daily_nutrition_refresh(user_id=None, day=None, meal_id=None):
+    """
+    Mark a (user, date) rollup row, or the day of a meal, as needing a refresh.
+    Use this after bulk operations on Meal/Food, which don't send signals.
+    """
+    state = _pending_state()
+    if meal_id is not None:
+        state.meal_ids.add(meal_id)
+    if user_id is not None and day is not None:
+        state.days.add((user_id, day))
+    _on_commit_once(_flush_daily_nutrition)
+
+
+def _is_cascade(origin, model):
+    """True when a delete was started by something other than `model` itself."""
+    if isinstance(origin, QuerySet):
+        return origin.model is not model
+    return not isinstance(origin, model)
+
+
+@receiver(post_save, sender=Meal)
+def meal_saved(sender, instance, **kwargs):
+    queue_daily_nutrition_refresh(instance.user_id, instance.date_consumed)
+    loaded_date = getattr(instance, '_loaded_date_consumed', None)
+    if loaded_date and loaded_date != instance.date_consumed:
+        queue_daily_nutrition_refresh(instance.user_id, loaded_date)
+    instance._loaded_date_consumed = instance.date_consumed
+
+
+@receiver(post_delete, sender=Meal)
+def meal_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting a user cascades to their rollup rows as well
+    if _is_cascade(origin, Meal):
+        return
+    queue_daily_nutrition_refresh(instance.user_id, instance.date_consumed)
+
+
+@receiver(post_save, sender=Food)
+def food_saved(sender, instance, **kwargs):
+    queue_daily_nutrition_refresh(meal_id=instance.meal_id)
+
+
+@receiver(post_delete, sender=Food)
+def food_deleted(sender, instance, origin=None, **kwargs):
+    # A cascade from Meal (or User) is covered by the meal handler
+    if _is_cascade(origin, Food):
+        return
+    queue_daily_nutrition_refresh(meal_id=instance.meal_id)
+
+
+def _clear_workout_statistics(user_id):
+    transaction.on_commit(lambda: UserProfile.clear_workout_statistics(user_id))
+
+
+def _pending_dashboard():
+    if not hasattr(_pending, 'dashboard_user_ids'):
+        _pending.dashboard_user_ids = set()
+        _pending.dashboard_exercise_ids = set()
+        _pending.dashboard_meal_ids = set()
+    return _pending
+
+
+def _flush_dashboard_generations():
+    state = _pending_dashboard()
+    _scheduled().discard(_flush_dashboard_generations)
+    user_ids, exercise_ids, meal_ids = state.dashboard_user_ids, state.dashboard_exercise_ids, state.dashboard_meal_ids
+    state.dashboard_user_ids, state.dashboard_exercise_ids, state.dashboard_meal_ids = set(), set(), set()
+
+    # Sets and foods only know their parent, so their owners are looked up once per commit
+    if exercise_ids:
+        user_ids.update(Exercise.objects.filter(pk__in=exercise_ids).values_list('workout__user_id', flat=True))
+    if meal_ids:
+        user_ids.update(Meal.objects.filter(pk__in=meal_ids).values_list('user_id', flat=True))
+    for user_id in user_ids:
+        UserProfile.bump_dashboard_generation(user_id)
+
+
+def queue_dashboard_refresh(user_id=None, exercise_id=None, meal_id=None):
+    """
+    Invalidate a user's cached dashboard once the surrounding transaction commits.
+    Use this after bulk operations, which don't send signals.
+    """
+    state = _pending_dashboard()
+    if user_id is not None:
+        state.dashboard_user_ids.add(user_id)
+    if exercise_id is not None:
+        state.dashboard_exercise_ids.add(exercise_id)
+    if meal_id is not None:
+        state.dashboard_meal_ids.add(meal_id)
+    _on_commit_once(_flush_dashboard_generations)
+
+
+@receiver(post_save, sender=Workout)
+def workout_saved(sender, instance, created, **kwargs):
+    if created:
+        _clear_workout_statistics(instance.user_id)
+    queue_dashboard_refresh(user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Workout)
+def workout_deleted(sender, instance, **kwargs):
+    _clear_workout_statistics(instance.user_id)
+    queue_dashboard_refresh(user_id=instance.user_id)
+
+
+@receiver(post_save, sender=Set)
+@receiver(post_delete, sender=Set)
+def set_changed(sender, instance, origin=None, **kwargs):
+    # A cascade from Workout (or User) is covered by the workout handler
+    if origin is not None and _is_cascade(origin, Set):
+        return
+    queue_dashboard_refresh(exercise_id=instance.exercise_id)
+
+
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+@receiver(post_save, sender=Goal)
+@receiver(post_delete, sender=Goal)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_data_changed(sender, instance, **kwargs):
+    queue_dashboard_refresh(user_id=instance.user_id)
+
+
+@receiver(post_save, sender=Food)
+@receiver(post_delete, sender=Food)
+def food_changed(sender, instance, origin=None, **kwargs):
+    if origin is not None and _is_cascade(origin, Food):
+        return
+    queue_dashboard_refresh(meal_id=instance.meal_id)
@@ -1,3 +1,1372 @@
-from django.test import TestCase
+import csv
+import datetime as dt
+import gzip
+import io
+import json
+import random
+import re
+import tempfile
+from decimal import Decimal
+from importlib import import_module
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks.generator import generate
+from benchmarks.view_suite import SCENARIOS, run_scenario
+from main import (
+    analytics, calorie_targets, energy_balance, importers, metrics as request_metrics, signals, weight_history,
+)
+from main.models import (
+    MACRO_FIELDS, DailyNutrition, Exercise, ExerciseAlias, ExerciseDefinition, ExerciseSeries, Food, FoodItem, Goal,
+    Meal, PersonalRecord, Set, TdeeEstimate, UserProfile, WeightEntry, Workout,
+)
+from main.signals import queue_daily_nutrition_refresh
+from main.views import MAX_SETS_PER_EXERCISE, MEAL_TRACKING_DAYS_PER_PAGE, WORKOUTS_PER_PAGE
+
+PASSWORD = 'password'
+
+
+class EmptyCacheMixin:
+    """
+    Start every test from an empty cache. The cache is not rolled back with the
+    database, so dashboard and statistics entries keyed by user ids that the next
+    test reuses would otherwise leak into it. Neither are the refreshes that the
+    signals queued in the previous test's rolled-back transaction.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        signals._pending.__dict__.clear()
+
+
+def create_user(username='lifter', **profile):
+    """A user whose profile has everything the calorie targets need, unless overridden."""
+    user = User.objects.create_user(username, password=PASSWORD)
+    UserProfile.objects.create(user=user, **{
+        'age': 30, 'gender': UserProfile.MALE, 'current_weight': Decimal('80'), 'target_weight': Decimal('75'),
+        'weight_unit': UserProfile.KG, 'activity_level': UserProfile.MODERATE, **profile,
+    })
+    return user
+
+
+def create_meal(user, day, foods, name='Dinner'):
+    """A meal on `day` with foods given as (grams, calories, carbs, fat, protein per 100 g)."""
+    meal = Meal.objects.create(user=user, name=name)
+    # date_consumed is auto_now_add, so the day is set on a second save
+    meal.date_consumed = day
+    meal.save()
+    for grams, calories, carbs, fat, protein in foods:
+        Food.objects.create(
+            meal=meal, name=f'Food {grams}g', grams=grams, calories_per_100g=calories,
+            carbs_per_100g=carbs, fat_per_100g=fat, protein_per_100g=protein,
+        )
+    return meal
+
+
+def workout_form(title='Push', exercises=(('Bench Press', [(5, '100', 'Kg'), (3, '110', 'Kg')]),)):
+    """create_workout POST data for exercises given as (name, [(reps, weight, unit), ...])."""
+    data = {
+        'title': title, 'day': 'Push', 'duration': '',
+        'form-TOTAL_FORMS': str(len(exercises)), 'form-INITIAL_FORMS': '0',
+        'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+    }
+    for exercise_index, (name, sets) in enumerate(exercises):
+        data[f'form-{exercise_index}-name'] = name
+        for set_index, (reps, weight, unit) in enumerate(sets):
+            prefix = f'exercise_{exercise_index}_set_{set_index}'
+            data.update({f'{prefix}_reps': str(reps), f'{prefix}_weight': weight, f'{prefix}_weight_unit': unit})
+    return data
+
+
+def create_workout(user, title='Workout', exercises=(('Squat', [(5, '100', 'Kg')]),), number=1):
+    """A workout saved through the ORM (no series or records), exercises as in workout_form()."""
+    workout = Workout.objects.create(user=user, title=title, workout_number=number)
+    for name, sets in exercises:
+        exercise = Exercise.objects.create(workout=workout, name=name)
+        for set_number, (reps, weight, unit) in enumerate(sets, start=1):
+            Set.objects.create(exercise=exercise, set_number=set_number, reps=reps, weight=Decimal(weight), weight_unit=unit)
+    return workout
+
+
+class MealTotalsTests(EmptyCacheMixin, TestCase):
+    def test_with_totals_matches_food_sums(self):
+        user = create_user()
+        today = timezone.localdate()
+        meal = create_meal(user, today, [(150, 200, 10, 5, 20), (50, 100, 0, 0, 0)])
+        empty = create_meal(user, today, [])
+
+        meals = {meal.pk: meal for meal in Meal.objects.with_totals()}
+        stored = Meal.objects.get(pk=meal.pk)
+        with self.assertNumQueries(0):
+            annotated = {macro: getattr(meals[meal.pk], f'total_{macro}') for macro in MACRO_FIELDS}
+        self.assertEqual(annotated, {macro: getattr(stored, f'total_{macro}') for macro in MACRO_FIELDS})
+        self.assertEqual(annotated['calories'], 350)
+        self.assertEqual(meals[empty.pk].total_calories, 0)
+
+
+class DailyNutritionTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.today = timezone.localdate()
+
+    def rollup(self, day):
+        row = DailyNutrition.objects.filter(user=self.user, date=day).first()
+        return (row.calories, row.protein, row.meal_count) if row else None
+
+    def test_signals_keep_rollup_in_sync(self):
+        yesterday = self.today - dt.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            meal = create_meal(self.user, self.today, [(100, 200, 10, 5, 20), (50, 100, 0, 0, 0)])
+            create_meal(self.user, self.today, [(100, 300, 0, 0, 10)])
+        self.assertEqual(self.rollup(self.today), (550, 30, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            meal.foods.order_by('id').first().delete()
+        self.assertEqual(self.rollup(self.today), (350, 10, 2))
+
+        # Moving a meal refreshes the day it left as well as the day it moved to
+        with self.captureOnCommitCallbacks(execute=True):
+            meal = Meal.objects.get(pk=meal.pk)
+            meal.date_consumed = yesterday
+            meal.save()
+        self.assertEqual(self.rollup(self.today), (300, 10, 1))
+        self.assertEqual(self.rollup(yesterday), (50, 0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            meal.delete()
+        self.assertIsNone(self.rollup(yesterday))
+
+    def test_queue_refresh_after_bulk_operations(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            meal = create_meal(self.user, self.today, [])
+        # bulk_create sends no signals, so the refresh is queued by hand
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.bulk_create([
+                Food(meal=meal, name='Rice', grams=200, calories_per_100g=130),
+                Food(meal=meal, name='Beans', grams=100, calories_per_100g=120),
+            ])
+            queue_daily_nutrition_refresh(meal_id=meal.pk)
+        self.assertEqual(self.rollup(self.today), (380, 0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.filter(meal=meal).update(grams=100)
+            queue_daily_nutrition_refresh(self.user.pk, self.today)
+        self.assertEqual(self.rollup(self.today), (250, 0, 1))
+
+    def test_one_flush_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            create_meal(self.user, self.today, [(100, 200, 0, 0, 0), (100, 100, 0, 0, 0), (50, 100, 0, 0, 0)])
+        self.assertEqual(callbacks.count(signals._flush_daily_nutrition), 1)
+        self.assertEqual(self.rollup(self.today), (350, 0, 1))
+
+    def test_flush_rescheduled_after_savepoint_rollback(self):
+        # A rolled-back savepoint takes its callback along, so the next change schedules a new one
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                create_meal(self.user, self.today, [(100, 500, 0, 0, 0)])
+                raise DatabaseError
+            create_meal(self.user, self.today, [(100, 300, 0, 0, 0)])
+        self.assertEqual(self.rollup(self.today), (300, 0, 1))
+
+    def test_rebuild_matches_incremental_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for offset in range(5):
+                day = self.today - dt.timedelta(days=offset)
+                create_meal(self.user, day, [(100 + offset, 150, 20, 5, 10)])
+                create_meal(self.user, day, [(80, 90, 10, 2, 3)])
+
+        def rows():
+            return list(DailyNutrition.objects.order_by('user', 'date').values_list(
+                'user', 'date', 'meal_count', *MACRO_FIELDS,
+            ))
+        incremental = rows()
+        call_command('rebuild_daily_nutrition', stdout=io.StringIO())
+        self.assertEqual(rows(), incremental)
+        self.assertEqual(len(incremental), 5)
+
+
+class AddMealRollupTests(EmptyCacheMixin, TransactionTestCase):
+    """Outside a test transaction, every commit runs its on_commit callbacks right away."""
+
+    def test_add_meal_refreshes_the_rollup_once(self):
+        user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+        data = SCENARIOS['add_meal'][2]({'today': timezone.localdate()})
+        with mock.patch.object(DailyNutrition.objects, 'refresh', wraps=DailyNutrition.objects.refresh) as refresh:
+            self.assertEqual(self.client.post(reverse('main:add_meal'), data).status_code, 302)
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(DailyNutrition.objects.get(user=user).calories, 300)
+
+
+class CalorieSummaryTests(EmptyCacheMixin, TestCase):
+    def test_summary_sums_each_window_in_one_query(self):
+        user = create_user()
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            for offset, calories in [(0, 500), (3, 700), (20, 900), (40, 1100)]:
+                create_meal(user, today - dt.timedelta(days=offset), [(100, calories, 0, 0, 0)])
+
+        profile = UserProfile.objects.select_related('user').get(user=user)
+        with self.assertNumQueries(1):
+            summary = profile.get_calorie_summary()
+        self.assertEqual(
+            (summary['daily_consumption'], summary['weekly_consumption'], summary['monthly_consumption']),
+            (500, 1200, 2100),
+        )
+        self.assertEqual(summary['daily_target'], 2015)
+        # 2 × 2015 planned, 1200 eaten: the 2830 short is spread over the other 5 days
+        self.assertEqual(summary['adjusted_daily'], 2581)
+
+
+class MealTrackingPaginationTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            for offset in range(30):
+                day = self.today - dt.timedelta(days=offset)
+                create_meal(self.user, day, [(100, 200, 0, 0, 0)], name='Lunch')
+                create_meal(self.user, day, [(100, 300, 0, 0, 0)], name='Dinner')
+        self.client.login(username='lifter', password=PASSWORD)
+
+    def get_page(self, before=None):
+        query = {'view': 'all', **({'before': before} if before else {})}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('main:meal_tracking'), query)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_before_cursor_pages_through_every_day_once(self):
+        response, first_queries = self.get_page()
+        self.assertContains(response, 'id="load-older-link"')
+        days = list(response.context['daily_totals'])
+        self.assertEqual(len(days), MEAL_TRACKING_DAYS_PER_PAGE)
+        self.assertEqual(days[0], self.today)
+
+        while response.context['next_cursor']:
+            response, queries = self.get_page(response.context['next_cursor'].isoformat())
+            # Older pages cost the same as the first one
+            self.assertEqual(queries, first_queries)
+            days += list(response.context['daily_totals'])
+
+        self.assertEqual(days, [self.today - dt.timedelta(days=offset) for offset in range(30)])
+        self.assertNotContains(response, 'id="load-older-link"')
+        oldest = response.context['daily_totals'][days[-1]]
+        self.assertEqual(oldest['calories'], 500)
+        self.assertEqual(sorted(meal.name for meal in oldest['meals']), ['Dinner', 'Lunch'])
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        response, _ = self.get_page('not-a-date')
+        self.assertEqual(next(iter(response.context['daily_totals'])), self.today)
+
+
+class FoodAutocompleteTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ['Chicken Breast, raw', 'Chicken thigh', 'Breast of chicken (roasted)', 'Crème fraîche', 'Rice']:
+            FoodItem.objects.create(name=name, calories_per_100g=100)
+
+    def names(self, query):
+        return [item.name for item in FoodItem.objects.autocomplete(query)]
+
+    def test_prefix_matches_come_before_word_matches(self):
+        self.assertEqual(
+            self.names('chick'),
+            ['Chicken Breast, raw', 'Chicken thigh', 'Breast of chicken (roasted)'],
+        )
+        # Every word of the query may be a prefix of any word of the name
+        self.assertCountEqual(self.names('breast chi'), ['Breast of chicken (roasted)', 'Chicken Breast, raw'])
+        self.assertEqual(self.names('creme'), ['Crème fraîche'])
+        self.assertEqual(self.names('  '), [])
+
+    def test_deleted_items_leave_the_word_index(self):
+        FoodItem.objects.filter(name='Breast of chicken (roasted)').delete()
+        self.assertEqual(self.names('roasted'), [])
+
+    def test_endpoint(self):
+        create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+        url = reverse('main:food_autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'r'}).json(), {'results': []})
+        results = self.client.get(url, {'q': 'rice'}).json()['results']
+        self.assertEqual([(result['name'], result['calories_per_100g']) for result in results], [('Rice', '100.00')])
+
+
+class ImportFoodCatalogTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def run_import(self, name, content, *args):
+        path = self.directory / name
+        if name.endswith('.gz'):
+            with gzip.open(path, 'wt', encoding='utf-8') as handle:
+                handle.write(content)
+        else:
+            path.write_text(content, encoding='utf-8')
+        call_command('import_food_catalog', str(path), *args, stdout=io.StringIO())
+        return path
+
+    def catalog(self):
+        return list(FoodItem.objects.order_by('external_id').values_list('source', 'external_id', 'name', 'calories_per_100g'))
+
+    def test_csv_import_skips_invalid_rows_and_upserts_on_rerun(self):
+        content = (
+            'id,description,kcal,protein\n'
+            '1,Oats,389,16.9\n'
+            '2,,100,1\n'
+            '3,Banana,-5,1\n'
+            '4,Egg,155,13\n'
+        )
+        arguments = ['--column', 'external_id=id', '--column', 'name=description',
+                     '--column', 'calories_per_100g=kcal', '--column', 'protein_per_100g=protein']
+        path = self.run_import('usda.csv', content, *arguments)
+        self.assertEqual(self.catalog(), [('usda', '1', 'Oats', Decimal('389.00')), ('usda', '4', 'Egg', Decimal('155.00'))])
+        self.assertFalse(path.with_name('usda.csv.checkpoint').exists())
+
+        self.run_import('usda.csv', content.replace('Oats,389', 'Rolled oats,379'), *arguments)
+        self.assertEqual(self.catalog()[0], ('usda', '1', 'Rolled oats', Decimal('379.00')))
+        self.assertEqual(FoodItem.objects.get(external_id='1').normalized_name, 'rolled oats')
+        self.assertEqual(FoodItem.objects.count(), 2)
+
+    def test_gzipped_jsonl_and_resume(self):
+        lines = [json.dumps({'name': f'Item {number}', 'calories_per_100g': number}) for number in range(1, 6)]
+        path = self.directory / 'off.jsonl.gz'
+        path.with_name('off.jsonl.gz.checkpoint').write_text('3')
+        self.run_import('off.jsonl.gz', '\n'.join(lines) + '\nnot json\n', '--resume', '--batch-size', '2')
+        # The first three rows were committed by the "interrupted" run
+        self.assertEqual(
+            list(FoodItem.objects.values_list('name', flat=True)),
+            ['Item 4', 'Item 5'],
+        )
+
+    def test_unknown_column_is_an_error(self):
+        with self.assertRaises(CommandError):
+            self.run_import('bad.csv', 'name\nOats\n', '--column', 'sugar=sugars')
+
+
+class EditMealTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.meal = create_meal(self.user, self.today, [(100, 200, 10, 5, 20), (50, 100, 0, 0, 0), (10, 900, 0, 100, 0)])
+        self.kept, self.changed, self.removed = self.meal.foods.order_by('id')
+        self.client.login(username='lifter', password=PASSWORD)
+
+    def food_data(self, index, food=None, **values):
+        values = {
+            'name': food.name if food else 'Honey', 'grams': food.grams if food else 20,
+            'calories_per_100g': food.calories_per_100g if food else 300,
+            'carbs_per_100g': food.carbs_per_100g if food else 80,
+            'fat_per_100g': food.fat_per_100g if food else 0,
+            'protein_per_100g': food.protein_per_100g if food else 0,
+            **values,
+        }
+        if food:
+            values['food_id'] = food.id
+        return {f'form-{index}-{field}': value for field, value in values.items()}
+
+    def post(self, date, *foods):
+        data = {
+            'name': 'Edited', 'date_consumed': date.isoformat(),
+            'form-TOTAL_FORMS': str(len(foods)), 'form-INITIAL_FORMS': '3',
+            'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+        }
+        for food in foods:
+            data.update(food)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('main:edit_meal', args=[self.meal.id]), data)
+        self.assertRedirects(response, reverse('main:meal_detail', args=[self.meal.id]), fetch_redirect_response=False)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_only_changed_foods_are_written(self):
+        statements = self.post(
+            self.today,
+            self.food_data(0, self.kept),
+            self.food_data(1, self.changed, grams=80),
+            self.food_data(2, self.removed, DELETE='on'),
+            self.food_data(3),
+        )
+        food_writes = [
+            match.group(1) for match in (re.match(r'(INSERT INTO|UPDATE|DELETE FROM) "main_food"', sql) for sql in statements)
+            if match
+        ]
+        self.assertEqual(sorted(food_writes), ['DELETE FROM', 'INSERT INTO', 'UPDATE'])
+        self.assertEqual(
+            list(self.meal.foods.order_by('id').values_list('id', 'grams')),
+            [(self.kept.id, 100), (self.changed.id, 80), (self.meal.foods.latest('id').id, 20)],
+        )
+        # 200 + 80 + 60 calories, refreshed from the new foods
+        self.assertEqual(DailyNutrition.objects.get(user=self.user, date=self.today).calories, 340)
+
+    def test_moving_the_meal_refreshes_both_days(self):
+        earlier = self.today - dt.timedelta(days=3)
+        self.post(earlier, self.food_data(0, self.kept), self.food_data(1, self.changed), self.food_data(2, self.removed))
+        self.assertFalse(DailyNutrition.objects.filter(user=self.user, date=self.today).exists())
+        self.assertEqual(DailyNutrition.objects.get(user=self.user, date=earlier).calories, 340)
+
+    def test_foreign_food_ids_are_not_edited(self):
+        other = create_meal(create_user('other'), self.today, [(100, 100, 0, 0, 0)]).foods.get()
+        self.post(
+            self.today,
+            self.food_data(0, self.kept), self.food_data(1, self.changed), self.food_data(2, self.removed),
+            {**self.food_data(3, grams=5), 'form-3-food_id': other.id},
+        )
+        self.assertEqual(Food.objects.get(pk=other.pk).grams, 100)
+        self.assertEqual(self.meal.foods.count(), 4)
+
+
+class CreateWorkoutTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+
+    def post(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('main:create_workout'), data)
+        return response, len(queries)
+
+    def test_sets_are_bulk_inserted(self):
+        small, small_queries = self.post(workout_form())
+        self.assertEqual(small.status_code, 302)
+
+        exercises = [(f'Exercise {index}', [(8, '100.5', 'Kg')] * 5) for index in range(10)]
+        data = workout_form(exercises=exercises)
+        # A set left without reps is skipped and the later sets renumbered
+        data['exercise_3_set_2_reps'] = ''
+        large, large_queries = self.post(data)
+        self.assertEqual(large.status_code, 302)
+        # Ten exercises with 49 sets cost as many queries as one exercise with two
+        self.assertEqual(large_queries, small_queries)
+
+        workout = self.user.workouts.get(workout_number=2)
+        self.assertEqual(Set.objects.filter(exercise__workout=workout).count(), 49)
+        self.assertEqual(
+            list(workout.exercises.get(name='Exercise 3').sets.values_list('set_number', flat=True)),
+            [1, 2, 3, 4],
+        )
+        self.assertEqual(UserProfile.objects.get(user=self.user).last_workout_number, 2)
+
+    def test_invalid_sets_write_nothing(self):
+        data = workout_form()
+        data['exercise_0_set_0_weight'] = 'heavy'
+        response, _ = self.post(data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['exercise_error'], "Reps and weight must be numbers.")
+
+        data = workout_form(exercises=[('Squat', [(1, '100', 'Kg')] * (MAX_SETS_PER_EXERCISE + 1))])
+        response, _ = self.post(data)
+        self.assertIn('at most', response.context['exercise_error'])
+        self.assertFalse(Workout.objects.exists())
+
+    def test_failed_write_rolls_back_everything(self):
+        with mock.patch('main.views.analytics.record_workout', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            self.client.post(reverse('main:create_workout'), workout_form())
+        self.assertFalse(Workout.objects.exists())
+        self.assertFalse(Set.objects.exists())
+        self.assertEqual(UserProfile.objects.get(user=self.user).last_workout_number, 0)
+
+
+class MyWorkoutsTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+
+    def create_workouts(self, count, start=1):
+        for number in range(start, start + count):
+            create_workout(self.user, f'Workout {number}', [
+                ('Bench Press', [(5, '100', 'Kg'), (6, '110', 'Kg'), (7, '120', 'Kg')]),
+                ('Curl', [(10, '44.09', 'Lbs')]),
+            ], number=number)
+
+    def get(self, page=1):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('main:my_workouts'), {'page': page})
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_workouts(self):
+        self.create_workouts(2)
+        _, few_queries = self.get()
+        self.create_workouts(WORKOUTS_PER_PAGE + 3, start=3)
+        response, many_queries = self.get()
+        self.assertEqual(many_queries, few_queries)
+        self.assertEqual(len(response.context['workouts']), WORKOUTS_PER_PAGE)
+
+        response, _ = self.get(page=2)
+        self.assertEqual(len(response.context['workouts']), 5)
+        self.assertEqual(response.context['workouts'][4].title, 'Workout 1')
+
+    def test_set_summaries_use_the_display_unit(self):
+        self.create_workouts(1)
+        response, _ = self.get()
+        self.assertContains(response, '5 - 6 - 7')
+        self.assertContains(response, '100.00 - 110.00 - 120.00 Kg')
+        # 44.09 lb shown in the profile's unit
+        self.assertContains(response, '20.00 Kg')
+
+
+class ExerciseSeriesTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+        self.client.post(reverse('main:create_workout'), workout_form())
+        self.client.post(reverse('main:create_workout'), workout_form(exercises=(
+            ('bench press ', [(10, '225', 'Lbs')]),
+            ('Squat', [(5, '140', 'Kg')]),
+        )))
+
+    def series_rows(self):
+        return list(ExerciseSeries.objects.order_by('exercise_id').values_list(
+            'exercise_id', 'exercise_key', 'tonnage_kg', 'best_set_weight_kg', 'best_set_reps',
+            'estimated_1rm_epley_kg', 'estimated_1rm_brzycki_kg',
+        ))
+
+    def test_series_endpoint(self):
+        url = reverse('main:exercise_series')
+        self.assertEqual(
+            [(row['exercise_key'], row['sessions']) for row in self.client.get(url).json()['exercises']],
+            [('bench press', 2), ('squat', 1)],
+        )
+        points = self.client.get(url, {'exercise': 'Bench Press'}).json()['points']
+        self.assertEqual(
+            [(point['tonnage_kg'], point['best_set'], point['estimated_1rm_kg']['epley']) for point in points],
+            [
+                (830.0, {'weight_kg': 110.0, 'reps': 3}, 121.0),
+                # 225 lb is 102.06 kg
+                (1020.6, {'weight_kg': 102.06, 'reps': 10}, 136.08),
+            ],
+        )
+        latest = self.client.get(url, {'exercise': 'bench press', 'limit': 1}).json()['points']
+        self.assertEqual([point['tonnage_kg'] for point in latest], [1020.6])
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_series_points_use_the_local_date(self):
+        # 02:30 UTC is still the previous evening in New York
+        ExerciseSeries.objects.filter(workout__workout_number=1).update(
+            performed_at=dt.datetime(2026, 3, 10, 2, 30, tzinfo=dt.timezone.utc),
+        )
+        points = self.client.get(reverse('main:exercise_series'), {'exercise': 'bench press'}).json()['points']
+        self.assertEqual(points[0]['date'], '2026-03-09')
+
+    def test_rebuild_and_backfill_reproduce_incremental_rows(self):
+        incremental = self.series_rows()
+        self.assertEqual(len(incremental), 3)
+        call_command('rebuild_exercise_series', stdout=io.StringIO())
+        self.assertEqual(self.series_rows(), incremental)
+
+        backfill = import_module('main.migrations.0024_backfill_exercise_series').backfill_exercise_series
+        ExerciseSeries.objects.all().delete()
+        backfill(apps, None)
+        self.assertEqual(self.series_rows(), incremental)
+
+        # Only exercises without a row are filled in; the others are kept as they are
+        kept = set(ExerciseSeries.objects.exclude(workout__workout_number=2).values_list('id', flat=True))
+        ExerciseSeries.objects.filter(workout__workout_number=2).delete()
+        backfill(apps, None)
+        self.assertEqual(self.series_rows(), incremental)
+        self.assertLessEqual(kept, set(ExerciseSeries.objects.values_list('id', flat=True)))
+
+    def test_deleting_a_workout_removes_its_series(self):
+        self.client.post(reverse('main:delete_workout', args=[self.user.workouts.get(workout_number=2).id]))
+        self.assertEqual([row[1] for row in self.series_rows()], ['bench press'])
+
+
+class PersonalRecordTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+        self.client.post(reverse('main:create_workout'), workout_form())
+        self.client.post(reverse('main:create_workout'), workout_form(exercises=(
+            ('bench press ', [(10, '225', 'Lbs')]),
+            ('Squat', [(5, '140', 'Kg')]),
+        )))
+        self.first, self.second = self.user.workouts.order_by('workout_number')
+
+    def records(self):
+        return list(PersonalRecord.objects.order_by('exercise_key').values_list(
+            'exercise_key', 'heaviest_weight_kg', 'heaviest_workout', 'best_1rm_kg', 'best_1rm_workout',
+            'best_volume_kg', 'best_volume_workout', 'reps_at_weight', 'achieved_at',
+        ))
+
+    def test_records_follow_new_workouts(self):
+        bench = PersonalRecord.objects.get(exercise_key='bench press')
+        # 110 kg stays the heaviest; 10 × 102.06 kg beats the estimated 1RM and the volume
+        self.assertEqual((bench.heaviest_weight_kg, bench.heaviest_workout_id), (Decimal('110.00'), self.first.id))
+        self.assertEqual((bench.best_1rm_kg, bench.best_1rm_workout_id), (Decimal('136.08'), self.second.id))
+        self.assertEqual((bench.best_volume_kg, bench.best_volume_workout_id), (Decimal('1020.60'), self.second.id))
+        self.assertEqual(bench.reps_at_weight, {
+            '100.00': [5, self.first.id], '110.00': [3, self.first.id], '102.06': [10, self.second.id],
+        })
+        self.assertContains(self.client.get(reverse('main:workout_detail', args=[self.second.id])), 'pr-badge')
+        self.assertContains(self.client.get(reverse('main:homepage')), 'New personal record')
+
+    def test_deleting_a_workout_recomputes_its_records(self):
+        self.client.post(reverse('main:delete_workout', args=[self.second.id]))
+        self.assertFalse(PersonalRecord.objects.filter(exercise_key='squat').exists())
+        bench = PersonalRecord.objects.get(exercise_key='bench press')
+        self.assertEqual((bench.best_1rm_kg, bench.best_1rm_workout_id), (Decimal('121.00'), self.first.id))
+        self.assertEqual(bench.reps_at_weight, {'100.00': [5, self.first.id], '110.00': [3, self.first.id]})
+
+    def test_rebuilds_reproduce_incremental_records(self):
+        incremental = self.records()
+        analytics.recompute_personal_records(self.user.id, ['bench press', 'squat'])
+        self.assertEqual(self.records(), incremental)
+
+        PersonalRecord.objects.all().delete()
+        call_command('rebuild_exercise_series', stdout=io.StringIO())
+        self.assertEqual(self.records(), incremental)
+
+        backfill = import_module('main.migrations.0025_backfill_personal_records').backfill_personal_records
+        PersonalRecord.objects.all().delete()
+        backfill(apps, None)
+        self.assertEqual(self.records(), incremental)
+
+        # Only exercises without a record are filled in
+        squat = PersonalRecord.objects.get(exercise_key='squat')
+        PersonalRecord.objects.filter(exercise_key='bench press').delete()
+        backfill(apps, None)
+        self.assertEqual(self.records(), incremental)
+        self.assertEqual(PersonalRecord.objects.get(exercise_key='squat').pk, squat.pk)
+
+
+class ExerciseDefinitionTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+        self.bench = ExerciseDefinition.objects.create(name='Bench Press')
+        ExerciseAlias.objects.create(definition=self.bench, name='Bench')
+
+    def test_resolve_prefers_aliases_and_creates_unknown_names_once(self):
+        resolved = ExerciseDefinition.objects.resolve(['bench', 'Bench  press ', 'Front Squat', 'front squat'])
+        self.assertEqual(resolved['bench'], self.bench)
+        self.assertEqual(resolved['bench press'], self.bench)
+        self.assertEqual(resolved['front squat'].name, 'Front Squat')
+        self.assertEqual(ExerciseDefinition.objects.count(), 2)
+        self.assertEqual(ExerciseDefinition.objects.lookup(' BENCH'), self.bench)
+        self.assertIsNone(ExerciseDefinition.objects.lookup('Deadlift'))
+
+    def test_aliased_names_share_one_history(self):
+        self.client.post(reverse('main:create_workout'), workout_form(exercises=(('Bench', [(5, '100', 'Kg')]),)))
+        self.client.post(reverse('main:create_workout'), workout_form(exercises=(('bench press', [(5, '105', 'Kg')]),)))
+        first, second = self.user.workouts.order_by('workout_number')
+        ExerciseSeries.objects.filter(workout=first).update(performed_at=timezone.now() - dt.timedelta(days=1))
+
+        self.assertEqual(set(Exercise.objects.values_list('definition', flat=True)), {self.bench.id})
+        self.assertEqual([row.workout_id for row in analytics.recent_sessions(self.user, self.bench)], [first.id, second.id])
+        self.assertEqual([row.workout_id for row in analytics.recent_sessions(self.user, self.bench, 1)], [second.id])
+
+        url = reverse('main:exercise_series')
+        data = self.client.get(url, {'exercise': 'bench'}).json()
+        self.assertEqual(data['exercise'], 'bench press')
+        self.assertEqual([point['workout_id'] for point in data['points']], [first.id, second.id])
+        data = self.client.get(url, {'exercise': 'Bench Press', 'limit': '1'}).json()
+        self.assertEqual([point['workout_id'] for point in data['points']], [second.id])
+        self.assertEqual(self.client.get(url, {'exercise': 'Deadlift'}).json()['points'], [])
+
+
+class SetWeightTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+
+    def test_save_and_bulk_create_keep_weight_kg_in_sync(self):
+        self.client.post(reverse('main:create_workout'), workout_form(exercises=(
+            ('Bench Press', [(5, '225', 'Lbs'), (3, '100', 'Kg')]),
+        )))
+        self.assertEqual(list(Set.objects.order_by('set_number').values_list('weight_kg', flat=True)), [
+            Decimal('102.06'), Decimal('100.00'),
+        ])
+
+        heavy = Set.objects.get(set_number=2)
+        heavy.weight, heavy.weight_unit = Decimal('315'), Set.LBS
+        heavy.save()
+        heavy.refresh_from_db()
+        self.assertEqual(heavy.weight_kg, Decimal('142.88'))
+        self.assertEqual(heavy.weight_in(Set.LBS), Decimal('315'))
+        self.assertEqual(heavy.weight_in(Set.KG), Decimal('142.88'))
+
+        light = Set.objects.get(set_number=1)
+        light.weight_unit = Set.KG
+        self.assertEqual(light.weight_in(Set.LBS), Decimal('496.04'))
+
+    def test_totals_sum_across_units(self):
+        self.client.post(reverse('main:create_workout'), workout_form(exercises=(
+            ('Bench Press', [(5, '225', 'Lbs'), (3, '100', 'Kg'), (0, '140', 'Kg')]),
+        )))
+        totals = Set.objects.totals()
+        self.assertEqual(totals['volume_kg'], Decimal('810.30'))
+        self.assertEqual(totals['heaviest_kg'], Decimal('102.06'))
+        self.assertEqual(totals['total_reps'], 8)
+
+        # Shown in the profile's unit, not the unit each set was logged in
+        workout = self.user.workouts.get()
+        response = self.client.get(reverse('main:workout_detail', args=[workout.id]))
+        self.assertContains(response, '100.00 Kg')
+        self.assertContains(response, '102.06 Kg')
+        self.assertContains(response, 'Volume:</strong> 810 Kg over 8 reps')
+
+    def test_migration_fills_existing_rows(self):
+        create_workout(self.user, exercises=(('Squat', [(5, '100', 'Kg'), (5, '135', 'Lbs')]),))
+        Set.objects.update(weight_kg=0)
+        import_module('main.migrations.0019_set_weight_kg').fill_weight_kg(apps, None)
+        self.assertEqual(sorted(Set.objects.values_list('weight_kg', flat=True)), [Decimal('61.23'), Decimal('100.00')])
+
+
+class WorkoutStatisticsTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.profile = self.user.profile
+        now = timezone.now()
+        for number, days_ago in enumerate([0, 0, 1, 2, 5, 6, 7, 8, 400], start=1):
+            workout = create_workout(self.user, number=number)
+            Workout.objects.filter(id=workout.id).update(created_at=now - dt.timedelta(days=days_ago))
+
+    def test_streaks_and_heatmap(self):
+        stats = self.profile.get_workout_statistics()
+        self.assertEqual(stats['total_workouts'], 9)
+        self.assertEqual(stats['current_streak'], 3)
+        self.assertEqual(stats['longest_streak'], 4)
+        self.assertEqual(stats['heatmap_start'], timezone.localdate() - dt.timedelta(days=364))
+        self.assertEqual(len(stats['heatmap']), 365)
+        self.assertEqual(sum(stats['heatmap']), 8)
+        self.assertEqual(stats['heatmap'][-3:], [1, 1, 2])
+
+    def test_cached_until_a_workout_is_created(self):
+        self.profile.get_workout_statistics()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.profile.get_workout_statistics()['total_workouts'], 9)
+
+        self.client.login(username='lifter', password=PASSWORD)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('main:create_workout'), workout_form())
+        self.assertEqual(self.profile.get_workout_statistics()['total_workouts'], 10)
+        self.assertContains(self.client.get(reverse('main:homepage')), 'heatmap-level-3')
+
+
+class ExportTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.login(username='lifter', password=PASSWORD)
+        exercises = [(name, [(5, '100', 'Kg'), (5, '225', 'Lbs'), (3, '110', 'Kg')]) for name in ('Squat', 'Bench', 'Row')]
+        for number in range(1, 4):
+            create_workout(self.user, exercises=exercises, number=number)
+        create_workout(create_user('other'))
+
+    def download(self, name, export_format):
+        response = self.client.get(reverse(f'main:export_{name}'), {'format': export_format})
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="{name}.{export_format}"')
+        return b''.join(response.streaming_content).decode()
+
+    def test_workouts_csv_has_one_row_per_set(self):
+        rows = list(csv.DictReader(io.StringIO(self.download('workouts', 'csv'))))
+        self.assertEqual(len(rows), 27)
+        self.assertEqual(
+            [rows[1][column] for column in ('workout_number', 'exercise', 'set_number', 'weight', 'weight_unit', 'weight_kg')],
+            ['1', 'Squat', '2', '225.00', 'Lbs', '102.06'],
+        )
+
+    def test_workouts_jsonl_has_one_document_per_workout(self):
+        documents = [json.loads(line) for line in self.download('workouts', 'jsonl').splitlines()]
+        self.assertEqual([document['workout_number'] for document in documents], [1, 2, 3])
+        self.assertEqual([exercise['name'] for exercise in documents[0]['exercises']], ['Squat', 'Bench', 'Row'])
+        self.assertEqual(documents[0]['exercises'][0]['sets'][1], {
+            'set_number': 2, 'reps': 5, 'weight': 225.0, 'weight_unit': 'Lbs', 'weight_kg': 102.06,
+        })
+
+    def test_meals_csv_keeps_meals_without_foods(self):
+        today = timezone.localdate()
+        create_meal(self.user, today, [(150, 200, 10, 5, 20)])
+        create_meal(self.user, today, [], name='Skipped')
+        rows = list(csv.DictReader(io.StringIO(self.download('meals', 'csv'))))
+        self.assertEqual([(row['meal'], row['food']) for row in rows], [('Dinner', 'Food 150g'), ('Skipped', '')])
+        self.assertEqual(Decimal(rows[0]['calories']), 300)
+        self.assertEqual(rows[1]['calories'], '')
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('main:export_workouts'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+STRONG_CSV = """Date,Workout Name,Exercise Name,Set Order,Weight,Unit,Reps
+2024-01-01 09:00:00,Push,Bench Press,2,110,kg,3
+2024-01-01 09:00:00,Push,Bench Press,1,100,kg,5
+2024-01-01 09:00:00,Push,Treadmill,1,0,kg,
+2024-01-02 09:00:00,Pull,Barbell Row,1,185,lbs,8
+2024-01-03 09:00:00,Legs,Squat,1,140,kg,5
+yesterday,Legs,Squat,2,140,kg,5
+"""
+
+HEVY_CSV = """title,start_time,exercise_title,set_index,weight_kg,reps
+Upper,"1 Jan 2024, 10:00",Bench Press,0,100,5
+Upper,"1 Jan 2024, 10:00",Overhead Press,0,60,8
+"""
+
+
+class ImportWorkoutsTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+
+    def test_strong_export(self):
+        legs = create_workout(self.user, title='Legs')
+        Workout.objects.filter(id=legs.id).update(created_at=timezone.make_aware(dt.datetime(2024, 1, 3, 18)))
+
+        result = importers.import_workouts(self.user, io.StringIO(STRONG_CSV))
+        self.assertEqual(result, {'workouts': 2, 'sets': 3, 'duplicates': 1, 'skipped_rows': 2})
+
+        # Renumbered by date, with the existing workout last
+        self.assertEqual(list(self.user.workouts.order_by('workout_number').values_list('title', flat=True)), ['Push', 'Pull', 'Legs'])
+        self.assertEqual(UserProfile.objects.get(user=self.user).last_workout_number, 3)
+        push = self.user.workouts.get(title='Push')
+        self.assertEqual(push.created_at, timezone.make_aware(dt.datetime(2024, 1, 1, 9)))
+        self.assertEqual(
+            list(Set.objects.filter(exercise__workout=push).values_list('set_number', 'reps', 'weight_kg')),
+            [(1, 5, Decimal('100.00')), (2, 3, Decimal('110.00'))],
+        )
+        self.assertEqual(Set.objects.get(exercise__name='Barbell Row').weight_kg, Decimal('83.91'))
+        self.assertEqual(ExerciseSeries.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(PersonalRecord.objects.get(exercise_key='bench press').heaviest_weight_kg, Decimal('110.00'))
+
+        # Importing the same file again only finds duplicates
+        result = importers.import_workouts(self.user, io.StringIO(STRONG_CSV))
+        self.assertEqual(result['workouts'], 0)
+        self.assertEqual(result['duplicates'], 3)
+
+    def test_hevy_upload(self):
+        self.client.login(username='lifter', password=PASSWORD)
+        upload = SimpleUploadedFile('hevy.csv', HEVY_CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('main:import_workouts'), {'csv_file': upload, 'weight_unit': Set.LBS})
+        self.assertContains(response, 'Imported 1 workout (2 sets).')
+        workout = self.user.workouts.get()
+        self.assertEqual(workout.title, 'Upper')
+        self.assertEqual(list(Set.objects.values_list('weight_unit', flat=True)), [Set.KG, Set.KG])
+
+    def test_non_finite_and_huge_values_are_skipped(self):
+        rows = ['inf,100', '-Infinity,100', 'NaN,100', '1e30,100', '1001,100', '5,inf', '5,1e400', '5,100']
+        content = 'Date,Exercise Name,Reps,Weight\n' + ''.join(f'2024-01-01,Squat,{row}\n' for row in rows)
+        self.client.login(username='lifter', password=PASSWORD)
+        upload = SimpleUploadedFile('strong.csv', content.encode(), content_type='text/csv')
+        response = self.client.post(reverse('main:import_workouts'), {'csv_file': upload, 'weight_unit': Set.KG})
+        self.assertContains(response, 'Imported 1 workout (1 set).')
+        self.assertContains(response, 'Ignored 7 rows')
+        self.assertEqual(list(Set.objects.values_list('reps', 'weight')), [(5, Decimal('100.00'))])
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(importers.WorkoutImportError, 'Missing column(s): reps'):
+            importers.import_workouts(self.user, io.StringIO('Date,Exercise Name\n2024-01-01,Squat\n'))
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as handle:
+            handle.write('Date,Exercise Name\n2024-01-01,Squat\n')
+            handle.flush()
+            with self.assertRaisesMessage(CommandError, 'Missing column(s): reps'):
+                call_command('import_workouts', 'lifter', handle.name, stdout=io.StringIO())
+        self.assertFalse(self.user.workouts.exists())
+
+
+class CalorieTargetBatchTests(EmptyCacheMixin, TestCase):
+    def stored_targets(self, profile):
+        return tuple(getattr(profile, field) for field in calorie_targets.TARGET_FIELDS)
+
+    def test_batch_matches_the_per_profile_methods(self):
+        rng = random.Random(17)
+        for index in range(60):
+            # No password, so 60 users do not cost 60 password hashes
+            UserProfile.objects.create(
+                user=User.objects.create(username=f'user{index}'),
+                age=rng.choice([None, rng.randint(13, 90)]),
+                gender=rng.choice([None, UserProfile.MALE, UserProfile.FEMALE]),
+                current_weight=rng.choice([None, Decimal(rng.randint(4000, 15000)) / 100]),
+                target_weight=rng.choice([None, Decimal(rng.randint(4000, 15000)) / 100]),
+                weight_unit=rng.choice([UserProfile.KG, UserProfile.LBS]),
+                weight_loss_rate=Decimal(rng.randint(1, 20)) / 10,
+                activity_level=rng.choice([level for level, label in UserProfile.ACTIVITY_LEVEL_CHOICES]),
+            )
+        UserProfile.objects.update(**{field: None for field in UserProfile.CALORIE_TARGET_FIELDS})
+
+        self.assertEqual(calorie_targets.recompute_calorie_targets(batch_size=7), 60)
+        # The random profiles cover both complete and incomplete inputs
+        self.assertTrue(UserProfile.objects.filter(daily_calorie_target__isnull=False).exists())
+        self.assertTrue(UserProfile.objects.filter(bmr__isnull=False, daily_calorie_target__isnull=True).exists())
+        for profile in UserProfile.objects.all():
+            stored = self.stored_targets(profile)
+            self.assertIsNotNone(profile.calorie_targets_updated_at)
+            profile.refresh_calorie_targets()
+            self.assertEqual(stored, self.stored_targets(profile), profile.user.username)
+
+    def test_command(self):
+        create_user()
+        UserProfile.objects.update(daily_calorie_target=None)
+        out = io.StringIO()
+        call_command('recompute_calorie_targets', '--batch-size', '10', stdout=out)
+        self.assertIn('Recomputed calorie targets for 1 profiles', out.getvalue())
+        self.assertEqual(UserProfile.objects.get().daily_calorie_target, 2015)
+
+
+class MetricMemoTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        create_user()
+        self.profile = UserProfile.objects.get()
+
+    def test_repeated_calls_hit_the_cache(self):
+        self.assertEqual(self.profile.calculate_daily_calorie_target(), 2015)
+        first = self.profile.metric_cache_info()
+        self.assertGreater(first['misses'], 0)
+
+        self.assertEqual(self.profile.calculate_daily_calorie_target(), 2015)
+        self.assertEqual(self.profile.calculate_bmr(), 1655)
+        second = self.profile.metric_cache_info()
+        self.assertEqual(second['misses'], first['misses'])
+        self.assertEqual(second['hits'], first['hits'] + 2)
+        self.assertEqual(second['size'], first['size'])
+
+    def test_changed_inputs_drop_the_cache(self):
+        self.profile.calculate_daily_calorie_target()
+        self.profile.age = 40
+        self.assertEqual(self.profile.metric_cache_info()['size'], 0)
+        self.assertEqual(self.profile.calculate_bmr(), 1605)
+        self.assertEqual(self.profile.calculate_daily_calorie_target(), 1938)
+
+        self.profile.save()
+        self.assertEqual(UserProfile.objects.get().daily_calorie_target, 1938)
+
+
+class WeightHistoryTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(current_weight=None)
+        self.start = timezone.now() - dt.timedelta(days=10)
+
+    def trends(self):
+        return [round(trend, 2) for trend in WeightEntry.objects.filter(user=self.user).values_list('trend_kg', flat=True)]
+
+    def test_record_smooths_and_backdated_entries_resmooth(self):
+        WeightEntry.objects.record(self.user.id, 100, self.start)
+        WeightEntry.objects.record(self.user.id, 98, self.start + dt.timedelta(days=1))
+        self.assertEqual(self.trends(), [100, 99.8])
+
+        # A second weigh-in the same day replaces the first
+        WeightEntry.objects.record(self.user.id, 97, self.start + dt.timedelta(days=1))
+        self.assertEqual(self.trends(), [100, 99.7])
+
+        WeightEntry.objects.record(self.user.id, 90, self.start - dt.timedelta(days=1))
+        self.assertEqual(self.trends(), [90, 91, 91.6])
+        self.assertAlmostEqual(UserProfile.objects.get(user=self.user).weight_trend_kg, 91.6)
+
+    def test_profile_save_records_a_weigh_in(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.current_weight, profile.weight_unit = Decimal('180'), UserProfile.LBS
+        profile.save()
+        entry = WeightEntry.objects.get(user=self.user)
+        self.assertEqual(entry.weight_kg, Decimal('81.65'))
+        self.assertEqual(UserProfile.objects.get(user=self.user).weight_trend_kg, entry.trend_kg)
+
+    def test_failed_weigh_in_rolls_back_the_profile(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.current_weight = Decimal('80')
+        with mock.patch.object(WeightEntry, 'save', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            profile.save()
+        stored = UserProfile.objects.get(user=self.user)
+        self.assertIsNone(stored.current_weight)
+        self.assertIsNone(stored.weight_trend_kg)
+
+    def test_lttb_keeps_the_ends_and_the_peak(self):
+        points = [(x, 100 if x == 50 else 0) for x in range(100)]
+        sampled = weight_history.downsample_lttb(points, 10)
+        self.assertEqual(len(sampled), 10)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        self.assertIn((50, 100), sampled)
+        self.assertEqual(weight_history.downsample_lttb(points[:5], 10), points[:5])
+
+    def test_series_endpoint(self):
+        WeightEntry.objects.bulk_create([
+            WeightEntry(user=self.user, measured_at=self.start - dt.timedelta(days=day), weight_kg=80 + day % 3, trend_kg=80)
+            for day in range(50)
+        ])
+        self.client.login(username='lifter', password=PASSWORD)
+        url = reverse('main:weight_series')
+        points = self.client.get(url, {'points': 10}).json()['points']
+        self.assertEqual(len(points), 10)
+        self.assertEqual(points[-1]['measured_at'], self.start.isoformat())
+
+        end = timezone.localdate(self.start)
+        data = self.client.get(url, {'start': (end - dt.timedelta(days=4)).isoformat(), 'end': end.isoformat()}).json()
+        self.assertEqual(len(data['points']), 5)
+        self.assertEqual(len(self.client.get(url, {'points': 1}).json()['points']), 3)
+
+
+class AdaptiveTdeeTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.today = timezone.localdate()
+
+    def log_day(self, day, calories=2000):
+        """A day at `calories` intake on a trend losing 500 kcal worth of weight per day."""
+        DailyNutrition.objects.create(user=self.user, date=day, calories=calories, meal_count=1)
+        trend = 90 - (day - self.today).days * 500 / energy_balance.CALORIES_PER_KG
+        WeightEntry.objects.create(
+            user=self.user, measured_at=timezone.make_aware(dt.datetime.combine(day, dt.time(12))),
+            weight_kg=Decimal(trend).quantize(Decimal('0.01')), trend_kg=trend,
+        )
+
+    def test_fit_tdee(self):
+        import numpy as np
+
+        days = np.arange(28, dtype=np.float64)
+        intake = np.full(28, 2000.0)
+        self.assertEqual(energy_balance.fit_tdee(intake, 90 - days * 500 / 7700), 2500.0)
+        self.assertIsNone(energy_balance.fit_tdee(np.full(28, np.nan), 90 - days * 500 / 7700))
+        # Weigh-ins must span at least a week
+        weight = np.full(28, np.nan)
+        weight[[0, 3]] = [90, 89.9]
+        self.assertIsNone(energy_balance.fit_tdee(intake, weight))
+
+    def test_update_advances_the_window(self):
+        for offset in range(1, 41):
+            self.log_day(self.today - dt.timedelta(days=offset))
+
+        generation = UserProfile.dashboard_generation(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(energy_balance.update_tdee_estimates(today=self.today), 1)
+        self.assertEqual(UserProfile.dashboard_generation(self.user.id), generation + 1)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.adaptive_tdee, 2500.0)
+        self.assertEqual(profile.daily_calorie_target, 1950)
+        estimate = TdeeEstimate.objects.get(user=self.user)
+        self.assertEqual(estimate.window_end, self.today - dt.timedelta(days=1))
+        self.assertEqual(len(estimate.daily_intake), energy_balance.WINDOW_DAYS)
+
+        # Already current: only the user list and the window states are read
+        with self.assertNumQueries(2):
+            self.assertEqual(energy_balance.update_tdee_estimates(today=self.today), 0)
+
+        self.log_day(self.today)
+        self.assertEqual(energy_balance.update_tdee_estimates(today=self.today + dt.timedelta(days=1)), 0)
+        estimate.refresh_from_db()
+        self.assertEqual(estimate.window_end, self.today)
+        self.assertEqual(len(estimate.daily_weight_kg), energy_balance.WINDOW_DAYS)
+
+        # Meals changed inside the window force a refit from scratch
+        DailyNutrition.objects.refresh(self.user.id, [self.today - dt.timedelta(days=3)])
+        estimate.refresh_from_db()
+        self.assertIsNone(estimate.window_end)
+
+    def test_batch_and_scalar_agree_without_a_current_weight(self):
+        create_user('empty', current_weight=None)
+        UserProfile.objects.update(adaptive_tdee=2500.0)
+        calorie_targets.recompute_calorie_targets()
+        for profile in UserProfile.objects.all():
+            stored = (profile.daily_calorie_target, profile.weekly_calorie_target, profile.monthly_calorie_target)
+            profile.refresh_calorie_targets()
+            self.assertEqual(stored, (profile.daily_calorie_target, profile.weekly_calorie_target, profile.monthly_calorie_target))
+        self.assertIsNone(UserProfile.objects.get(user__username='empty').daily_calorie_target)
+        self.assertEqual(UserProfile.objects.get(user=self.user).daily_calorie_target, 1950)
+
+
+class DashboardCacheTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Run the setup's own refresh now, so each change below schedules a new one
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = create_user()
+            self.workout = create_workout(self.user)
+        self.client.login(username='lifter', password=PASSWORD)
+
+    def generation(self):
+        return UserProfile.dashboard_generation(self.user.id)
+
+    def homepage_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('main:homepage'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_second_homepage_hit_is_served_from_the_cache(self):
+        cold = self.homepage_queries()
+        self.assertLess(self.homepage_queries(), cold)
+
+    def test_changes_bump_the_generation_once_per_commit(self):
+        self.client.get(reverse('main:homepage'))
+        generation = self.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            Goal.objects.create(user=self.user, title='Squat 150')
+        self.assertEqual(self.generation(), generation + 1)
+        self.assertContains(self.client.get(reverse('main:homepage')), 'Squat 150')
+
+        exercise = self.workout.exercises.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Set.objects.create(exercise=exercise, set_number=2, reps=5, weight=Decimal('100'), weight_unit=Set.KG)
+            Set.objects.create(exercise=exercise, set_number=3, reps=5, weight=Decimal('100'), weight_unit=Set.KG)
+        self.assertEqual(self.generation(), generation + 2)
+
+        # Another user's changes leave this dashboard alone
+        with self.captureOnCommitCallbacks(execute=True):
+            create_workout(create_user('other'))
+        self.assertEqual(self.generation(), generation + 2)
+
+    def test_bulk_writes_bump_the_generation(self):
+        generation = self.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            calorie_targets.recompute_calorie_targets()
+        self.assertEqual(self.generation(), generation + 1)
+
+        # Both users with meals and users whose stale rows are dropped
+        other = create_user('other')
+        DailyNutrition.objects.create(user=other, date=timezone.localdate(), calories=500, meal_count=1)
+        other_generation = UserProfile.dashboard_generation(other.id)
+        create_meal(self.user, timezone.localdate(), [(100, 200, 0, 0, 0)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(DailyNutrition.objects.rebuild(), 1)
+        self.assertEqual(self.generation(), generation + 2)
+        self.assertEqual(UserProfile.dashboard_generation(other.id), other_generation + 1)
+
+
+class DashboardApiTests(EmptyCacheMixin, TransactionTestCase):
+    """The panels run in worker threads with their own connections, which only see committed rows."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(current_weight=Decimal('100'), target_weight=Decimal('90'))
+        Goal.objects.create(
+            user=self.user, title='Lose 5 kg', goal_type=Goal.WEIGHT_LOSS, target_value=5, starting_value=104,
+        )
+        create_workout(self.user)
+        self.client.login(username='lifter', password=PASSWORD)
+
+    def test_dashboard_json(self):
+        response = self.client.get(reverse('main:dashboard_api'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['profile']['name'], 'lifter')
+        self.assertEqual(data['calorie_summary']['bmr'], 1855.0)
+        self.assertEqual(data['workout_stats']['total_workouts'], 1)
+        self.assertEqual(len(data['workout_stats']['heatmap']), 365)
+        self.assertEqual(data['goal_progress'][0]['goal']['title'], 'Lose 5 kg')
+        self.assertEqual(data['goal_progress'][0]['progress_percentage'], 80.0)
+
+        # The second request is served from the cached entry
+        with mock.patch.object(UserProfile, 'dashboard_panels') as dashboard_panels:
+            self.assertEqual(self.client.get(reverse('main:dashboard_api')).json(), data)
+        dashboard_panels.assert_not_called()
+
+    def test_panels_do_not_share_a_profile_instance(self):
+        panels = UserProfile.dashboard_panels
+        with mock.patch.object(UserProfile, 'dashboard_panels', autospec=True, side_effect=panels) as dashboard_panels:
+            self.assertEqual(self.client.get(reverse('main:dashboard_api')).status_code, 200)
+        instances = [call.args[0] for call in dashboard_panels.call_args_list]
+        # One call lists the panel names, then each panel loads its own profile
+        self.assertEqual(len(instances), 1 + len(panels(instances[0])))
+        self.assertEqual(len({id(instance) for instance in instances}), len(instances))
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('main:dashboard_api')).status_code, 302)
+
+
+class MetricsTests(EmptyCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        request_metrics.registry.reset()
+        self.user = create_user()
+
+    def test_exposition(self):
+        self.client.login(username='lifter', password=PASSWORD)
+        self.client.get(reverse('main:homepage'))
+        self.client.get('/no-such-page/')
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.get(reverse('main:metrics'))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('app_http_requests_total{view="main:homepage",method="GET",status="200"} 1', text)
+        self.assertIn('app_http_requests_total{view="<unresolved>",method="GET",status="404"} 1', text)
+        self.assertIn('app_template_render_duration_seconds_count{view="main:homepage"} 1', text)
+        self.assertGreater(request_metrics.registry.views['main:homepage'].queries.sum, 0)
+
+    def test_access(self):
+        url = reverse('main:metrics')
+        # Logged-in non-staff users and local addresses get nothing by default
+        self.client.login(username='lifter', password=PASSWORD)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.client.logout()
+
+        with self.settings(METRICS_BEARER_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.2']):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.2').status_code, 200)
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+
+class BenchmarkSuiteTests(EmptyCacheMixin, TestCase):
+    """Keep the benchmark generator and scenarios working as the views change."""
+
+    def test_generator_is_deterministic(self):
+        end = dt.date(2024, 6, 30)
+        first = generate(users=2, years=0.1, seed=7, prefix='first', end=end)
+        second = generate(users=2, years=0.1, seed=7, prefix='second', end=end)
+        self.assertEqual(first, second)
+        self.assertGreater(first['sets'], 0)
+
+        def history(prefix):
+            return (
+                list(Set.objects.filter(exercise__workout__user__username__startswith=prefix)
+                     .order_by('id').values_list('exercise__name', 'reps', 'weight_kg')),
+                list(Meal.objects.filter(user__username__startswith=prefix)
+                     .order_by('id').values_list('name', 'date_consumed')),
+            )
+        self.assertEqual(history('first-'), history('second-'))
+
+    def test_scenarios_run(self):
+        generate(users=1, years=0.1, seed=0)
+        client = Client()
+        client.login(username='bench-0', password='benchmark')
+        context = {
+            'today': timezone.localdate(),
+            'workout_id': Workout.objects.filter(user__username='bench-0').values_list('id', flat=True).first(),
+        }
+        for scenario in SCENARIOS:
+            with self.subTest(scenario=scenario):
+                result = run_scenario(client, scenario, context, repeat=1)
+                self.assertGreater(result['queries'], 0)
+                self.assertGreater(result['peak_memory_kib'], 0)
+
+
+class QueryPlanTests(EmptyCacheMixin, TestCase):
+    """
+    Run EXPLAIN QUERY PLAN on every query the views and UserProfile methods
+    issue, and fail when one scans a whole table or sorts in a temp B-tree,
+    so a missing index shows up here rather than as a slow page in production.
+    """
+    # prefetch_related batches (WHERE <fk> IN (...) ORDER BY ...) sort only the rows they fetch
+    PREFETCH_BATCH = re.compile(r'WHERE "\w+"\."\w+" IN \([^)]*\) ORDER BY')
+    SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|RIGHT PART OF ORDER BY|LAST \d+ TERMS OF ORDER BY|GROUP BY|DISTINCT)')
+
+    @classmethod
+    def setUpTestData(cls):
+        # A second user makes every per-user query choose between rows
+        generate(users=2, years=0.2, seed=0, prefix='plan')
+        cls.user = User.objects.get(username='plan-0')
+        cls.workout = cls.user.workouts.first()
+        cls.meal = cls.user.meals.first()
+        cls.goal = cls.user.goals.first()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def capture(self, func):
+        """Run func and return the (sql, params) of every statement it executed."""
+        statements = []
+
+        def wrapper(execute, sql, params, many, context):
+            statements.append((sql, params[0] if many and params else params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            result = func()
+            # Streaming responses run their queries while the body is read
+            if getattr(result, 'streaming', False):
+                b''.join(result.streaming_content)
+        return statements
+
+    def plan_problems(self, sql, params):
+        if not re.match(r'\s*(SELECT|UPDATE|DELETE)\b', sql, re.IGNORECASE):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            details = [row[3] for row in cursor.fetchall()]
+        # Full-text MATCH lookups show up as a SCAN of the FTS virtual table's own index
+        problems = [
+            detail for detail in details
+            if re.match(r'SCAN (?!CONSTANT ROW)', detail) and 'VIRTUAL TABLE INDEX' not in detail
+        ]
+        if not self.PREFETCH_BATCH.search(sql):
+            problems += [detail for detail in details if self.SORT.match(detail)]
+        return problems
+
+    def assertIndexedQueries(self, func):
+        statements = self.capture(func)
+        self.assertTrue(statements)
+        for sql, params in statements:
+            problems = self.plan_problems(sql, params)
+            self.assertFalse(problems, f"{problems} in:\n{sql}")
+
+    def test_view_queries_use_indexes(self):
+        workout, meal, goal = self.workout, self.meal, self.goal
+        today = timezone.localdate()
+        pages = [
+            reverse('main:homepage'),
+            reverse('main:meal_tracking'),
+            reverse('main:meal_tracking') + '?view=all',
+            reverse('main:meal_detail', args=[meal.id]),
+            reverse('main:edit_meal', args=[meal.id]),
+            reverse('main:food_autocomplete') + '?q=ba',
+            reverse('main:export_meals'),
+            reverse('main:my_workouts'),
+            reverse('main:workout_detail', args=[workout.id]),
+            reverse('main:exercise_series') + '?exercise=squat',
+            reverse('main:export_workouts'),
+            reverse('main:manage_goals'),
+            reverse('main:edit_goal', args=[goal.id]),
+            reverse('main:edit_profile'),
+            reverse('main:weight_series'),
+            reverse('main:progress_pictures'),
+        ]
+        for path in pages:
+            with self.subTest(path=path):
+                self.assertIndexedQueries(lambda: self.client.get(path))
+
+        context = {'today': today}
+        posts = [
+            (reverse('main:create_workout'), SCENARIOS['create_workout'][2](context)),
+            (reverse('main:add_meal'), SCENARIOS['add_meal'][2](context)),
+            (reverse('main:toggle_goal_completion', args=[goal.id]), {}),
+            (reverse('main:delete_meal', args=[meal.id]), {}),
+            (reverse('main:delete_workout', args=[workout.id]), {}),
+        ]
+        for path, data in posts:
+            with self.subTest(path=path):
+                self.assertIndexedQueries(lambda: self.client.post(path, data))
+
+    def test_profile_queries_use_indexes(self):
+        methods = [
+            'get_dashboard_data', 'get_workout_statistics', 'get_calorie_summary',
+            'get_goal_progress_summary', 'calculate_adjusted_daily_calories', 'claim_workout_number',
+        ]
+        for name in methods:
+            with self.subTest(method=name):
+                # Cached panels would hide the queries behind them
+                cache.clear()
+                profile = UserProfile.objects.get(user=self.user)
+                self.assertIndexedQueries(getattr(profile, name))
@@ -6,16 +6,22 @@ app_name = 'main'
 urlpatterns = [
     path('', views.index, name='index'),
     path('homepage/', views.homepage, name='homepage'),
+    path('api/dashboard/', views.dashboard_api, name='dashboard_api'),
+    path('metrics/', views.metrics, name='metrics'),
     path('signup/', views.signup, name='signup'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     path('profile/edit/', views.edit_profile, name='edit_profile'),
+    path('profile/weight/series/', views.weight_series, name='weight_series'),
     path('progress-pictures/', views.progress_pictures, name='progress_pictures'),
     path('progress-pictures/add/', views.add_progress_picture, name='add_progress_picture'),
     path('workouts/', views.my_workouts, name='my_workouts'),
     path('workout/create/', views.create_workout, name='create_workout'),
     path('workout/<int:workout_id>/', views.workout_detail, name='workout_detail'),
     path('workout/<int:workout_id>/delete/', views.delete_workout, name='delete_workout'),
+    path('workouts/analytics/series/', views.exercise_series, name='exercise_series'),
+    path('workouts/export/', views.export_workouts, name='export_workouts'),
+    path('workouts/import/', views.import_workouts, name='import_workouts'),
     path('goals/', views.manage_goals, name='manage_goals'),
     path('goals/add/', views.add_goal, name='add_goal'),
     path('goals/<int:goal_id>/edit/', views.edit_goal, name='edit_goal'),
@@ -23,6 +29,8 @@ urlpatterns = [
     path('goals/<int:goal_id>/delete/', views.delete_goal, name='delete_goal'),
     path('meals/', views.meal_tracking, name='meal_tracking'),
     path('meals/add/', views.add_meal, name='add_meal'),
+    path('meals/foods/autocomplete/', views.food_autocomplete, name='food_autocomplete'),
+    path('meals/export/', views.export_meals, name='export_meals'),
     path('meals/<int:meal_id>/', views.meal_detail, name='meal_detail'),
     path('meals/<int:meal_id>/edit/', views.edit_meal, name='edit_meal'),
     path('meals/<int:meal_id>/delete/', views.delete_meal, name='delete_meal'),
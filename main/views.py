@@ -1,10 +1,48 @@
+import asyncio
+import functools
+import hmac
+import io
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.db import connections, transaction
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
-from django.forms import formset_factory
-from .forms import SignUpForm, WorkoutForm, CustomAuthenticationForm, ExerciseFormSet, SetFormSet, UserProfileForm, ProgressPictureForm, GoalForm, MealForm, FoodForm, FoodFormSet
-from .models import UserProfile, ProgressPicture, Goal, Meal, Food
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Prefetch
+from . import analytics, exports, importers, metrics as request_metrics, weight_history
+from .forms import SignUpForm, WorkoutForm, WorkoutImportForm, CustomAuthenticationForm, ExerciseFormSet, SetFormSet, UserProfileForm, ProgressPictureForm, GoalForm, MealForm, FoodForm, FoodFormSet, EditFoodFormSet
+from .models import UserProfile, ProgressPicture, Goal, Exercise, ExerciseDefinition, Set, Meal, Food, FoodItem, PersonalRecord, KG_PER_LB, normalize_exercise_name
+from .signals import queue_daily_nutrition_refresh
 
+# Number of logged days shown per page in the "all days" meal view
+MEAL_TRACKING_DAYS_PER_PAGE = 14
+
+# Maximum number of catalog suggestions returned by food_autocomplete
+FOOD_AUTOCOMPLETE_LIMIT = 10
+
+# Food fields edited through FoodForm
+FOOD_FORM_FIELDS = FoodForm.Meta.fields
+
+# Number of workouts shown per page in my_workouts
+WORKOUTS_PER_PAGE = 20
+
+# Upper bound on the exercise_{i}_set_{j}_* rows read from a create_workout post
+MAX_SETS_PER_EXERCISE = 50
+
+# Largest weight Set.weight (max_digits=6, decimal_places=2) can store
+MAX_SET_WEIGHT = Decimal('9999.99')
+
+# Content types of the history export formats
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
 
 def index(request):
     """Main index view for the application."""
@@ -48,60 +86,246 @@ def homepage(request):
     # Get or create user profile
     user_profile, created = UserProfile.objects.get_or_create(user=request.user)
     
-    # Get comprehensive dashboard data
-    workout_stats = user_profile.get_workout_statistics()
-    calorie_summary = user_profile.get_calorie_summary()
-    goal_progress = user_profile.get_goal_progress_summary()
-    active_goals = request.user.goals.filter(is_active=True)
+    # Get comprehensive dashboard data, cached until the user changes something or the day rolls over
+    dashboard = user_profile.get_dashboard_data()
+    calorie_summary = dashboard['calorie_summary']
+    active_goals = dashboard['active_goals']
     
     # Check if profile is complete
     profile_incomplete = not (user_profile.age and user_profile.current_weight)
     bmr_incomplete = not (user_profile.age and user_profile.current_weight and user_profile.gender)
-    goals_incomplete = not active_goals.exists()
-    
-    # User information summary
-    user_info = {
-        'name': request.user.get_full_name() or request.user.username,
-        'age': user_profile.age,
-        'weight': user_profile.current_weight,
-        'weight_unit': user_profile.weight_unit,
-        'gender': user_profile.get_gender_display() if user_profile.gender else None,
-        'body_fat': user_profile.body_fat_percentage,
-        'bmr': user_profile.calculate_bmr(),
-        'tdee': user_profile.calculate_tdee(),
-    }
+    goals_incomplete = not active_goals
     
     context = {
         'user_profile': user_profile,
-        'user_info': user_info,
-        'workout_stats': workout_stats,
+        'user_info': _user_info(request.user, user_profile, calorie_summary),
+        'workout_stats': dashboard['workout_stats'],
         'calorie_summary': calorie_summary,
-        'goal_progress': goal_progress,
+        'goal_progress': dashboard['goal_progress'],
         'active_goals': active_goals,
         'profile_incomplete': profile_incomplete,
         'bmr_incomplete': bmr_incomplete,
         'goals_incomplete': goals_incomplete,
+        'recent_records': dashboard['recent_records'],
     }
     
     return render(request, 'main/homepage.html', context)
 
 
+def _user_info(user, user_profile, calorie_summary):
+    """User information summary shown on the dashboard."""
+    return {
+        'name': user.get_full_name() or user.username,
+        'age': user_profile.age,
+        'weight': user_profile.current_weight,
+        'weight_unit': user_profile.weight_unit,
+        'gender': user_profile.get_gender_display() if user_profile.gender else None,
+        'body_fat': user_profile.body_fat_percentage,
+        'bmr': calorie_summary['bmr'],
+        'tdee': calorie_summary['tdee'],
+        'adaptive_tdee': calorie_summary['adaptive_tdee'],
+    }
+
+
+def _in_worker_thread(func):
+    """
+    Run `func` in its own worker thread with its own database connection, closed
+    afterwards. The async ORM runs every query on one shared thread, so this is
+    what lets independent panels actually overlap.
+    """
+    def run():
+        try:
+            return func()
+        finally:
+            connections.close_all()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+def _dashboard_panel(profile_pk, name):
+    """
+    Compute one dashboard panel on a profile loaded by this worker alone: the panels
+    memoize metrics and refresh the stored targets on the instance they run on.
+    """
+    user_profile = UserProfile.objects.select_related('user').get(pk=profile_pk)
+    return user_profile.dashboard_panels()[name]()
+
+
+async def _dashboard_data(user_profile):
+    """get_dashboard_data() for async views, computing the panels concurrently on a cache miss."""
+    cache_key, timeout = await sync_to_async(user_profile.dashboard_cache_entry)()
+    data = await cache.aget(cache_key)
+    if data is None:
+        names = list(user_profile.dashboard_panels())
+        results = await asyncio.gather(*(
+            _in_worker_thread(functools.partial(_dashboard_panel, user_profile.pk, name)) for name in names
+        ))
+        data = dict(zip(names, results))
+        await cache.aset(cache_key, data, timeout)
+    return data
+
+
+@login_required
+async def dashboard_api(request):
+    """
+    The dashboard panels as JSON. Async: on a cache miss, workout stats, calorie
+    summary, goal progress and recent records are computed concurrently.
+    """
+    user = await request.auser()
+    user_profile, created = await UserProfile.objects.select_related('user').aget_or_create(user=user)
+    dashboard = await _dashboard_data(user_profile)
+    calorie_summary = dashboard['calorie_summary']
+    
+    return JsonResponse({
+        'profile': _user_info(user, user_profile, calorie_summary),
+        'workout_stats': dashboard['workout_stats'],
+        'calorie_summary': calorie_summary,
+        'goal_progress': [{
+            'goal': {
+                'id': progress['goal'].id,
+                'title': progress['goal'].title,
+                'goal_type': progress['goal'].goal_type,
+                'unit': progress['goal'].unit,
+                'target_date': progress['goal'].target_date,
+            },
+            'progress_percentage': progress['progress_percentage'],
+            'current_value': progress['current_value'],
+            'target_value': progress['target_value'],
+            'status': progress['status'],
+        } for progress in dashboard['goal_progress']],
+        'recent_records': [{
+            'exercise': record.exercise_name,
+            'heaviest_weight_kg': record.heaviest_weight_kg,
+            'best_1rm_kg': record.best_1rm_kg,
+            'best_volume_kg': record.best_volume_kg,
+            'achieved_at': record.achieved_at,
+        } for record in dashboard['recent_records']],
+    })
+
+
+def _metrics_token_matches(request):
+    """Whether the request carries "Authorization: Bearer <METRICS_BEARER_TOKEN>"."""
+    token = settings.METRICS_BEARER_TOKEN
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+def metrics(request):
+    """
+    Request metrics in the Prometheus text format, for staff users, scrapers with
+    METRICS_BEARER_TOKEN and METRICS_ALLOWED_IPS.
+    """
+    allowed = (
+        request.user.is_staff
+        or _metrics_token_matches(request)
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(request_metrics.registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _display_weight_unit(user):
+    """The unit the user wants weights shown in (UserProfile.weight_unit)."""
+    weight_unit = UserProfile.objects.filter(user=user).values_list('weight_unit', flat=True).first()
+    return weight_unit or UserProfile.LBS
+
+
 @login_required
 def workout_detail(request, workout_id):
     """Display detailed view of a specific workout."""
     workout = request.user.workouts.get(id=workout_id)
-    exercises = workout.exercises.all()
+    exercises = workout.exercises.select_related('definition').prefetch_related('sets')
+    weight_unit = _display_weight_unit(request.user)
+    
+    # One query for this workout's records; each PR check is then a dict lookup
+    exercise_keys = {analytics.series_key(exercise) for exercise in exercises}
+    records = {
+        record.exercise_key: record
+        for record in PersonalRecord.objects.filter(user=request.user, exercise_key__in=exercise_keys)
+    }
+    for exercise in exercises:
+        record = records.get(analytics.series_key(exercise))
+        exercise.records = record.records_in(workout.id) if record else []
+        for workout_set in exercise.sets.all():
+            workout_set.display_weight = workout_set.weight_in(weight_unit)
+            weight_key = analytics.weight_key(workout_set.weight_kg)
+            workout_set.is_rep_record = bool(record) and record.reps_at_weight.get(weight_key) == [workout_set.reps, workout.id]
+    
+    # Summed in SQL over the canonical kg column, whatever units the sets were logged in
+    totals = Set.objects.filter(exercise__workout=workout).totals()
+    volume = totals['volume_kg'] if weight_unit == Set.KG else totals['volume_kg'] / KG_PER_LB
+    
     return render(request, 'main/workout_detail.html', {
         'workout': workout,
-        'exercises': exercises
+        'exercises': exercises,
+        'weight_unit': weight_unit,
+        'total_volume': volume,
+        'total_reps': totals['total_reps'],
     })
 
 
 @login_required
 def my_workouts(request):
-    """Display all workouts for the logged-in user."""
-    workouts = request.user.workouts.all().order_by('-created_at')
-    return render(request, 'main/my_workouts.html', {'workouts': workouts})
+    """Display the logged-in user's workouts, a page at a time."""
+    workouts = request.user.workouts.all().order_by('-created_at').prefetch_related(
+        Prefetch('exercises', queryset=Exercise.objects.order_by('id').prefetch_related(
+            Prefetch('sets', queryset=Set.objects.order_by('set_number'))
+        ))
+    )
+    page = Paginator(workouts, WORKOUTS_PER_PAGE).get_page(request.GET.get('page'))
+    weight_unit = _display_weight_unit(request.user)
+    
+    # Summarize each exercise's sets once here instead of re-querying them in the template
+    for workout in page:
+        for exercise in workout.exercises.all():
+            sets = exercise.sets.all()
+            exercise.set_count = len(sets)
+            exercise.reps_summary = ' - '.join(str(workout_set.reps) for workout_set in sets)
+            exercise.weight_summary = ' - '.join(str(workout_set.weight_in(weight_unit)) for workout_set in sets)
+            exercise.weight_unit = weight_unit if sets else None
+    
+    return render(request, 'main/my_workouts.html', {'workouts': page, 'page_obj': page})
+
+
+def _parse_exercise_sets(data, exercise_index):
+    """
+    Read the exercise_{i}_set_{j}_* fields posted for one exercise.
+    Returns (sets, error) where sets is a list of dicts ready for Set(**values).
+    Set inputs left without reps are skipped, matching the form's "optional set" rows.
+    """
+    sets = []
+    for set_index in range(MAX_SETS_PER_EXERCISE + 1):
+        reps_key = f'exercise_{exercise_index}_set_{set_index}_reps'
+        if reps_key not in data:
+            break
+        if set_index == MAX_SETS_PER_EXERCISE:
+            return None, f"An exercise can have at most {MAX_SETS_PER_EXERCISE} sets."
+        
+        reps = data.get(reps_key, '').strip()
+        weight = data.get(f'exercise_{exercise_index}_set_{set_index}_weight', '').strip()
+        weight_unit = data.get(f'exercise_{exercise_index}_set_{set_index}_weight_unit', Set.LBS)
+        
+        # Only create set if reps is provided and not empty
+        if not reps:
+            continue
+        
+        try:
+            reps = int(reps)
+            weight = Decimal(weight) if weight else Decimal('0')
+        except (ValueError, InvalidOperation):
+            return None, "Reps and weight must be numbers."
+        if reps < 0 or not weight.is_finite() or weight < 0 or weight > MAX_SET_WEIGHT:
+            return None, f"Reps must be 0 or more and weight between 0 and {MAX_SET_WEIGHT}."
+        if weight_unit not in dict(Set.WEIGHT_OPTIONS):
+            return None, "Invalid weight unit."
+        
+        sets.append({
+            'set_number': len(sets) + 1,
+            'reps': reps,
+            'weight': weight.quantize(Decimal('0.01')),
+            'weight_unit': weight_unit,
+        })
+    return sets, None
 
 
 @login_required
@@ -113,57 +337,51 @@ def create_workout(request):
         exercise_formset = ExerciseFormSet(request.POST)
         
         if form.is_valid() and exercise_formset.is_valid():
-            # Check if at least one exercise has data
+            # Check if at least one exercise has data, and parse its sets up front
             valid_exercises = []
-            for exercise_form in exercise_formset:
-                if exercise_form.cleaned_data and exercise_form.cleaned_data.get('name'):
-                    valid_exercises.append(exercise_form)
+            for exercise_index, exercise_form in enumerate(exercise_formset):
+                if not (exercise_form.cleaned_data and exercise_form.cleaned_data.get('name')):
+                    continue
+                sets, exercise_error = _parse_exercise_sets(request.POST, exercise_index)
+                if exercise_error:
+                    break
+                valid_exercises.append((exercise_form, sets))
             
-            if not valid_exercises:
+            if not exercise_error and not valid_exercises:
                 exercise_error = "You must add at least one exercise to create a workout."
-            else:
-                workout = form.save(commit=False)
-                workout.user = request.user
-                # Set workout number based on user's current workout count
-                user_workout_count = request.user.workouts.count()
-                workout.workout_number = user_workout_count + 1
-                workout.save()
+            
+            if not exercise_error:
+                user_profile, created = UserProfile.objects.get_or_create(user=request.user)
                 
-                # Save exercises and their sets
-                for exercise_index, exercise_form in enumerate(valid_exercises):
-                    exercise = exercise_form.save(commit=False)
-                    exercise.workout = workout
-                    exercise.save()
+                with transaction.atomic():
+                    workout = form.save(commit=False)
+                    workout.user = request.user
+                    workout.workout_number = user_profile.claim_workout_number()
+                    workout.save()
                     
-                    # Process sets for this exercise
-                    set_number = 1
-                    set_index = 0
+                    definitions = ExerciseDefinition.objects.resolve(
+                        exercise_form.cleaned_data['name'] for exercise_form, sets in valid_exercises
+                    )
+                    exercises = []
+                    for exercise_form, sets in valid_exercises:
+                        exercise = exercise_form.save(commit=False)
+                        exercise.workout = workout
+                        exercise.definition = definitions.get(normalize_exercise_name(exercise.name))
+                        exercises.append(exercise)
+                    Exercise.objects.bulk_create(exercises)
                     
-                    while True:
-                        reps_key = f'exercise_{exercise_index}_set_{set_index}_reps'
-                        weight_key = f'exercise_{exercise_index}_set_{set_index}_weight'
-                        weight_unit_key = f'exercise_{exercise_index}_set_{set_index}_weight_unit'
-                        
-                        if reps_key not in request.POST:
-                            break
-                        
-                        reps = request.POST.get(reps_key)
-                        weight = request.POST.get(weight_key)
-                        weight_unit = request.POST.get(weight_unit_key, 'Lbs')
-                        
-                        # Only create set if reps is provided and not empty
-                        if reps and reps.strip():
-                            from .models import Set
-                            Set.objects.create(
-                                exercise=exercise,
-                                set_number=set_number,
-                                reps=int(reps),
-                                weight=float(weight) if weight and weight.strip() else 0,
-                                weight_unit=weight_unit
-                            )
-                            set_number += 1
-                        
-                        set_index += 1
+                    sets_by_exercise = [
+                        (exercise, [Set(exercise=exercise, **values) for values in sets])
+                        for exercise, (exercise_form, sets) in zip(exercises, valid_exercises)
+                    ]
+                    # bulk_create skips Set.save(), which normally fills weight_kg
+                    for exercise, sets in sets_by_exercise:
+                        for workout_set in sets:
+                            workout_set.sync_weight_kg()
+                    Set.objects.bulk_create([
+                        workout_set for exercise, sets in sets_by_exercise for workout_set in sets
+                    ])
+                    analytics.record_workout(workout, sets_by_exercise)
                 
                 return redirect('main:homepage')
     else:
@@ -177,6 +395,63 @@ def create_workout(request):
     })
 
 
+@login_required
+def exercise_series(request):
+    """
+    JSON time series for charting one exercise (?exercise=<name or alias>): per-workout
+    tonnage, best set and estimated 1RM in kg, optionally only the last ?limit= sessions.
+    Without ?exercise= it lists the charted exercises.
+    """
+    name = request.GET.get('exercise', '')
+    if not normalize_exercise_name(name):
+        exercises = (
+            request.user.exercise_series.order_by('exercise_key')
+            .values('exercise_key')
+            .annotate(name=Max('exercise_name'), sessions=Count('id'))
+        )
+        return JsonResponse({'exercises': list(exercises)})
+    
+    try:
+        limit = max(int(request.GET.get('limit', 0)), 0)
+    except ValueError:
+        limit = 0
+    
+    definition = ExerciseDefinition.objects.lookup(name)
+    return JsonResponse({
+        'exercise': definition.normalized_name if definition else normalize_exercise_name(name),
+        'points': analytics.series_points(request.user, definition, limit) if definition else [],
+    })
+
+
+def _query_date(request, name):
+    """A YYYY-MM-DD query parameter as a date, or None if missing or invalid."""
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
+@login_required
+def weight_series(request):
+    """
+    JSON weigh-ins and smoothed trend in kg for charting, between ?start= and ?end=
+    (YYYY-MM-DD, both optional), down-sampled to at most ?points= entries.
+    """
+    start = _query_date(request, 'start')
+    end = _query_date(request, 'end')
+    try:
+        points = int(request.GET.get('points', weight_history.DEFAULT_CHART_POINTS))
+    except ValueError:
+        points = weight_history.DEFAULT_CHART_POINTS
+    points = min(max(points, 3), weight_history.MAX_CHART_POINTS)
+    
+    return JsonResponse({
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'points': weight_history.weight_points(request.user, start, end, points),
+    })
+
+
 @login_required
 def edit_profile(request):
     """Edit user profile information."""
@@ -302,27 +577,21 @@ def meal_tracking(request):
     
     if view_mode == 'day':
         # Show only selected day
-        meals = request.user.meals.filter(date_consumed=selected_date)
+        meals = request.user.meals.filter(date_consumed=selected_date).with_totals().prefetch_related('foods')
         
-        # Calculate totals for the selected day
+        # Totals for the selected day come from the rollup table
+        day_nutrition = request.user.daily_nutrition.filter(date=selected_date).first()
         daily_total = {
-            'calories': 0,
-            'carbs': 0,
-            'fat': 0,
-            'protein': 0,
-            'meals': []
+            'calories': day_nutrition.calories if day_nutrition else 0,
+            'carbs': day_nutrition.carbs if day_nutrition else 0,
+            'fat': day_nutrition.fat if day_nutrition else 0,
+            'protein': day_nutrition.protein if day_nutrition else 0,
+            'meals': list(meals)
         }
         
-        for meal in meals:
-            daily_total['calories'] += meal.total_calories
-            daily_total['carbs'] += meal.total_carbs
-            daily_total['fat'] += meal.total_fat
-            daily_total['protein'] += meal.total_protein
-            daily_total['meals'].append(meal)
-        
         # Check if user has meals on previous/next days for navigation
-        has_prev_meals = request.user.meals.filter(date_consumed=prev_date).exists()
-        has_next_meals = request.user.meals.filter(date_consumed=next_date).exists()
+        has_prev_meals = request.user.daily_nutrition.filter(date=prev_date).exists()
+        has_next_meals = request.user.daily_nutrition.filter(date=next_date).exists()
         
         context = {
             'view_mode': 'day',
@@ -336,36 +605,50 @@ def meal_tracking(request):
             'meals': meals,
         }
     else:
-        # Show all days (original view)
-        meals = request.user.meals.all()
+        # Show all days, one window of dates at a time (keyset pagination on date)
+        days = request.user.daily_nutrition.all()
         
-        # Calculate daily totals
-        daily_totals = {}
-        for meal in meals:
-            date = meal.date_consumed
-            if date not in daily_totals:
-                daily_totals[date] = {
-                    'calories': 0,
-                    'carbs': 0,
-                    'fat': 0,
-                    'protein': 0,
-                    'meals': []
-                }
-            daily_totals[date]['calories'] += meal.total_calories
-            daily_totals[date]['carbs'] += meal.total_carbs
-            daily_totals[date]['fat'] += meal.total_fat
-            daily_totals[date]['protein'] += meal.total_protein
-            daily_totals[date]['meals'].append(meal)
+        older_than = None
+        before_str = request.GET.get('before')
+        if before_str:
+            try:
+                older_than = datetime.strptime(before_str, '%Y-%m-%d').date()
+            except ValueError:
+                older_than = None
+        if older_than:
+            days = days.filter(date__lt=older_than)
+        
+        # Fetch one extra row to know whether an older page exists
+        days = list(days[:MEAL_TRACKING_DAYS_PER_PAGE + 1])
+        has_older_days = len(days) > MEAL_TRACKING_DAYS_PER_PAGE
+        days = days[:MEAL_TRACKING_DAYS_PER_PAGE]
         
-        # Sort by date (newest first)
-        sorted_daily_totals = dict(sorted(daily_totals.items(), reverse=True))
+        meals_by_date = {}
+        if days:
+            meals = request.user.meals.filter(
+                date_consumed__range=[days[-1].date, days[0].date]
+            ).with_totals().prefetch_related('foods')
+            for meal in meals:
+                meals_by_date.setdefault(meal.date_consumed, []).append(meal)
+        
+        # Daily totals come from the rollup table, newest first
+        daily_totals = {}
+        for day in days:
+            daily_totals[day.date] = {
+                'calories': day.calories,
+                'carbs': day.carbs,
+                'fat': day.fat,
+                'protein': day.protein,
+                'meals': meals_by_date.get(day.date, [])
+            }
         
         context = {
             'view_mode': 'all',
             'selected_date': selected_date,
             'today': dt.date.today(),
-            'daily_totals': sorted_daily_totals,
-            'meals': meals,
+            'daily_totals': daily_totals,
+            'older_than': older_than,
+            'next_cursor': days[-1].date if has_older_days else None,
         }
     
     return render(request, 'main/meal_tracking.html', context)
@@ -393,16 +676,18 @@ def add_meal(request):
                     'food_error': food_error
                 })
             
-            # Save the meal
-            meal = meal_form.save(commit=False)
-            meal.user = request.user
-            meal.save()
-            
-            # Save the foods
-            for food_form in valid_foods:
-                food = food_form.save(commit=False)
-                food.meal = meal
-                food.save()
+            # One transaction, so the day's rollup is refreshed once rather than per food
+            with transaction.atomic():
+                # Save the meal
+                meal = meal_form.save(commit=False)
+                meal.user = request.user
+                meal.save()
+                
+                # Save the foods
+                for food_form in valid_foods:
+                    food = food_form.save(commit=False)
+                    food.meal = meal
+                    food.save()
             
             return redirect('main:meal_tracking')
     else:
@@ -415,10 +700,30 @@ def add_meal(request):
     })
 
 
+@login_required
+def food_autocomplete(request):
+    """Return catalog foods matching ?q= as JSON for filling in FoodForm fields."""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    
+    items = FoodItem.objects.autocomplete(query, limit=FOOD_AUTOCOMPLETE_LIMIT)
+    results = [{
+        'id': item.id,
+        'name': item.name,
+        'calories_per_100g': str(item.calories_per_100g),
+        'carbs_per_100g': str(item.carbs_per_100g),
+        'fat_per_100g': str(item.fat_per_100g),
+        'protein_per_100g': str(item.protein_per_100g),
+    } for item in items]
+    
+    return JsonResponse({'results': results})
+
+
 @login_required
 def meal_detail(request, meal_id):
     """Display detailed view of a specific meal."""
-    meal = request.user.meals.get(id=meal_id)
+    meal = request.user.meals.with_totals().get(id=meal_id)
     foods = meal.foods.all()
     
     context = {
@@ -429,53 +734,76 @@ def meal_detail(request, meal_id):
     return render(request, 'main/meal_detail.html', context)
 
 
+def _apply_food_changes(meal, existing_foods, food_formset):
+    """
+    Apply an edit formset to a meal's foods as a diff: unchanged foods are left
+    alone, changed ones are bulk-updated, new ones bulk-created and the rest deleted.
+    """
+    to_update = []
+    to_create = []
+    kept_ids = set()
+    
+    for food_form in food_formset:
+        data = food_form.cleaned_data
+        if not data or not data.get('name') or data.get('DELETE'):
+            continue
+        
+        values = {field: data[field] for field in FOOD_FORM_FIELDS}
+        food = existing_foods.get(data.get('food_id'))
+        if food is None:
+            to_create.append(Food(meal=meal, **values))
+            continue
+        
+        kept_ids.add(food.id)
+        if any(getattr(food, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(food, field, value)
+            to_update.append(food)
+    
+    removed_ids = [food_id for food_id in existing_foods if food_id not in kept_ids]
+    if removed_ids:
+        Food.objects.filter(id__in=removed_ids).delete()
+    if to_update:
+        Food.objects.bulk_update(to_update, FOOD_FORM_FIELDS)
+    if to_create:
+        Food.objects.bulk_create(to_create)
+    
+    # Bulk update/create don't send signals, so refresh the daily rollup explicitly
+    if to_update or to_create:
+        queue_daily_nutrition_refresh(meal_id=meal.id)
+
+
+def _food_initial(existing_foods):
+    """Edit formset initial data for a meal's foods."""
+    return [{
+        'food_id': food.id,
+        **{field: getattr(food, field) for field in FOOD_FORM_FIELDS},
+    } for food in existing_foods.values()]
+
+
 @login_required
 def edit_meal(request, meal_id):
     """Edit an existing meal."""
     meal = request.user.meals.get(id=meal_id)
     
     if request.method == 'POST':
-        meal_form = MealForm(request.POST, instance=meal)
-        
-        # Create formset with existing foods
-        FoodFormSetWithExtra = formset_factory(FoodForm, extra=1, can_delete=True)
-        food_formset = FoodFormSetWithExtra(request.POST, initial=[{
-            'name': food.name,
-            'grams': food.grams,
-            'calories_per_100g': food.calories_per_100g,
-            'carbs_per_100g': food.carbs_per_100g,
-            'fat_per_100g': food.fat_per_100g,
-            'protein_per_100g': food.protein_per_100g,
-        } for food in meal.foods.all()])
-        
-        if meal_form.is_valid() and food_formset.is_valid():
-            # Update the meal
-            meal_form.save()
-            
-            # Delete existing foods and create new ones
-            meal.foods.all().delete()
-            
-            # Save new foods
-            for food_form in food_formset:
-                if food_form.cleaned_data and food_form.cleaned_data.get('name') and not food_form.cleaned_data.get('DELETE'):
-                    food = food_form.save(commit=False)
-                    food.meal = meal
-                    food.save()
+        with transaction.atomic():
+            # Read (and, where supported, lock) the foods in the transaction that applies
+            # the diff, so it never runs against rows another request has since changed
+            existing_foods = {food.id: food for food in meal.foods.select_for_update()}
+            meal_form = MealForm(request.POST, instance=meal)
+            food_formset = EditFoodFormSet(request.POST, initial=_food_initial(existing_foods))
             
-            return redirect('main:meal_detail', meal_id=meal.id)
+            if meal_form.is_valid() and food_formset.is_valid():
+                # Update the meal
+                meal_form.save()
+                _apply_food_changes(meal, existing_foods, food_formset)
+                
+                return redirect('main:meal_detail', meal_id=meal.id)
     else:
+        existing_foods = {food.id: food for food in meal.foods.all()}
         meal_form = MealForm(instance=meal)
-        
-        # Create formset with existing foods
-        FoodFormSetWithExtra = formset_factory(FoodForm, extra=1, can_delete=True)
-        food_formset = FoodFormSetWithExtra(initial=[{
-            'name': food.name,
-            'grams': food.grams,
-            'calories_per_100g': food.calories_per_100g,
-            'carbs_per_100g': food.carbs_per_100g,
-            'fat_per_100g': food.fat_per_100g,
-            'protein_per_100g': food.protein_per_100g,
-        } for food in meal.foods.all()])
+        food_formset = EditFoodFormSet(initial=_food_initial(existing_foods))
     
     return render(request, 'main/edit_meal.html', {
         'meal_form': meal_form,
@@ -484,11 +812,62 @@ def edit_meal(request, meal_id):
     })
 
 
+def _export_response(request, name, rows, documents):
+    """Stream an export as ?format=csv (default) or ?format=jsonl without building it in memory."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return JsonResponse({'error': 'format must be csv or jsonl'}, status=400)
+    
+    if export_format == 'csv':
+        content = exports.stream_csv(rows(request.user))
+    else:
+        content = exports.stream_jsonl(documents(request.user))
+    response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{name}.{export_format}"'
+    return response
+
+
+@login_required
+def export_workouts(request):
+    """Download every workout, exercise and set."""
+    return _export_response(request, 'workouts', exports.workout_rows, exports.workout_documents)
+
+
+@login_required
+def export_meals(request):
+    """Download every meal and food."""
+    return _export_response(request, 'meals', exports.meal_rows, exports.meal_documents)
+
+
+@login_required
+def import_workouts(request):
+    """Upload another tracker's CSV export and bulk import its workouts."""
+    result = None
+    if request.method == 'POST':
+        form = WorkoutImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            handle = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = importers.import_workouts(request.user, handle, default_unit=form.cleaned_data['weight_unit'])
+            except importers.WorkoutImportError as error:
+                form.add_error('csv_file', str(error))
+            except UnicodeDecodeError:
+                form.add_error('csv_file', 'The file must be a UTF-8 encoded CSV.')
+    else:
+        form = WorkoutImportForm()
+    
+    return render(request, 'main/import_workouts.html', {'form': form, 'result': result})
+
+
 @login_required
 def delete_workout(request, workout_id):
     """Delete a workout."""
     workout = request.user.workouts.get(id=workout_id)
-    workout.delete()
+    with transaction.atomic():
+        # Only the exercises this workout touched need their records recomputed
+        exercise_keys = set(workout.exercise_series.order_by().values_list('exercise_key', flat=True))
+        workout.delete()
+        analytics.recompute_personal_records(request.user.id, exercise_keys)
     return redirect('main:my_workouts')
 
 
@@ -0,0 +1,86 @@
+"""
+Weight history charts: WeightEntry points in a date range, down-sampled for plotting.
+
+A long history has far more weigh-ins than a chart has pixels, so the points are
+reduced with Largest-Triangle-Three-Buckets (LTTB), which keeps the peaks and
+dips that shape the line instead of averaging them away.
+"""
+import datetime as dt
+
+from django.utils import timezone
+
+from .models import WeightEntry
+
+DEFAULT_CHART_POINTS = 200
+MAX_CHART_POINTS = 2000
+
+
+def downsample_lttb(points, threshold):
+    """
+    Reduce a list of points, sorted by x, to `threshold` points with LTTB. Each point
+    is a tuple starting with x and y; anything after them is carried along. The
+    first and last points are always kept; lists already short enough are
+    returned unchanged.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # The average of the next bucket is the third corner of the triangle
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        next_points = points[next_start:next_end] or [points[-1]]
+        average_x = sum(point[0] for point in next_points) / len(next_points)
+        average_y = sum(point[1] for point in next_points) / len(next_points)
+
+        selected_x, selected_y = points[selected][:2]
+        largest_area = -1
+        for index in range(start, end):
+            x, y = points[index][:2]
+            area = abs((selected_x - average_x) * (y - selected_y) - (selected_x - x) * (average_y - selected_y))
+            if area > largest_area:
+                largest_area = area
+                best = index
+        sampled.append(points[best])
+        selected = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def _day_bounds(start, end):
+    """Aware datetimes covering the local days start..end (either may be None)."""
+    bounds = {}
+    if start:
+        bounds['measured_at__gte'] = timezone.make_aware(dt.datetime.combine(start, dt.time.min))
+    if end:
+        bounds['measured_at__lt'] = timezone.make_aware(dt.datetime.combine(end + dt.timedelta(days=1), dt.time.min))
+    return bounds
+
+
+def weight_points(user, start=None, end=None, points=DEFAULT_CHART_POINTS):
+    """
+    The user's weigh-ins and trend between two dates, oldest first, down-sampled
+    to at most `points` entries. The trend line drives the selection, so the
+    smoothed curve keeps its shape.
+    """
+    rows = list(
+        WeightEntry.objects.filter(user=user, **_day_bounds(start, end))
+        .order_by('measured_at', 'id')
+        .values_list('measured_at', 'weight_kg', 'trend_kg')
+    )
+    sampled = downsample_lttb([
+        (measured_at.timestamp(), trend_kg, measured_at, weight_kg)
+        for measured_at, weight_kg, trend_kg in rows
+    ], points)
+    return [{
+        'measured_at': measured_at.isoformat(),
+        'weight_kg': float(weight_kg),
+        'trend_kg': round(trend_kg, 2),
+    } for timestamp, trend_kg, measured_at, weight_kg in sampled]
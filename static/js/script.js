@@ -5,6 +5,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize exercise form numbering
     updateExerciseNumbers();
+    
+    // Food catalog suggestions on the meal forms
+    initFoodAutocomplete();
 });
 
 // Function to add a new exercise form
@@ -161,4 +164,81 @@ function reindexForms() {
             }
         });
     });
-}
\ No newline at end of file
+}
+
+// Suggest catalog foods while typing a food name and fill in the per-100g fields
+function initFoodAutocomplete() {
+    const foodForms = document.getElementById('food-forms');
+    if (!foodForms || !foodForms.dataset.autocompleteUrl) {
+        return;
+    }
+    
+    const url = foodForms.dataset.autocompleteUrl;
+    const macroFields = ['calories_per_100g', 'carbs_per_100g', 'fat_per_100g', 'protein_per_100g'];
+    let debounceTimer = null;
+    let activeRequest = null;
+    
+    function closeSuggestions() {
+        foodForms.querySelectorAll('.autocomplete-results').forEach(list => list.remove());
+    }
+    
+    function fillFoodForm(input, item) {
+        const prefix = input.name.replace(/-name$/, '');
+        input.value = item.name.slice(0, input.maxLength > 0 ? input.maxLength : undefined);
+        macroFields.forEach(field => {
+            const fieldInput = foodForms.querySelector(`[name="${prefix}-${field}"]`);
+            if (fieldInput) {
+                fieldInput.value = item[field];
+            }
+        });
+        closeSuggestions();
+    }
+    
+    function showSuggestions(input, results) {
+        closeSuggestions();
+        if (!results.length) {
+            return;
+        }
+        
+        const list = document.createElement('ul');
+        list.className = 'autocomplete-results';
+        results.forEach(item => {
+            const option = document.createElement('li');
+            option.textContent = `${item.name} (${item.calories_per_100g} cal/100g)`;
+            option.addEventListener('mousedown', event => {
+                event.preventDefault();
+                fillFoodForm(input, item);
+            });
+            list.appendChild(option);
+        });
+        input.parentNode.appendChild(list);
+    }
+    
+    // Delegate so food forms added after page load get suggestions too
+    foodForms.addEventListener('input', function(event) {
+        const input = event.target;
+        if (!input.name || !input.name.endsWith('-name')) {
+            return;
+        }
+        
+        clearTimeout(debounceTimer);
+        const query = input.value.trim();
+        if (query.length < 2) {
+            closeSuggestions();
+            return;
+        }
+        
+        debounceTimer = setTimeout(() => {
+            if (activeRequest) {
+                activeRequest.abort();
+            }
+            activeRequest = new AbortController();
+            fetch(`${url}?q=${encodeURIComponent(query)}`, { signal: activeRequest.signal })
+                .then(response => response.json())
+                .then(data => showSuggestions(input, data.results))
+                .catch(() => {});
+        }, 150);
+    });
+    
+    foodForms.addEventListener('focusout', closeSuggestions);
+}